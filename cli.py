@@ -0,0 +1,298 @@
+# cli.py
+"""Консольный запуск без интерфейса (озвучка, замена звука, монтаж)
+
+Примеры:
+    python cli.py synthesize script.txt --template UUID --output озвучка
+    python cli.py replace-audio --video видео --audio озвучка --output видео_с_озвучкой
+    python cli.py montage --input видео_с_озвучкой --output final.mp4 --transition crossfade
+
+Прогресс печатается в stdout построчно в формате JSON. Отладочный вывод
+библиотек и дочерних процессов ([DEBUG], [ERROR], moviepy) идёт в stderr.
+Коды выхода: 0 - успех, 1 - ошибки при обработке, 2 - неверные аргументы,
+130 - прервано пользователем.
+"""
+
+import os
+import sys
+import json
+import signal
+import argparse
+import contextlib
+from core.config import Config
+from core.settings_manager import SettingsManager
+from core.job_runner import CancelToken
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+# Поток событий: исходный stdout, пока команда выполняется (см. event_stream)
+_events = None
+
+
+def emit(event, **data):
+    """Напечатать событие в формате JSON"""
+    data["event"] = event
+    print(json.dumps(data, ensure_ascii=False), file=_events or sys.stdout, flush=True)
+
+
+@contextlib.contextmanager
+def event_stream():
+    """
+    Оставить stdout только для событий: его дескриптор дублируется для emit,
+    а дескриптор 1 и sys.stdout перенаправляются в stderr. Так в stderr
+    попадает и печать библиотек, и вывод процессов пула (они наследуют
+    дескрипторы, а не sys.stdout).
+    """
+    global _events
+    try:
+        stdout_fd = sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        # stdout без дескриптора (встроенный запуск) - только подмена sys.stdout
+        _events = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            try:
+                yield
+            finally:
+                _events = None
+        return
+
+    sys.stdout.flush()
+    saved_fd = os.dup(stdout_fd)
+    _events = open(os.dup(saved_fd), 'w', encoding='utf-8', buffering=1)
+    os.dup2(sys.stderr.fileno(), stdout_fd)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            yield
+    finally:
+        sys.stdout.flush()
+        _events.close()
+        _events = None
+        os.dup2(saved_fd, stdout_fd)
+        os.close(saved_fd)
+
+
+def install_cancel_handler():
+    """Ctrl+C отменяет текущую операцию вместо аварийного выхода"""
+    token = CancelToken()
+
+    def handler(signum, frame):
+        emit("cancelling")
+        token.cancel()
+
+    signal.signal(signal.SIGINT, handler)
+    return token
+
+
+def resolve_api_key(args):
+    """API ключ: аргумент, переменная окружения или настройки приложения"""
+    return (args.api_key
+            or os.environ.get("VOICE_API_KEY")
+            or SettingsManager().load_settings().get("api_key", ""))
+
+
+def cmd_synthesize(args):
+    """Построчное озвучивание файла сценария"""
+    from core.api_client import VoiceAPIClient
+    from core.synthesis_engine import LineSynthesisEngine
+    from core.result_cache import SynthesisCache
+    from core.synthesis_journal import SynthesisJournal
+    from utils.audio_processor import AudioProcessor
+
+    api_key = resolve_api_key(args)
+    if not api_key:
+        emit("error", message="Не указан API ключ (--api-key или VOICE_API_KEY)")
+        return EXIT_USAGE
+
+    try:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f.read().split('\n') if line.strip()]
+    except OSError as e:
+        emit("error", message=f"Не удалось прочитать сценарий: {e}")
+        return EXIT_USAGE
+
+    if not lines:
+        emit("error", message="Нет строк для озвучивания")
+        return EXIT_USAGE
+
+    os.makedirs(args.output, exist_ok=True)
+    token = install_cancel_handler()
+
+    job_settings = {
+        "chunk_size": args.chunk_size,
+        "end_pause": args.end_pause,
+        "adjust_speed": args.target_duration is not None,
+        "target_duration": args.target_duration,
+        "preserve_pitch": args.preserve_pitch
+    }
+    journal = SynthesisJournal.load(args.output)
+    if (args.restart or not journal or journal.finished
+            or not journal.matches(lines, args.template, job_settings)):
+        journal = SynthesisJournal(args.output)
+        journal.start_job(lines, args.template, job_settings)
+    else:
+        emit("resume", done=journal.done_count(), total=len(lines), errors=journal.errors())
+
+    def postprocess(output_file):
+        if args.end_pause > 0 or args.target_duration:
+            AudioProcessor.postprocess(output_file, args.end_pause, args.target_duration,
+                                       preserve_pitch=args.preserve_pitch)
+
+    engine = LineSynthesisEngine(
+        VoiceAPIClient.get_client(api_key), args.template, args.output,
+        chunk_size=args.chunk_size,
+        max_in_flight=args.concurrency,
+        postprocess=postprocess,
+        cache=None if args.no_cache else SynthesisCache.get_default(),
+        journal=journal
+    )
+
+    def on_progress(done, total, index, success, message):
+        emit("progress", done=done, total=total, line=index, success=success, message=message)
+
+    emit("start", command="synthesize", lines=len(lines), concurrency=engine.max_in_flight)
+    completed, errors = engine.run(lines, on_progress=on_progress, should_stop=token.is_cancelled)
+
+    emit("done", completed=completed, total=len(lines), errors=errors,
+         cache_hits=engine.cache_hits, resumed=engine.resumed)
+    VoiceAPIClient.close_session()
+
+    if token.is_cancelled():
+        return EXIT_INTERRUPTED
+    return EXIT_OK if not errors else EXIT_FAILED
+
+
+def cmd_replace_audio(args):
+    """Замена звука во всех парах видео-аудио"""
+    from utils.video_processor import VideoProcessor
+    from utils.batch_processor import BatchVideoProcessor
+
+    for folder in (args.video, args.audio):
+        if not os.path.isdir(folder):
+            emit("error", message=f"Папка не найдена: {folder}")
+            return EXIT_USAGE
+
+    os.makedirs(args.output, exist_ok=True)
+    token = install_cancel_handler()
+
+    pairs = VideoProcessor.find_video_audio_pairs(args.video, args.audio)
+    batch = BatchVideoProcessor(max_workers=args.workers)
+    workers, threads = batch.plan_workers(len(pairs), batch.max_workers)
+    emit("start", command="replace-audio", pairs=len(pairs), workers=workers, threads=threads)
+
+    def on_progress(done, total, number, success, message):
+        emit("progress", done=done, total=total, number=number, success=success, message=message)
+
+    success_count, failures = batch.run(
+        pairs, args.output,
+        {
+            'fit_mode': args.fit_mode,
+            'keep_original': args.keep_original,
+            'original_volume': args.original_volume
+        },
+        on_progress=on_progress,
+        should_stop=token.is_cancelled
+    )
+    failed = [number for number, msg in failures]
+
+    emit("done", completed=success_count, total=len(pairs), failed=failed)
+
+    if token.is_cancelled():
+        return EXIT_INTERRUPTED
+    return EXIT_OK if not failed else EXIT_FAILED
+
+
+def cmd_montage(args):
+    """Монтаж всех видео папки в один файл"""
+    from utils.video_processor import VideoProcessor
+
+    if not os.path.isdir(args.input):
+        emit("error", message=f"Папка не найдена: {args.input}")
+        return EXIT_USAGE
+
+    emit("start", command="montage", input=args.input, output=args.output)
+    token = install_cancel_handler()
+
+    def on_progress(text, done, total):
+        emit("progress", message=text, done=done, total=total)
+
+    success, msg = VideoProcessor.montage_videos(
+        args.input,
+        args.output,
+        use_transitions=args.transition is not None,
+        transition_type=args.transition or "crossfade",
+        transition_duration=args.transition_duration,
+        on_progress=on_progress,
+        should_stop=token.is_cancelled
+    )
+
+    emit("done", success=success, message=msg)
+
+    if token.is_cancelled():
+        return EXIT_INTERRUPTED
+    return EXIT_OK if success else EXIT_FAILED
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description=Config.APP_NAME)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    synth = subparsers.add_parser("synthesize", help="Построчное озвучивание сценария")
+    synth.add_argument("script", help="Текстовый файл сценария (строка = файл {i}.mp3)")
+    synth.add_argument("--template", required=True, help="UUID шаблона голоса")
+    synth.add_argument("--output", required=True, help="Папка для аудио")
+    synth.add_argument("--api-key", help="API ключ (по умолчанию VOICE_API_KEY или настройки)")
+    synth.add_argument("--chunk-size", type=int, default=None, help="Размер чанка")
+    synth.add_argument("--concurrency", type=int, default=Config.MAX_CONCURRENT_TASKS,
+                       help="Задач на сервере одновременно")
+    synth.add_argument("--end-pause", type=float, default=0.0, help="Пауза в конце (сек)")
+    synth.add_argument("--target-duration", type=float, default=None,
+                       help="Подогнать длительность каждой строки (сек)")
+    synth.add_argument("--preserve-pitch", action="store_true",
+                       help="Подгонять длительность без изменения высоты голоса")
+    synth.add_argument("--no-cache", action="store_true", help="Не использовать кэш результатов")
+    synth.add_argument("--restart", action="store_true",
+                       help="Начать заново, не продолжая прерванный запуск")
+    synth.set_defaults(func=cmd_synthesize)
+
+    replace = subparsers.add_parser("replace-audio", help="Заменить звук в видео")
+    replace.add_argument("--video", required=True, help="Папка с видео")
+    replace.add_argument("--audio", required=True, help="Папка с аудио")
+    replace.add_argument("--output", required=True, help="Папка для результата")
+    replace.add_argument("--fit-mode", choices=["fit", "trim", "none"], default="fit")
+    replace.add_argument("--keep-original", action="store_true",
+                         help="Оставить оригинальное аудио видео")
+    replace.add_argument("--original-volume", type=int, default=30,
+                         help="Громкость оригинала (%%)")
+    replace.add_argument("--workers", type=int, default=None,
+                         help="Процессов обработки (по умолчанию по числу ядер)")
+    replace.set_defaults(func=cmd_replace_audio)
+
+    montage = subparsers.add_parser("montage", help="Смонтировать видео из папки")
+    montage.add_argument("--input", required=True, help="Папка с видео")
+    montage.add_argument("--output", required=True, help="Итоговый файл")
+    montage.add_argument("--transition", default=None,
+                         help="Тип перехода (crossfade, fade, slide_left, ...); без него - без переходов")
+    montage.add_argument("--transition-duration", type=float, default=0.5)
+    montage.set_defaults(func=cmd_montage)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with event_stream():
+        try:
+            return args.func(args)
+        except KeyboardInterrupt:
+            emit("cancelled")
+            return EXIT_INTERRUPTED
+        except Exception as e:
+            emit("error", message=str(e))
+            return EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,14 @@
 # core/__init__.py
 """Ядро приложения Voice App"""
 
-from .config import Config
-from .api_client import VoiceAPIClient
-from .settings_manager import SettingsManager
+from .lazy import lazy_exports
+
+# Модули грузятся при первом обращении: проверка лицензии в main.py
+# не должна тянуть requests и остальной клиент API
+__getattr__ = lazy_exports(__name__, {
+    'Config': '.config',
+    'VoiceAPIClient': '.api_client',
+    'SettingsManager': '.settings_manager',
+})
 
 __all__ = ['Config', 'VoiceAPIClient', 'SettingsManager']
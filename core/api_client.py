@@ -1,14 +1,95 @@
 # core/api_client.py
 """Клиент для работы с Voice API"""
 
+import os
+import math
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 import time
 from .config import Config
+from .polling import AdaptivePoller, parse_retry_after
+
+def _sleep(seconds, should_stop=None):
+    """Пауза с проверкой отмены; True если ожидание отменено"""
+    deadline = time.monotonic() + seconds
+    while True:
+        if should_stop and should_stop():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(0.1, remaining))
+
+
+class _DownloadCancelled(Exception):
+    """Загрузка прервана отменой"""
+
 
 class VoiceAPIClient:
+    # Общий пул соединений для всех клиентов (keep-alive между запросами)
+    _session = None
+    _session_lock = threading.Lock()
+    
+    # Клиенты по API ключу - панели переиспользуют один объект
+    _clients = {}
+    _clients_lock = threading.Lock()
+    
     def __init__(self, api_key):
         self.api_key = api_key
         self.base_url = Config.API_BASE_URL
+        self.session = self.get_session()
+    
+    @classmethod
+    def get_client(cls, api_key):
+        """Получить общий клиент для API ключа"""
+        with cls._clients_lock:
+            client = cls._clients.get(api_key)
+            if client is None:
+                client = cls(api_key)
+                cls._clients[api_key] = client
+            return client
+    
+    @classmethod
+    def get_session(cls):
+        """Получить общую HTTP-сессию с пулом соединений"""
+        with cls._session_lock:
+            if cls._session is None:
+                cls._session = cls._create_session()
+            return cls._session
+    
+    @staticmethod
+    def _create_session():
+        """Создать сессию с настроенным пулом"""
+        session = requests.Session()
+        
+        # pool_connections - число хостов в пуле,
+        # pool_maxsize - соединений на хост (по числу параллельных потоков)
+        adapter = HTTPAdapter(
+            pool_connections=Config.API_POOL_CONNECTIONS,
+            pool_maxsize=Config.API_POOL_MAXSIZE,
+            pool_block=Config.API_POOL_BLOCK,
+            max_retries=Config.API_MAX_RETRIES
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        
+        if Config.API_KEEP_ALIVE:
+            session.headers["Connection"] = "keep-alive"
+        else:
+            session.headers["Connection"] = "close"
+        
+        return session
+    
+    @classmethod
+    def close_session(cls):
+        """Закрыть общую сессию (при выходе из приложения)"""
+        with cls._session_lock:
+            if cls._session is not None:
+                cls._session.close()
+                cls._session = None
+        with cls._clients_lock:
+            cls._clients.clear()
     
     def _get_headers(self):
         return {"X-API-Key": self.api_key}
@@ -16,7 +97,7 @@ class VoiceAPIClient:
     def check_balance(self):
         """Проверить баланс"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/balance",
                 headers=self._get_headers(),
                 timeout=10
@@ -32,7 +113,7 @@ class VoiceAPIClient:
     def get_templates(self):
         """Получить список шаблонов"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/templates",
                 headers=self._get_headers(),
                 timeout=10
@@ -56,7 +137,7 @@ class VoiceAPIClient:
             data["chunk_size"] = chunk_size
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/tasks",
                 headers=self._get_headers(),
                 json=data,
@@ -72,24 +153,72 @@ class VoiceAPIClient:
     
     def get_task_status(self, task_id):
         """Получить статус задачи"""
+        success, status_data, _ = self._fetch_status(task_id)
+        return success, status_data
+    
+    def _fetch_status(self, task_id):
+        """Статус задачи и подсказка Retry-After: (success, data, retry_after)"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/tasks/{task_id}/status",
                 headers=self._get_headers(),
                 timeout=10
             )
             
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            
             if response.status_code == 200:
-                return True, response.json()
+                return True, response.json(), retry_after
             else:
-                return False, None
+                return False, None, retry_after
         except Exception as e:
-            return False, None
+            return False, None, None
+    
+    def _fetch_status_batch(self, task_ids):
+        """
+        Статусы нескольких задач одним запросом.
+        
+        Возвращает (supported, {task_id: status_data}, retry_after):
+        supported=True - ответ 200 с разобранным телом, False - сервер
+        не знает пакетный эндпоинт (404/405/501), None - запрос не удался
+        (другой код, сетевая ошибка, непонятное тело).
+        """
+        try:
+            response = self.session.post(
+                f"{self.base_url}/tasks/status",
+                headers=self._get_headers(),
+                json={"task_ids": list(task_ids)},
+                timeout=10
+            )
+            
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            
+            if response.status_code in (404, 405, 501):
+                return False, {}, None
+            
+            if response.status_code != 200:
+                return None, {}, retry_after
+            
+            data = response.json()
+            if isinstance(data, dict) and "tasks" in data:
+                data = data["tasks"]
+            
+            # Ответ: список статусов с task_id или словарь {task_id: статус}
+            if isinstance(data, list):
+                statuses = {str(item.get("task_id")): item for item in data if isinstance(item, dict)}
+            elif isinstance(data, dict):
+                statuses = {str(key): value for key, value in data.items() if isinstance(value, dict)}
+            else:
+                return None, {}, retry_after
+            
+            return True, statuses, retry_after
+        except Exception as e:
+            return None, {}, None
     
     def get_task_result(self, task_id):
         """Получить результат задачи"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/tasks/{task_id}/result",
                 headers=self._get_headers(),
                 timeout=60
@@ -102,24 +231,354 @@ class VoiceAPIClient:
         except Exception as e:
             return False, None
     
-    def wait_for_task(self, task_id, max_attempts=300, callback=None):
-        """Ждать выполнения задачи"""
+    def download_task_result(self, task_id, output_folder, basename, ext=None, unique=False,
+                             should_stop=None):
+        """
+        Скачать результат задачи потоком прямо на диск.
+        
+        Данные пишутся во временный .part файл, формат определяется по первым
+        байтам (если ext не задан), затем файл атомарно переименовывается в
+        basename + ext. При обрыве связи загрузка продолжается через Range.
+        unique=True - не перезаписывать существующий файл (добавить время).
+        should_stop() прерывает загрузку между блоками.
+        Возвращает (success, путь к файлу или None).
+        """
+        url = f"{self.base_url}/tasks/{task_id}/result"
+        part_path = os.path.join(output_folder, f".{basename}.{task_id}.part")
+        written = 0
+        head = b""
+        
+        for attempt in range(Config.DOWNLOAD_MAX_RESUMES + 1):
+            headers = self._get_headers()
+            if written:
+                headers["Range"] = f"bytes={written}-"
+            
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=(10, 60)) as response:
+                    if response.status_code == 206 and written:
+                        mode = 'ab'
+                    elif response.status_code == 200:
+                        # Сервер не поддерживает Range - начинаем заново
+                        mode = 'wb'
+                        written = 0
+                        head = b""
+                    else:
+                        self._remove_part(part_path)
+                        return False, None
+                    
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=Config.DOWNLOAD_CHUNK_SIZE):
+                            if not chunk:
+                                continue
+                            if should_stop and should_stop():
+                                raise _DownloadCancelled()
+                            if len(head) < 16:
+                                head += chunk[:16 - len(head)]
+                            f.write(chunk)
+                            written += len(chunk)
+                break
+            except _DownloadCancelled:
+                self._remove_part(part_path)
+                return False, None
+            except requests.exceptions.RequestException as e:
+                print(f"[DEBUG] Обрыв загрузки {task_id} на {written} байт: {e}")
+                if attempt == Config.DOWNLOAD_MAX_RESUMES:
+                    self._remove_part(part_path)
+                    return False, None
+            except Exception as e:
+                print(f"[ERROR] Загрузка {task_id}: {e}")
+                self._remove_part(part_path)
+                return False, None
+        
+        if not written:
+            self._remove_part(part_path)
+            return False, None
+        
+        ext = ext or self.sniff_extension(head)
+        output_file = os.path.join(output_folder, f"{basename}{ext}")
+        
+        if unique and os.path.exists(output_file):
+            timestamp = int(time.time())
+            output_file = os.path.join(output_folder, f"{basename}_{timestamp}{ext}")
+        
+        os.replace(part_path, output_file)
+        return True, output_file
+    
+    @staticmethod
+    def sniff_extension(head):
+        """Расширение результата по первым байтам: ZIP с чанками или MP3"""
+        return ".zip" if b'PK' in head[:10] else ".mp3"
+    
+    @staticmethod
+    def _remove_part(part_path):
+        try:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        except OSError:
+            pass
+    
+    def wait_for_task(self, task_id, max_attempts=300, callback=None,
+                      text_length=None, timeout=None, should_stop=None):
+        """
+        Ждать выполнения задачи.
+        
+        Пауза между запросами подбирается AdaptivePoller по длине текста,
+        истории и подсказкам сервера. timeout по умолчанию - max_attempts секунд.
+        callback(status, status_data, elapsed_seconds)
+        should_stop() - отмена ожидания, результат (False, "cancelled")
+        """
+        poller = AdaptivePoller(text_length)
+        timeout = timeout if timeout is not None else max_attempts
+        delay = poller.first_delay()
+        
         for attempt in range(max_attempts):
-            time.sleep(1)
+            remaining = timeout - poller.elapsed()
+            if remaining <= 0:
+                break
+            if _sleep(min(delay, remaining), should_stop):
+                return False, "cancelled"
             
-            success, status_data = self.get_task_status(task_id)
+            success, status_data, retry_after = self._fetch_status(task_id)
             
             if not success:
+                delay = poller.next_delay(retry_after=retry_after)
                 continue
             
             status = status_data.get("status")
             
             if callback:
-                callback(status, status_data, attempt + 1)
+                callback(status, status_data, int(poller.elapsed()))
             
             if status == "ending":
+                poller.record_completion()
                 return True, "completed"
             elif status == "error":
                 return False, "error"
+            
+            delay = poller.next_delay(status_data, retry_after)
         
         return False, "timeout"
+
+
+def _due_at(delay):
+    """
+    Срок следующего опроса, округлённый вверх до общего тика
+    (POLL_MIN_DELAY): сроки задач с разбросом задержек совпадают,
+    и они попадают в один пакетный запрос.
+    """
+    tick = Config.POLL_MIN_DELAY
+    return math.ceil((time.monotonic() + delay) / tick) * tick
+
+
+class _TrackedTask:
+    """Задача, статус которой отслеживает StatusAggregator"""
+    
+    def __init__(self, task_id, text_length, max_attempts, callback):
+        self.task_id = task_id
+        self.poller = AdaptivePoller(text_length)
+        self.next_due = _due_at(self.poller.first_delay())
+        self.attempts = 0
+        self.max_attempts = max_attempts
+        self.callback = callback
+        self.result = None
+        self.done = threading.Event()
+
+
+class StatusAggregator:
+    """
+    Общий опрос статусов для многих задач.
+    
+    Фоновый поток раз в тик собирает задачи, которым пора обновиться, и
+    запрашивает их одним пакетным запросом (если сервер поддерживает),
+    иначе - параллельным проходом по общему пулу соединений. Результаты
+    раздаются ожидающим потокам через wait().
+    
+    Пакетный эндпоинт считается рабочим только после ответа 200, в
+    котором есть все запрошенные задачи; любой другой первый ответ
+    переключает на опрос по одной задаче. Задачи, которых нет в
+    очередном пакетном ответе, опрашиваются по одной в том же проходе,
+    а после BATCH_FAILURE_LIMIT неудачных ответов подряд пакетный
+    запрос больше не используется.
+    """
+    
+    BATCH_FAILURE_LIMIT = 3
+    
+    def __init__(self, api, batch_size=None, sweep_workers=None):
+        self.api = api
+        self.batch_size = batch_size or Config.STATUS_BATCH_SIZE
+        self.sweep_workers = sweep_workers or Config.API_POOL_MAXSIZE
+        self._batch_supported = None
+        self._batch_failures = 0
+        self._tasks = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._executor = None
+    
+    def start(self):
+        """Запустить фоновый опрос"""
+        with self._cond:
+            if self._thread is None:
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return self
+    
+    def stop(self):
+        """Остановить опрос; ожидающие получат timeout"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            thread = self._thread
+            self._thread = None
+        
+        if thread:
+            thread.join(timeout=5)
+        
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        
+        with self._cond:
+            for task in list(self._tasks.values()):
+                self._finish(task, False, "timeout")
+            self._tasks.clear()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+    
+    def wait(self, task_id, max_attempts=300, callback=None, text_length=None,
+             timeout=None, should_stop=None):
+        """Ждать задачу - тот же контракт, что у VoiceAPIClient.wait_for_task"""
+        task_id = str(task_id)
+        task = _TrackedTask(task_id, text_length, max_attempts, callback)
+        timeout = timeout if timeout is not None else max_attempts
+        deadline = time.monotonic() + timeout
+        
+        with self._cond:
+            self._tasks[task_id] = task
+            self._cond.notify_all()
+        self.start()
+        
+        while not task.done.wait(min(0.2, max(0.0, deadline - time.monotonic()))):
+            cancelled = bool(should_stop and should_stop())
+            if cancelled or time.monotonic() >= deadline:
+                with self._cond:
+                    self._tasks.pop(task_id, None)
+                return False, "cancelled" if cancelled else "timeout"
+        
+        return task.result
+    
+    def _run(self):
+        """Цикл опроса"""
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                
+                now = time.monotonic()
+                if not any(t.next_due <= now for t in self._tasks.values()):
+                    due = []
+                else:
+                    # Раз запрос всё равно уходит - забираем и задачи,
+                    # чей срок наступит в пределах тика
+                    window = now + Config.POLL_MIN_DELAY
+                    due = [t for t in self._tasks.values() if t.next_due <= window]
+                
+                if not due:
+                    # Спим до ближайшего срока или новой задачи
+                    wake = min((t.next_due for t in self._tasks.values()), default=None)
+                    self._cond.wait(None if wake is None else wake - now)
+                    continue
+            
+            try:
+                self._sweep(due)
+            except Exception as e:
+                print(f"[ERROR] Опрос статусов: {e}")
+                with self._cond:
+                    for task in due:
+                        task.next_due = _due_at(task.poller.next_delay())
+    
+    def _sweep(self, tasks):
+        """Обновить статусы задач за один проход"""
+        results = {}
+        
+        if self._batch_supported is not False:
+            for start in range(0, len(tasks), self.batch_size):
+                chunk = tasks[start:start + self.batch_size]
+                supported, statuses, retry_after = self.api._fetch_status_batch(
+                    [t.task_id for t in chunk])
+                covered = supported is True and all(t.task_id in statuses for t in chunk)
+                
+                for task in chunk:
+                    data = statuses.get(task.task_id)
+                    if data is not None:
+                        results[task.task_id] = (True, data, retry_after)
+                
+                if covered:
+                    self._batch_supported = True
+                    self._batch_failures = 0
+                elif supported is False or self._batch_supported is None:
+                    print("[DEBUG] Пакетный запрос статусов недоступен - опрос по одной задаче")
+                    self._batch_supported = False
+                    break
+                else:
+                    self._batch_failures += 1
+                    if self._batch_failures >= self.BATCH_FAILURE_LIMIT:
+                        print("[ERROR] Пакетный запрос статусов не отвечает - опрос по одной задаче")
+                        self._batch_supported = False
+                        break
+        
+        # Задачи без пакетного ответа - параллельные запросы по общему пулу
+        pending = [t for t in tasks if t.task_id not in results]
+        if pending:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(max_workers=self.sweep_workers)
+            
+            fetched = self._executor.map(self.api._fetch_status, [t.task_id for t in pending])
+            for task, result in zip(pending, fetched):
+                results[task.task_id] = result
+        
+        for task in tasks:
+            success, status_data, retry_after = results.get(task.task_id, (False, None, None))
+            self._apply(task, success, status_data, retry_after)
+    
+    def _apply(self, task, success, status_data, retry_after):
+        """Раздать результат опроса ожидающему"""
+        task.attempts += 1
+        
+        if success:
+            status = status_data.get("status")
+            
+            if task.callback:
+                task.callback(status, status_data, int(task.poller.elapsed()))
+            
+            if status == "ending":
+                task.poller.record_completion()
+                self._finish(task, True, "completed")
+                return
+            elif status == "error":
+                self._finish(task, False, "error")
+                return
+            
+            delay = task.poller.next_delay(status_data, retry_after)
+        else:
+            delay = task.poller.next_delay(retry_after=retry_after)
+        
+        if task.attempts >= task.max_attempts:
+            self._finish(task, False, "timeout")
+            return
+        
+        with self._cond:
+            task.next_due = _due_at(delay)
+    
+    def _finish(self, task, success, result):
+        """Завершить ожидание задачи"""
+        task.result = (success, result)
+        with self._cond:
+            self._tasks.pop(task.task_id, None)
+        task.done.set()
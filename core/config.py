@@ -11,6 +11,50 @@ class Config:
     # API
     API_BASE_URL = "https://voiceapi.csv666.ru"
     
+    # Пул HTTP-соединений к API
+    API_POOL_CONNECTIONS = 4    # Число хостов в пуле
+    API_POOL_MAXSIZE = 16       # Соединений на один хост
+    API_POOL_BLOCK = False      # Ждать свободное соединение вместо создания лишнего
+    API_KEEP_ALIVE = True
+    API_MAX_RETRIES = 2         # Повторы при обрыве соединения
+    
+    # Адаптивный опрос статуса задач
+    POLL_MIN_DELAY = 0.5            # Минимальная пауза между запросами (сек)
+    POLL_MAX_DELAY = 15.0           # Максимальная пауза (сек)
+    POLL_BASE_LATENCY = 3.0         # Накладные расходы сервера на задачу (сек)
+    POLL_SECONDS_PER_CHAR = 0.03    # Начальная оценка скорости синтеза
+    POLL_HISTORY_WEIGHT = 0.2       # Вес нового наблюдения в истории
+    STATUS_BATCH_SIZE = 50          # Задач в одном пакетном запросе статуса
+    
+    # Загрузка результатов
+    DOWNLOAD_CHUNK_SIZE = 256 * 1024    # Размер блока при записи на диск
+    DOWNLOAD_MAX_RESUMES = 3            # Докачек через Range после обрыва
+    
+    # FFmpeg (None - искать в PATH или в imageio-ffmpeg)
+    FFMPEG_BINARY = None
+    FFPROBE_BINARY = None
+    FFMPEG_AUDIO_BITRATE = "192k"
+    FFMPEG_MP3_BITRATE = "192k"
+    FIT_TOLERANCE = 0.1                 # Допустимая разница длительностей без ускорения (сек)
+    
+    # Пакетная обработка видео
+    BATCH_MAX_WORKERS = None            # None - по числу ядер
+    BATCH_MIN_THREADS_PER_JOB = 2       # Потоков кодировщика на процесс не меньше
+    
+    # Монтаж (перекодирование клипов, не совпадающих по формату)
+    MONTAGE_PRESET = "medium"
+    MONTAGE_CRF = 20
+    MONTAGE_SEGMENT_MIN_CLIPS = 8       # С этого числа клипов переходы рендерятся по сегментам
+    MONTAGE_INCREMENTAL = True          # Хранить сегменты между запусками и пересобирать только изменённое
+    
+    # Снимки папок перед переименованием (_backup_<время>)
+    BACKUP_KEEP = 5                     # Сколько последних снимков хранить в папке
+    
+    # Слежение за папками открытого проекта
+    WATCH_USE_INOTIFY = True            # На Linux - события ядра, иначе опрос
+    WATCH_POLL_INTERVAL = 2.0           # Период опроса папок, сек
+    CATALOG_FLUSH_DELAY = 2.0           # Изменения папок копятся до записи в каталог, сек
+    
     # Файлы
     CONFIG_FILE = "app_config.json"
     
@@ -19,6 +63,21 @@ class Config:
     DEFAULT_OUTPUT_VIDEO = os.path.join(os.getcwd(), "output_video")
     DEFAULT_PROJECTS_FOLDER = os.path.join(os.getcwd(), "projects")
     
+    # Кэш результатов озвучивания
+    CACHE_FOLDER = os.path.join(os.getcwd(), "synthesis_cache")
+    CACHE_MAX_SIZE_MB = 2048
+    
+    # Сегменты инкрементального монтажа (папка на каждый итоговый файл)
+    MONTAGE_CACHE_FOLDER = os.path.join(os.getcwd(), "montage_cache")
+    MONTAGE_CACHE_MAX_SIZE_MB = 4096    # Папки давних монтажей сверх объёма удаляются
+    
+    # Кэш сведений о медиафайлах (длительность, кодеки, разрешение)
+    MEDIA_INFO_CACHE = os.path.join(os.getcwd(), "media_info_cache.json")
+    MEDIA_INFO_CACHE_MAX_ENTRIES = 20000
+    
+    # Каталог проектов (SQLite, локально - не в папке проектов на сетевом диске)
+    PROJECT_CATALOG = os.path.join(os.getcwd(), "project_catalog.db")
+    
     # Цветовая схема (темная тема)
     COLORS = {
         'bg': '#202222',
@@ -38,5 +97,7 @@ class Config:
     
     # Настройки по умолчанию
     DEFAULT_CHUNK_SIZE = 1000
+    MAX_CONCURRENT_TASKS = 4            # Задач в работе одновременно (построчно)
+    SERVER_MAX_CONCURRENT_TASKS = 10    # Лимит сервера на параллельные задачи
     DEFAULT_PREVIEW_TEXT = "Привет! Это пример моего голоса."
     AUTO_LOAD_DELAY = 500
@@ -0,0 +1,142 @@
+# core/job_runner.py
+"""Фоновые задачи с доставкой событий в поток интерфейса"""
+
+import queue
+import threading
+
+
+class CancelToken:
+    """Флаг отмены, который проверяют долгие операции"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """Запросить отмену"""
+        self._event.set()
+
+    def is_cancelled(self):
+        """Запрошена ли отмена"""
+        return self._event.is_set()
+
+    def sleep(self, seconds):
+        """Пауза, прерываемая отменой; True если отменено"""
+        return self._event.wait(seconds)
+
+
+class Job:
+    """Фоновая задача: токен отмены и отправка событий в интерфейс"""
+
+    def __init__(self, runner, name):
+        self.runner = runner
+        self.name = name
+        self.token = CancelToken()
+        self.thread = None
+        self._on_progress = None
+
+    def report(self, *payload):
+        """Передать прогресс в on_progress (выполнится в потоке интерфейса)"""
+        if self._on_progress:
+            self.runner.call_in_ui(self._on_progress, *payload)
+
+    def call_in_ui(self, func, *args):
+        """Выполнить функцию в потоке интерфейса"""
+        self.runner.call_in_ui(func, *args)
+
+    def cancel(self):
+        self.token.cancel()
+
+    def is_cancelled(self):
+        return self.token.is_cancelled()
+
+    def is_alive(self):
+        return bool(self.thread and self.thread.is_alive())
+
+
+class JobRunner:
+    """
+    Запуск долгих операций в рабочих потоках.
+
+    Рабочие потоки не трогают Tk: события складываются в потокобезопасную
+    очередь, которую поток интерфейса разбирает через root.after.
+    """
+
+    def __init__(self, root, poll_interval=50):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._events = queue.Queue()
+        self._jobs = []
+        self._lock = threading.Lock()
+        self._draining = False
+
+    def submit(self, func, *args, on_progress=None, on_done=None, on_error=None, name=None):
+        """
+        Запустить func(job, *args) в фоне.
+
+        on_progress(*payload) - на каждый job.report, on_done(result) - по
+        завершении, on_error(exception) - при исключении; все в потоке Tk.
+        """
+        job = Job(self, name or getattr(func, '__name__', 'job'))
+        job._on_progress = on_progress
+
+        def target():
+            try:
+                result = func(job, *args)
+            except Exception as e:
+                print(f"[ERROR] Задача {job.name}: {e}")
+                if on_error:
+                    self.call_in_ui(on_error, e)
+            else:
+                if on_done:
+                    self.call_in_ui(on_done, result)
+            finally:
+                with self._lock:
+                    if job in self._jobs:
+                        self._jobs.remove(job)
+
+        job.thread = threading.Thread(target=target, name=job.name, daemon=True)
+
+        with self._lock:
+            self._jobs.append(job)
+        job.thread.start()
+
+        self._schedule_drain()
+        return job
+
+    def call_in_ui(self, func, *args):
+        """Поставить вызов в очередь потока интерфейса"""
+        self._events.put((func, args))
+
+    def active_jobs(self):
+        """Список выполняющихся задач"""
+        with self._lock:
+            return list(self._jobs)
+
+    def cancel_all(self):
+        """Отменить все задачи"""
+        for job in self.active_jobs():
+            job.cancel()
+
+    def _schedule_drain(self):
+        if not self._draining:
+            self._draining = True
+            self.root.after(self.poll_interval, self._drain)
+
+    def _drain(self):
+        """Разобрать очередь событий (поток Tk)"""
+        while True:
+            try:
+                func, args = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"[ERROR] Обработка события: {e}")
+
+        # Пока есть задачи или события - продолжаем опрос
+        if self.active_jobs() or not self._events.empty():
+            self.root.after(self.poll_interval, self._drain)
+        else:
+            self._draining = False
@@ -0,0 +1,21 @@
+# core/lazy.py
+"""Ленивые экспорты пакетов: модуль импортируется при первом обращении к имени"""
+
+import sys
+from importlib import import_module
+
+
+def lazy_exports(package, exports):
+    """
+    __getattr__ для __init__.py пакета (PEP 562).
+    exports - {имя: относительный модуль}; найденное имя сохраняется
+    в пакете, и следующие обращения идут мимо __getattr__.
+    """
+    def __getattr__(name):
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(import_module(module_name, package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+    return __getattr__
@@ -0,0 +1,130 @@
+# core/polling.py
+"""Адаптивный опрос статуса задач"""
+
+import random
+import threading
+import time
+from .config import Config
+
+# Статусы, при которых задача ещё стоит в очереди
+QUEUED_STATUSES = ("queued", "waiting", "pending", "new", "created")
+
+# Предел показателя степени: дальше задержка всё равно упирается в POLL_MAX_DELAY,
+# а 1.5 ** n при n > ~1750 даёт OverflowError
+MAX_BACKOFF_EXPONENT = 16
+
+
+class AdaptivePoller:
+    """Расчёт паузы до следующего запроса статуса задачи"""
+
+    # Наблюдаемая скорость сервера (сек/символ), общая для всех задач
+    _seconds_per_char = Config.POLL_SECONDS_PER_CHAR
+    _history_lock = threading.Lock()
+
+    def __init__(self, text_length=None, clock=time.monotonic):
+        self.text_length = text_length or 0
+        self.clock = clock
+        self.started = clock()
+        self.queued_polls = 0
+        self.overdue_polls = 0
+
+    @classmethod
+    def seconds_per_char(cls):
+        """Текущая оценка скорости сервера"""
+        with cls._history_lock:
+            return cls._seconds_per_char
+
+    def elapsed(self):
+        """Секунд с начала ожидания"""
+        return self.clock() - self.started
+
+    def expected_duration(self):
+        """Ожидаемое время выполнения задачи по длине текста и истории"""
+        return Config.POLL_BASE_LATENCY + self.text_length * self.seconds_per_char()
+
+    def record_completion(self):
+        """Учесть фактическое время выполнения в истории (скользящее среднее)"""
+        if self.text_length <= 0:
+            return
+
+        observed = max(0.0, self.elapsed() - Config.POLL_BASE_LATENCY) / self.text_length
+        cls = type(self)
+        with cls._history_lock:
+            alpha = Config.POLL_HISTORY_WEIGHT
+            cls._seconds_per_char = (1 - alpha) * cls._seconds_per_char + alpha * observed
+
+    def first_delay(self):
+        """Пауза перед первым запросом"""
+        return self._clamp(self.expected_duration() * 0.5)
+
+    def next_delay(self, status_data=None, retry_after=None):
+        """Пауза перед следующим запросом с учётом подсказок сервера"""
+        # Сервер сам сказал, когда спрашивать
+        hint = retry_after
+        if hint is None and status_data:
+            hint = status_data.get("retry_after") or status_data.get("poll_after")
+        if hint is not None:
+            try:
+                return self._clamp(float(hint))
+            except (TypeError, ValueError):
+                pass
+
+        status = (status_data or {}).get("status")
+        elapsed = self.elapsed()
+
+        # Задача в очереди - экспоненциальная задержка с разбросом
+        if status in QUEUED_STATUSES:
+            self.queued_polls += 1
+            delay = Config.POLL_MIN_DELAY * (2 ** min(self.queued_polls, MAX_BACKOFF_EXPONENT))
+            return self._clamp(random.uniform(0.5, 1.0) * delay)
+
+        # Сервер сообщает прогресс - оцениваем остаток по нему
+        progress = self._parse_progress(status_data)
+        if progress:
+            remaining = elapsed * (1 - progress) / progress
+            return self._clamp(remaining * 0.5)
+
+        # Оценка по длине текста: чем ближе к ожидаемому концу, тем чаще
+        remaining = self.expected_duration() - elapsed
+        if remaining > 0:
+            return self._clamp(remaining * 0.5)
+
+        # Задача задерживается - плавно увеличиваем интервал
+        self.overdue_polls += 1
+        delay = Config.POLL_MIN_DELAY * (1.5 ** min(self.overdue_polls, MAX_BACKOFF_EXPONENT))
+        return self._clamp(random.uniform(0.8, 1.2) * delay)
+
+    @staticmethod
+    def _parse_progress(status_data):
+        """Прогресс задачи 0..1 (если сервер его передаёт)"""
+        if not status_data:
+            return None
+
+        value = status_data.get("progress")
+        if value is None:
+            return None
+
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+
+        if value > 1:
+            value /= 100.0
+        if 0 < value < 1:
+            return value
+        return None
+
+    @staticmethod
+    def _clamp(delay):
+        return max(Config.POLL_MIN_DELAY, min(delay, Config.POLL_MAX_DELAY))
+
+
+def parse_retry_after(value):
+    """Заголовок Retry-After в секундах (только числовая форма)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,231 @@
+# core/result_cache.py
+"""Кэш результатов озвучивания на диске"""
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import threading
+import unicodedata
+from .config import Config
+
+
+class SynthesisCache:
+    """
+    Кэш готовых аудио по (шаблон, текст, размер чанка).
+
+    Файлы лежат в Config.CACHE_FOLDER под именем хэша ключа, индекс с
+    размерами и временем доступа - в index.json. При превышении лимита
+    удаляются давно не использованные записи (LRU).
+
+    Индекс меняется в памяти и пишется на диск через flush - один раз
+    после пакета строк, а не на каждое попадание. Папку могут делить
+    несколько процессов (интерфейс и консольный запуск), поэтому перед
+    записью индекс сливается с версией на диске, а файлы кэша без записи
+    в индексе снова учитываются - лимит размера касается всех файлов.
+    """
+
+    INDEX_FILE = "index.json"
+    FILE_PATTERN = re.compile(r'^([0-9a-f]{64})(\.\w+)?$')
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, folder=None, max_size_mb=None):
+        self.folder = folder or Config.CACHE_FOLDER
+        self.max_size = int((max_size_mb or Config.CACHE_MAX_SIZE_MB) * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index = {}
+        self._dirty = False
+
+        os.makedirs(self.folder, exist_ok=True)
+        self._index = self._read_index()
+
+    @classmethod
+    def get_default(cls):
+        """Общий кэш приложения (несохранённый индекс пишется при выходе)"""
+        with cls._default_lock:
+            if cls._default is None:
+                import atexit
+                cls._default = cls()
+                atexit.register(cls._default.flush)
+            return cls._default
+
+    @staticmethod
+    def normalize_text(text):
+        """Нормализация строки: Unicode NFC и схлопывание пробелов"""
+        text = unicodedata.normalize("NFC", text or "")
+        return re.sub(r'\s+', ' ', text).strip()
+
+    @classmethod
+    def make_key(cls, template_uuid, text, chunk_size=None):
+        """Ключ кэша - хэш шаблона, нормализованного текста и размера чанка"""
+        payload = json.dumps([template_uuid, cls.normalize_text(text), chunk_size or None],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def lookup(self, template_uuid, text, chunk_size=None):
+        """Путь к закэшированному файлу или None"""
+        key = self.make_key(template_uuid, text, chunk_size)
+
+        with self._lock:
+            entry = self._index.get(key)
+            path = os.path.join(self.folder, entry['file']) if entry else None
+
+            if not path or not os.path.exists(path):
+                if entry:
+                    del self._index[key]
+                self.misses += 1
+                return None
+
+            entry['atime'] = time.time()
+            self.hits += 1
+            self._dirty = True
+            return path
+
+    def restore(self, template_uuid, text, chunk_size, output_folder, basename,
+                ext=None, unique=False):
+        """
+        Скопировать результат из кэша в папку вывода.
+        Возвращает (success, путь к файлу или None).
+        """
+        cached = self.lookup(template_uuid, text, chunk_size)
+        if not cached:
+            return False, None
+
+        ext = ext or os.path.splitext(cached)[1]
+        output_file = os.path.join(output_folder, f"{basename}{ext}")
+
+        if unique and os.path.exists(output_file):
+            timestamp = int(time.time())
+            output_file = os.path.join(output_folder, f"{basename}_{timestamp}{ext}")
+
+        try:
+            temp_file = output_file + ".part"
+            shutil.copyfile(cached, temp_file)
+            os.replace(temp_file, output_file)
+            return True, output_file
+        except OSError as e:
+            print(f"[ERROR] Кэш: {e}")
+            return False, None
+
+    def store(self, template_uuid, text, chunk_size, source_file):
+        """Положить файл результата в кэш"""
+        key = self.make_key(template_uuid, text, chunk_size)
+        ext = os.path.splitext(source_file)[1] or ".mp3"
+        filename = f"{key}{ext}"
+        path = os.path.join(self.folder, filename)
+
+        try:
+            temp_file = f"{path}.{threading.get_ident()}.part"
+            shutil.copyfile(source_file, temp_file)
+            os.replace(temp_file, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"[ERROR] Кэш: {e}")
+            return False
+
+        with self._lock:
+            self._index[key] = {'file': filename, 'size': size, 'atime': time.time()}
+            self._evict()
+            self._dirty = True
+
+        return True
+
+    def flush(self):
+        """Записать индекс, если он менялся (слив с индексом на диске)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._merge_disk()
+            self._evict()
+            self._save_index()
+            self._dirty = False
+
+    def stats(self):
+        """Статистика кэша"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._index),
+                'size_bytes': sum(e['size'] for e in self._index.values())
+            }
+
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            self._merge_disk()
+            for entry in self._index.values():
+                self._remove_file(entry['file'])
+            self._index.clear()
+            self._save_index()
+            self._dirty = False
+
+    def _evict(self):
+        """Удалить давно не использованные записи сверх лимита"""
+        total = sum(e['size'] for e in self._index.values())
+        if total <= self.max_size:
+            return
+
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]['atime']):
+            if total <= self.max_size:
+                break
+            self._remove_file(entry['file'])
+            total -= entry['size']
+            del self._index[key]
+
+    def _remove_file(self, filename):
+        try:
+            os.remove(os.path.join(self.folder, filename))
+        except OSError:
+            pass
+
+    def _read_index(self):
+        index_path = os.path.join(self.folder, self.INDEX_FILE)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def _merge_disk(self):
+        """
+        Добавить записи других процессов и файлы папки без записи в индексе.
+        Для общих записей остаётся последнее время доступа.
+        """
+        disk = self._read_index()
+        for key, entry in disk.items():
+            ours = self._index.get(key)
+            if ours is not None:
+                ours['atime'] = max(ours['atime'], entry.get('atime', 0))
+            elif os.path.exists(os.path.join(self.folder, entry.get('file', ''))):
+                self._index[key] = entry
+
+        try:
+            with os.scandir(self.folder) as items:
+                for item in items:
+                    match = self.FILE_PATTERN.match(item.name)
+                    if not match or match.group(1) in self._index:
+                        continue
+                    stat = item.stat()
+                    self._index[match.group(1)] = {
+                        'file': item.name, 'size': stat.st_size, 'atime': stat.st_mtime}
+        except OSError as e:
+            print(f"[ERROR] Кэш: {e}")
+
+    def _save_index(self):
+        index_path = os.path.join(self.folder, self.INDEX_FILE)
+        # Своё временное имя у каждого процесса: параллельные записи не мешают друг другу
+        temp_path = f"{index_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f)
+            os.replace(temp_path, index_path)
+        except OSError as e:
+            print(f"[ERROR] Индекс кэша: {e}")
@@ -40,8 +40,10 @@ class SettingsManager:
             "disable_chunks": True,
             "mode": "full",
             "end_pause": 0.0,
+            "max_concurrent_tasks": Config.MAX_CONCURRENT_TASKS,
             "adjust_speed": False,
             "target_duration": 8.0,
+            "preserve_pitch": False,
             "keep_original_audio": False,
             "original_volume": 30,
             "video_fit_mode": "fit",
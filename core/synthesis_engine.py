@@ -0,0 +1,191 @@
+# core/synthesis_engine.py
+"""Параллельное построчное озвучивание"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .config import Config
+from .api_client import StatusAggregator
+
+
+class LineSynthesisEngine:
+    """Планировщик: держит N задач на сервере одновременно"""
+
+    def __init__(self, api, template_uuid, output_folder, chunk_size=None,
+                 max_in_flight=None, postprocess=None, max_attempts=120, cache=None,
+                 journal=None):
+        self.api = api
+        self.template_uuid = template_uuid
+        self.output_folder = output_folder
+        self.chunk_size = chunk_size
+        self.max_in_flight = self.clamp_in_flight(max_in_flight)
+        self.postprocess = postprocess
+        self.max_attempts = max_attempts
+        self.cache = cache
+        self.cache_hits = 0
+        self.journal = journal
+        self.resumed = 0
+        self._should_stop = None
+        self._aggregator = None
+
+    @staticmethod
+    def clamp_in_flight(value):
+        """Ограничить число параллельных задач лимитом сервера"""
+        try:
+            value = int(value or Config.MAX_CONCURRENT_TASKS)
+        except (TypeError, ValueError):
+            value = Config.MAX_CONCURRENT_TASKS
+        return max(1, min(value, Config.SERVER_MAX_CONCURRENT_TASKS))
+
+    def is_stopped(self):
+        """Запрошена ли остановка"""
+        return bool(self._should_stop and self._should_stop())
+
+    def run(self, lines, on_progress=None, should_stop=None, idle=None):
+        """
+        Озвучить строки, сохраняя {i}.mp3 по мере готовности.
+
+        on_progress(done, total, index, success, message) и idle() вызываются
+        в потоке, который вызвал run; should_stop() проверяется и при
+        ожидании задач на сервере.
+        Если задан журнал, уже готовые по нему строки пропускаются.
+        Возвращает (completed, errors).
+        """
+        self._should_stop = should_stop
+        total = len(lines)
+        errors = {}
+
+        # Строки, готовые в прошлом запуске
+        skipped = set()
+        if self.journal:
+            skipped = {i for i in range(1, total + 1) if self.journal.is_done(i)}
+        self.resumed = len(skipped)
+        completed = len(skipped)
+        done_count = len(skipped)
+
+        if on_progress and skipped:
+            on_progress(done_count, total, max(skipped), True, "из журнала")
+
+        # Статусы всех задач в работе опрашиваются общим проходом
+        self._aggregator = StatusAggregator(self.api) if self.max_in_flight > 1 else None
+
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        try:
+            futures = {
+                executor.submit(self._synthesize_line, i, line): i
+                for i, line in enumerate(lines, 1)
+                if i not in skipped
+            }
+            pending = set(futures)
+
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    i = futures[future]
+                    if future.cancelled():
+                        continue
+
+                    try:
+                        success, message = future.result()
+                    except Exception as e:
+                        success, message = False, str(e)
+                        print(f"Ошибка озвучивания строки {i}: {e}")
+
+                    if success is None:
+                        # Строка пропущена из-за остановки
+                        continue
+
+                    done_count += 1
+                    if success:
+                        completed += 1
+                    else:
+                        errors[i] = f"Строка {i}: {message}"
+
+                    if on_progress:
+                        on_progress(done_count, total, i, success, message)
+
+                if self.is_stopped():
+                    # Не начатые строки отменяем, запущенные завершатся сами
+                    for future in pending:
+                        future.cancel()
+
+                if idle:
+                    idle()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if self._aggregator:
+                self._aggregator.stop()
+                self._aggregator = None
+            if self.cache:
+                self.cache.flush()
+
+        if self.journal and not self.is_stopped() and completed == total:
+            self.journal.record_finished()
+
+        return completed, [errors[i] for i in sorted(errors)]
+
+    def _synthesize_line(self, i, line):
+        """Озвучить одну строку (выполняется в рабочем потоке)"""
+        success, message = self._process_line(i, line)
+
+        if self.journal and success is not None:
+            if success:
+                self.journal.record_done(i, message)
+            else:
+                self.journal.record_error(i, message)
+
+        return success, message
+
+    def _process_line(self, i, line):
+        """Кэш, задача на сервере, загрузка и постобработка строки"""
+        if self.is_stopped():
+            return None, "Остановлено"
+
+        # Неизменённые строки берём из кэша без запроса к API
+        if self.cache:
+            success, output_file = self.cache.restore(
+                self.template_uuid, line, self.chunk_size, self.output_folder, str(i), ext=".mp3")
+            if success:
+                self.cache_hits += 1
+                if self.postprocess:
+                    self.postprocess(output_file)
+                return True, output_file
+
+        # Задача прошлого запуска ещё есть на сервере - подхватываем её
+        task_id = self.journal.pending_task_id(i) if self.journal else None
+        if task_id and not self.api.get_task_status(task_id)[0]:
+            task_id = None
+
+        if not task_id:
+            success, result = self.api.create_task(line, self.template_uuid, self.chunk_size)
+            if not success:
+                return False, result
+
+            task_id = result.get("task_id")
+            if self.journal:
+                self.journal.record_task(i, task_id)
+
+        waiter = self._aggregator.wait if self._aggregator else self.api.wait_for_task
+        success, task_result = waiter(
+            task_id, max_attempts=self.max_attempts, text_length=len(line),
+            should_stop=self.is_stopped)
+
+        if self.is_stopped():
+            return None, "Остановлено"
+
+        if not success:
+            return False, "таймаут или ошибка"
+
+        success, output_file = self.api.download_task_result(
+            task_id, self.output_folder, str(i), ext=".mp3", should_stop=self.is_stopped)
+        if self.is_stopped():
+            return None, "Остановлено"
+        if not success:
+            return False, "не удалось получить аудио"
+
+        if self.cache:
+            self.cache.store(self.template_uuid, line, self.chunk_size, output_file)
+
+        if self.postprocess:
+            self.postprocess(output_file)
+
+        return True, output_file
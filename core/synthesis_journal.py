@@ -0,0 +1,137 @@
+# core/synthesis_journal.py
+"""Журнал построчного озвучивания для продолжения после сбоя"""
+
+import os
+import json
+import time
+import threading
+
+
+class SynthesisJournal:
+    """
+    Журнал задания в папке вывода (JSON Lines, только дозапись).
+
+    Записи: job (строки, шаблон, настройки), task (строка отправлена,
+    task_id на сервере), done (файл сохранён), error, finished.
+    По журналу прерванный запуск продолжается с того же места, а задачи,
+    уже запущенные на сервере, подхватываются по task_id.
+    """
+
+    FILENAME = ".synthesis_journal.jsonl"
+    # Настройки, от которых зависят готовые файлы: при их смене журнал не подходит
+    SETTINGS_KEYS = ("chunk_size", "end_pause", "adjust_speed", "target_duration", "preserve_pitch")
+
+    def __init__(self, output_folder):
+        self.path = os.path.join(output_folder, self.FILENAME)
+        self.job = None
+        self.lines = {}
+        self.finished = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, output_folder):
+        """Прочитать журнал из папки (None если журнала нет)"""
+        journal = cls(output_folder)
+        if not os.path.exists(journal.path):
+            return None
+
+        try:
+            with open(journal.path, 'r', encoding='utf-8') as f:
+                for raw in f:
+                    raw = raw.strip()
+                    if not raw:
+                        continue
+                    try:
+                        journal._apply(json.loads(raw))
+                    except ValueError:
+                        # Недописанная последняя строка после сбоя
+                        continue
+        except OSError:
+            return None
+
+        return journal if journal.job else None
+
+    def _apply(self, record):
+        """Применить запись журнала к состоянию"""
+        event = record.get("event")
+
+        if event == "job":
+            self.job = record
+            self.lines = {}
+            self.finished = False
+        elif event == "finished":
+            self.finished = True
+        elif event in ("task", "done", "error"):
+            line = self.lines.setdefault(int(record["index"]), {})
+            line["state"] = event
+            if event == "task":
+                line["task_id"] = record.get("task_id")
+            elif event == "done":
+                line["path"] = record.get("path")
+            else:
+                line["error"] = record.get("message")
+
+    def _append(self, record):
+        """Дописать запись в журнал"""
+        record["time"] = time.time()
+        with self._lock:
+            self._apply(record)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+
+    def start_job(self, lines, template_uuid, settings):
+        """Начать новое задание (старый журнал перезаписывается)"""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        self._append({
+            "event": "job",
+            "lines": list(lines),
+            "template_uuid": template_uuid,
+            "settings": settings
+        })
+
+    def record_task(self, index, task_id):
+        self._append({"event": "task", "index": index, "task_id": task_id})
+
+    def record_done(self, index, path):
+        self._append({"event": "done", "index": index, "path": path})
+
+    def record_error(self, index, message):
+        self._append({"event": "error", "index": index, "message": message})
+
+    def record_finished(self):
+        self._append({"event": "finished"})
+
+    def matches(self, lines, template_uuid, settings):
+        """Журнал относится к тому же заданию (те же строки, шаблон и настройки)"""
+        if not self.job:
+            return False
+        stored = self.job.get("settings") or {}
+        return (self.job.get("lines") == list(lines)
+                and self.job.get("template_uuid") == template_uuid
+                and all(stored.get(key) == settings.get(key) for key in self.SETTINGS_KEYS))
+
+    def is_done(self, index):
+        """Строка уже озвучена и файл на месте"""
+        line = self.lines.get(index)
+        return bool(line and line.get("state") == "done"
+                    and line.get("path") and os.path.exists(line["path"]))
+
+    def pending_task_id(self, index):
+        """task_id строки, отправленной на сервер, но не сохранённой"""
+        line = self.lines.get(index)
+        if line and line.get("state") == "task":
+            return line.get("task_id")
+        return None
+
+    def done_count(self):
+        """Число готовых строк"""
+        return sum(1 for index in self.lines if self.is_done(index))
+
+    def errors(self):
+        """Ошибки прошлого запуска по строкам (при продолжении они озвучиваются заново)"""
+        return [f"Строка {index}: {line.get('error')}"
+                for index, line in sorted(self.lines.items())
+                if line.get("state") == "error"]
@@ -0,0 +1,51 @@
+# tests/test_cli_output.py
+"""cli.py: в stdout только события JSON, отладочная печать - в stderr"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CliOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def make_folder(self, name, ext, count):
+        folder = os.path.join(self.folder, name)
+        os.makedirs(folder)
+        for number in range(1, count + 1):
+            # Не медиа: обработка падает и печатает [ERROR] в основном процессе и в пуле
+            with open(os.path.join(folder, f"{number}{ext}"), 'wb') as f:
+                f.write(os.urandom(2000))
+        return folder
+
+    def test_every_stdout_line_is_json(self):
+        video = self.make_folder("video", ".mp4", 2)
+        audio = self.make_folder("audio", ".mp3", 2)
+
+        result = subprocess.run(
+            [sys.executable, os.path.join(ROOT, "cli.py"), "replace-audio",
+             "--video", video, "--audio", audio,
+             "--output", os.path.join(self.folder, "out"), "--workers", "2"],
+            cwd=ROOT, capture_output=True, text=True, encoding='utf-8', timeout=120
+        )
+
+        events = [json.loads(line) for line in result.stdout.splitlines()]
+        self.assertEqual([event["event"] for event in events],
+                         ["start", "progress", "progress", "done"])
+        self.assertIn("[DEBUG]", result.stderr)
+        self.assertIn("[ERROR]", result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
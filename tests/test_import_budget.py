@@ -0,0 +1,42 @@
+# tests/test_import_budget.py
+"""Тяжёлые модули не загружаются при импорте пакетов приложения"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Медиабиблиотеки загружаются только при первой операции с медиа
+MEDIA_MODULES = ("moviepy", "numpy")
+# Пакеты core и utils не тянут и HTTP-клиент (нужен проверке лицензии в main.py)
+HEAVY_MODULES = MEDIA_MODULES + ("requests",)
+
+
+def loaded_modules(statement, modules):
+    """Какие из modules оказались в sys.modules после statement (в отдельном процессе)"""
+    code = (f"import sys\n{statement}\n"
+            f"print(' '.join(name for name in {modules!r} if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+    return result.stdout.split()
+
+
+class ImportBudgetTest(unittest.TestCase):
+
+    def test_packages_import_without_heavy_modules(self):
+        self.assertEqual(loaded_modules("import core, utils", HEAVY_MODULES), [])
+
+    def test_main_window_imports_without_heavy_modules(self):
+        try:
+            import tkinter  # noqa: F401
+        except ImportError:
+            self.skipTest("tkinter недоступен")
+        self.assertEqual(loaded_modules("import ui.main_window", MEDIA_MODULES), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
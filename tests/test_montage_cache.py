@@ -0,0 +1,59 @@
+# tests/test_montage_cache.py
+"""MontageManifest: сегменты лежат в кэше монтажа с ограничением объёма"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.config import Config
+from utils.montage_engine import MontageManifest
+
+
+class MontageCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.saved = Config.MONTAGE_CACHE_FOLDER
+        Config.MONTAGE_CACHE_FOLDER = os.path.join(self.folder, "montage_cache")
+
+    def tearDown(self):
+        Config.MONTAGE_CACHE_FOLDER = self.saved
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def make_montage(self, name, used, size=400 * 1024):
+        """Папка сегментов итогового файла name, использованная в момент used"""
+        output = os.path.join(self.folder, name)
+        manifest = MontageManifest(MontageManifest.folder_for(output))
+        os.makedirs(manifest.folder)
+        with open(os.path.join(manifest.folder, "body_0.ts"), 'wb') as f:
+            f.write(b'x' * size)
+        manifest.save(output)
+        os.utime(os.path.join(manifest.folder, MontageManifest.FILENAME), (used, used))
+        return manifest.folder
+
+    def test_segments_are_kept_outside_output_folder(self):
+        folder = MontageManifest.folder_for(os.path.join(self.folder, "final.mp4"))
+        self.assertEqual(os.path.dirname(folder), Config.MONTAGE_CACHE_FOLDER)
+
+    def test_trim_removes_least_recently_used_montages(self):
+        old = self.make_montage("old.mp4", used=1000)
+        recent = self.make_montage("recent.mp4", used=3000)
+        current = self.make_montage("current.mp4", used=2000)
+
+        removed = MontageManifest.trim(current, max_size_mb=1)
+
+        self.assertEqual(removed, 1)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(recent))
+        self.assertTrue(os.path.exists(current))
+
+    def test_trim_drops_current_montage_larger_than_limit(self):
+        current = self.make_montage("current.mp4", used=1000, size=2 * 1024 * 1024)
+
+        self.assertEqual(MontageManifest.trim(current, max_size_mb=1), 1)
+        self.assertFalse(os.path.exists(current))
+
+
+if __name__ == '__main__':
+    unittest.main()
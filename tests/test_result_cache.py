@@ -0,0 +1,74 @@
+# tests/test_result_cache.py
+"""SynthesisCache: индекс пишется пакетно и не теряет записи других процессов"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.result_cache import SynthesisCache
+
+
+class SynthesisCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache_folder = os.path.join(self.folder, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def make_file(self, name, size=10):
+        path = os.path.join(self.folder, name)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        return path
+
+    def read_index(self):
+        with open(os.path.join(self.cache_folder, SynthesisCache.INDEX_FILE), encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_hits_do_not_write_index_until_flush(self):
+        cache = SynthesisCache(self.cache_folder, max_size_mb=1)
+        cache.store("t", "строка", None, self.make_file("a.mp3"))
+        cache.flush()
+        index_path = os.path.join(self.cache_folder, SynthesisCache.INDEX_FILE)
+        written = os.stat(index_path).st_mtime_ns
+
+        for _ in range(5):
+            self.assertIsNotNone(cache.lookup("t", "строка"))
+        self.assertEqual(os.stat(index_path).st_mtime_ns, written)
+
+        cache.flush()
+        self.assertEqual(cache.hits, 5)
+
+    def test_processes_sharing_folder_keep_each_others_entries(self):
+        first = SynthesisCache(self.cache_folder, max_size_mb=1)
+        second = SynthesisCache(self.cache_folder, max_size_mb=1)
+
+        first.store("t", "первая", None, self.make_file("a.mp3"))
+        second.store("t", "вторая", None, self.make_file("b.mp3"))
+        first.flush()
+        second.flush()
+
+        self.assertEqual(len(self.read_index()), 2)
+        self.assertIsNotNone(SynthesisCache(self.cache_folder).lookup("t", "первая"))
+
+    def test_size_cap_counts_files_missing_from_index(self):
+        cache = SynthesisCache(self.cache_folder, max_size_mb=1)
+        # Файл, потерянный индексом (например, после старой перезаписи)
+        orphan = os.path.join(self.cache_folder, "0" * 64 + ".mp3")
+        with open(orphan, 'wb') as f:
+            f.write(b'x' * 700 * 1024)
+        os.utime(orphan, (1, 1))
+
+        cache.store("t", "новая", None, self.make_file("a.mp3", size=700 * 1024))
+        cache.flush()
+
+        self.assertFalse(os.path.exists(orphan))
+        self.assertEqual(len(self.read_index()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# tests/test_status_aggregator.py
+"""StatusAggregator: задачи опрашиваются общими пакетными запросами"""
+
+import threading
+import unittest
+
+from core.config import Config
+from core.api_client import StatusAggregator
+
+
+class FakeAPI:
+    """
+    Сервер, где задача готова после `polls` опросов.
+    batch - ответ пакетного эндпоинта: 'ok', 'error' (500 и т.п.) или
+    'partial' (после первого ответа в пакете нет половины задач).
+    """
+
+    def __init__(self, polls=3, batch='ok'):
+        self.polls = polls
+        self.batch = batch
+        self.counts = {}
+        self.batch_calls = 0
+        self.single_calls = 0
+        self.lock = threading.Lock()
+
+    def _status(self, task_id):
+        self.counts[task_id] = self.counts.get(task_id, 0) + 1
+        done = self.counts[task_id] >= self.polls
+        return {"status": "ending" if done else "processing"}
+
+    def _fetch_status_batch(self, task_ids):
+        with self.lock:
+            self.batch_calls += 1
+            if self.batch == 'error':
+                return None, {}, None
+            if self.batch == 'partial' and self.batch_calls > 1:
+                task_ids = [task_id for task_id in task_ids if int(task_id[4:]) % 2 == 0]
+            return True, {task_id: self._status(task_id) for task_id in task_ids}, None
+
+    def _fetch_status(self, task_id):
+        with self.lock:
+            self.single_calls += 1
+            return True, self._status(task_id), None
+
+
+class StatusAggregatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = {name: getattr(Config, name)
+                      for name in ("POLL_MIN_DELAY", "POLL_MAX_DELAY", "POLL_BASE_LATENCY")}
+        Config.POLL_MIN_DELAY = 0.05
+        Config.POLL_MAX_DELAY = 0.3
+        Config.POLL_BASE_LATENCY = 0.0
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(Config, name, value)
+
+    def wait_all(self, api, count=20):
+        results = {}
+
+        def wait(task_id, text_length):
+            results[task_id] = aggregator.wait(task_id, text_length=text_length, timeout=10)
+
+        with StatusAggregator(api) as aggregator:
+            # Разная длина текста - разные (и случайные) задержки у задач
+            threads = [threading.Thread(target=wait, args=(f"task{i}", 5 + i * 3))
+                       for i in range(count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=15)
+
+        self.assertEqual(len(results), count)
+        self.assertTrue(all(result == (True, "completed") for result in results.values()))
+        return aggregator
+
+    def test_tasks_share_batch_requests(self):
+        api = FakeAPI(polls=3)
+        self.wait_all(api)
+
+        polls = sum(api.counts.values())
+        self.assertEqual(polls, 20 * 3)
+        self.assertEqual(api.single_calls, 0)
+        # Без выравнивания сроков выходило около одного запроса на опрос задачи
+        self.assertLess(api.batch_calls, polls / 3)
+
+    def test_failed_first_probe_falls_back_to_single_requests(self):
+        api = FakeAPI(polls=3, batch='error')
+        aggregator = self.wait_all(api)
+
+        self.assertEqual(api.batch_calls, 1)
+        self.assertEqual(api.single_calls, 20 * 3)
+        self.assertFalse(aggregator._batch_supported)
+
+    def test_tasks_missing_from_batch_are_polled_singly(self):
+        api = FakeAPI(polls=3, batch='partial')
+        self.wait_all(api)
+
+        self.assertGreater(api.single_calls, 0)
+        self.assertEqual(sum(api.counts.values()), 20 * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
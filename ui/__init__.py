@@ -1,7 +1,13 @@
 # ui/__init__.py
 """Интерфейс приложения"""
 
-from .theme import DarkTheme
-from .main_window import MainWindow
+from core.lazy import lazy_exports
+
+# Главное окно грузится при первом обращении: окно активации
+# открывается без импорта всех панелей
+__getattr__ = lazy_exports(__name__, {
+    'DarkTheme': '.theme',
+    'MainWindow': '.main_window',
+})
 
 __all__ = ['DarkTheme', 'MainWindow']
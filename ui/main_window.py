@@ -4,10 +4,13 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import os
-import time
 from core.config import Config
 from core.api_client import VoiceAPIClient
+from core.synthesis_engine import LineSynthesisEngine
+from core.result_cache import SynthesisCache
+from core.synthesis_journal import SynthesisJournal
 from core.settings_manager import SettingsManager
+from core.job_runner import JobRunner
 from ui.theme import DarkTheme
 from ui.widgets import (
     APIPanel, TextPanel, SettingsPanel, 
@@ -28,10 +31,16 @@ class MainWindow:
         self.is_running = False
         self.preview_text = Config.DEFAULT_PREVIEW_TEXT
         self.adjust_speed_var = tk.BooleanVar(value=False)  # ← ДОБАВЛЕНО!
+        self.preserve_pitch_var = tk.BooleanVar(value=False)
         
         # Менеджер настроек
         self.settings_manager = SettingsManager()
         
+        # Фоновые задачи (озвучка, видео, монтаж)
+        self.jobs = JobRunner(root)
+        self.synthesis_job = None
+        self.synthesis_line_count = 0
+        
         # Применяем тему
         self.colors = DarkTheme.apply_to_root(root)
         
@@ -51,6 +60,9 @@ class MainWindow:
     def on_closing(self):
         """Обработка закрытия окна"""
         self.auto_save_settings()
+        self.project_panel.flush_catalog(background=False)
+        self.jobs.cancel_all()
+        VoiceAPIClient.close_session()
         self.root.destroy()
 
     def auto_save_settings(self):
@@ -64,8 +76,10 @@ class MainWindow:
             "disable_chunks": self.settings_panel.disable_chunks_var.get(),
             "mode": self.settings_panel.mode_var.get(),
             "end_pause": self.settings_panel.end_pause_var.get(),
+            "max_concurrent_tasks": self.settings_panel.max_concurrent_var.get(),
             "adjust_speed": self.adjust_speed_var.get(),
             "target_duration": self.target_duration_var.get(),
+            "preserve_pitch": self.preserve_pitch_var.get(),
             "keep_original_audio": self.video_panel.keep_original_audio_var.get(),
             "original_volume": self.video_panel.original_volume_var.get(),
             "video_fit_mode": self.video_panel.video_fit_mode_var.get(),
@@ -131,6 +145,11 @@ class MainWindow:
                                             state="disabled")
         self.duration_spinbox.pack(side="left", padx=5)
         
+        self.preserve_pitch_check = ttk.Checkbutton(speed_frame, text="Сохранять высоту голоса",
+                                                    variable=self.preserve_pitch_var,
+                                                    state="disabled")
+        self.preserve_pitch_check.pack(anchor="w", padx=5, pady=(5, 0))
+        
         # Кнопки действий
         action_frame = ttk.Frame(left_column, padding=10)
         action_frame.pack(fill="x", pady=5)
@@ -174,8 +193,10 @@ class MainWindow:
         """Переключение регулировки скорости"""
         if self.adjust_speed_var.get():
             self.duration_spinbox.config(state="normal")
+            self.preserve_pitch_check.config(state="normal")
         else:
             self.duration_spinbox.config(state="disabled")
+            self.preserve_pitch_check.config(state="disabled")
 
     def open_settings(self):
         """Открыть окно настроек"""
@@ -203,7 +224,17 @@ class MainWindow:
             self.status_label.config(text=text, foreground=self.colors['error'])
         else:
             self.status_label.config(text=text, foreground=self.colors['fg'])
-        self.root.update()
+        self.status_label.update_idletasks()
+    
+    def on_job_progress(self, kind, *args):
+        """События фоновых задач (поток Tk): ("status", текст, вид) или ("progress", значение, максимум)"""
+        if kind == "status":
+            text, level = args
+            self.set_status(text, success=(level == "success"), error=(level == "error"))
+        elif kind == "progress":
+            value, maximum = args
+            self.progress_bar["maximum"] = maximum
+            self.progress_bar["value"] = value
     
     def set_templates(self, templates):
         """Установить шаблоны"""
@@ -232,180 +263,244 @@ class MainWindow:
         output_folder = settings['output_folder']
         os.makedirs(output_folder, exist_ok=True)
         
-        self.is_running = True
-        self.start_button.config(state="disabled")
-        self.stop_button.config(state="normal")
+        postprocess = self.make_postprocess(settings)
         
         mode = settings['mode']
         if mode == "full":
-            self.synthesize_full(text, template, api_key, output_folder, settings)
+            job_func = self.synthesize_full
+            job_args = (text, template, api_key, output_folder, settings, postprocess)
         else:
-            self.synthesize_line_by_line(text, template, api_key, output_folder, settings)
-    
-    def synthesize_full(self, text, template, api_key, output_folder, settings):
-        """Озвучить весь текст"""
-        try:
-            api = VoiceAPIClient(api_key)
-            template_uuid = template.get('uuid')
-            
-            self.set_status("⚙ Создание задачи...")
-            
-            success, result = api.create_task(text, template_uuid, settings['chunk_size'])
-            
-            if not success:
-                messagebox.showerror("Ошибка", f"Ошибка API: {result}")
-                self.set_status("✗ Ошибка", error=True)
+            lines = [line.strip() for line in text.split('\n') if line.strip()]
+            if not lines:
+                messagebox.showwarning("Предупреждение", "Нет строк для озвучивания")
                 return
             
-            task_id = result.get("task_id")
-            self.set_status(f"⚙ Задача #{task_id} создана")
-            
-            # Ждем завершения
-            def status_callback(status, status_data, attempt):
-                if not self.is_running:
-                    return
-                status_label = status_data.get("status_label", status)
-                self.set_status(f"⚙ {status_label} ({attempt}с)")
-            
-            success, result = api.wait_for_task(task_id, callback=status_callback)
+            journal = self.open_journal(lines, template.get('uuid'), output_folder, settings)
+            self.progress_bar["maximum"] = len(lines)
+            self.progress_bar["value"] = 0
             
-            if not self.is_running:
-                self.set_status("⏹ Остановлено", error=True)
-                return
-            
-            if success:
-                # Получаем результат
-                success, content = api.get_task_result(task_id)
-                
-                if success:
-                    # Сохраняем
-                    ext = ".zip" if b'PK' in content[:10] else ".mp3"
-                    output_file = os.path.join(output_folder, f"output{ext}")
-                    
-                    if os.path.exists(output_file):
-                        timestamp = int(time.time())
-                        output_file = os.path.join(output_folder, f"output_{timestamp}{ext}")
-                    
-                    with open(output_file, 'wb') as f:
-                        f.write(content)
-                    
-                    # Добавляем паузу
-                    if settings['end_pause'] > 0 and ext == ".mp3":
-                        AudioProcessor.add_end_pause(output_file, settings['end_pause'])
-                    
-                    # Изменяем скорость
-                    if self.adjust_speed_var.get() and ext == ".mp3":
-                        AudioProcessor.adjust_duration(output_file, self.target_duration_var.get())
-                    
-                    self.set_status(f"✓ Готово! {os.path.basename(output_file)}", success=True)
-                    open_file_in_system(output_file)
-                else:
-                    messagebox.showerror("Ошибка", "Не удалось получить результат")
-                    self.set_status("✗ Ошибка", error=True)
-            else:
-                messagebox.showerror("Ошибка", f"Ошибка: {result}")
-                self.set_status("✗ Ошибка", error=True)
+            job_func = self.synthesize_line_by_line
+            job_args = (lines, template, api_key, output_folder, settings, postprocess, journal)
         
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Произошла ошибка: {e}")
-            self.set_status("✗ Ошибка", error=True)
+        self.is_running = True
+        self.synthesis_line_count = len([line for line in text.split('\n') if line.strip()])
+        self.start_button.config(state="disabled")
+        self.stop_button.config(state="normal")
         
-        finally:
-            self.is_running = False
-            self.start_button.config(state="normal")
-            self.stop_button.config(state="disabled")
+        self.synthesis_job = self.jobs.submit(
+            job_func, *job_args,
+            on_progress=self.on_job_progress,
+            on_done=self.on_synthesis_done,
+            on_error=self.on_synthesis_error
+        )
     
-    def synthesize_line_by_line(self, text, template, api_key, output_folder, settings):
-        """Озвучить построчно"""
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        if not lines:
-            messagebox.showwarning("Предупреждение", "Нет строк для озвучивания")
-            self.is_running = False
-            self.start_button.config(state="normal")
-            self.stop_button.config(state="disabled")
-            return
+    def on_synthesis_done(self, result):
+        """Итог озвучивания (поток Tk)"""
+        self.finish_synthesis()
+        
+        # Каталог проектов: время запуска и число строк текста
+        self.project_panel.record_run(self.synthesis_line_count)
+        
+        level, status_text = result['status']
+        self.set_status(status_text, success=(level == "success"), error=(level == "error"))
+        
+        message = result.get('message')
+        if message:
+            kind, title, text = message
+            if kind == "error":
+                messagebox.showerror(title, text)
+            else:
+                messagebox.showwarning(title, text)
+        
+        if result.get('open'):
+            open_file_in_system(result['open'])
+    
+    def on_synthesis_error(self, error):
+        """Необработанная ошибка озвучивания (поток Tk)"""
+        self.finish_synthesis()
+        messagebox.showerror("Ошибка", f"Произошла ошибка: {error}")
+        self.set_status("✗ Ошибка", error=True)
+    
+    def finish_synthesis(self):
+        """Вернуть кнопки в исходное состояние"""
+        self.is_running = False
+        self.synthesis_job = None
+        self.start_button.config(state="normal")
+        self.stop_button.config(state="disabled")
+    
+    def synthesize_full(self, job, text, template, api_key, output_folder, settings, postprocess):
+        """Озвучить весь текст (фоновый поток)"""
+        api = VoiceAPIClient.get_client(api_key)
+        template_uuid = template.get('uuid')
+        cache = SynthesisCache.get_default()
+        
+        # Тот же текст уже озвучивался - берём из кэша
+        success, output_file = cache.restore(
+            template_uuid, text, settings['chunk_size'], output_folder, "output", unique=True)
+        
+        if not success:
+            output_file, error = self.synthesize_full_task(job, api, text, template_uuid,
+                                                           output_folder, settings)
+            if not output_file:
+                return error
+            cache.store(template_uuid, text, settings['chunk_size'], output_file)
+        cache.flush()
+        
+        # Пауза и длительность - только для MP3
+        if os.path.splitext(output_file)[1] == ".mp3":
+            job.report("status", "⚙ Обработка аудио...", None)
+            postprocess(output_file)
+        
+        return {
+            'status': ("success", f"✓ Готово! {os.path.basename(output_file)}"),
+            'open': output_file
+        }
+    
+    def synthesize_full_task(self, job, api, text, template_uuid, output_folder, settings):
+        """Создать задачу на весь текст и скачать результат: (путь, None) или (None, итог)"""
+        job.report("status", "⚙ Создание задачи...", None)
+        
+        success, result = api.create_task(text, template_uuid, settings['chunk_size'])
+        
+        if not success:
+            return None, {
+                'status': ("error", "✗ Ошибка"),
+                'message': ("error", "Ошибка", f"Ошибка API: {result}")
+            }
+        
+        task_id = result.get("task_id")
+        job.report("status", f"⚙ Задача #{task_id} создана", None)
+        
+        # Ждем завершения
+        def status_callback(status, status_data, elapsed):
+            status_label = status_data.get("status_label", status)
+            job.report("status", f"⚙ {status_label} ({elapsed}с)", None)
+        
+        success, result = api.wait_for_task(task_id, callback=status_callback,
+                                            text_length=len(text),
+                                            should_stop=job.is_cancelled)
         
-        self.progress_bar["maximum"] = len(lines)
-        self.progress_bar["value"] = 0
+        if job.is_cancelled():
+            return None, {'status': ("error", "⏹ Остановлено")}
         
-        api = VoiceAPIClient(api_key)
+        if not success:
+            return None, {
+                'status': ("error", "✗ Ошибка"),
+                'message': ("error", "Ошибка", f"Ошибка: {result}")
+            }
+        
+        # Скачиваем результат сразу на диск
+        success, output_file = api.download_task_result(
+            task_id, output_folder, "output", unique=True, should_stop=job.is_cancelled)
+        
+        if job.is_cancelled():
+            return None, {'status': ("error", "⏹ Остановлено")}
+        
+        if not success:
+            return None, {
+                'status': ("error", "✗ Ошибка"),
+                'message': ("error", "Ошибка", "Не удалось получить результат")
+            }
+        
+        return output_file, None
+    
+    def synthesize_line_by_line(self, job, lines, template, api_key, output_folder, settings,
+                                postprocess, journal):
+        """Озвучить построчно (фоновый поток)"""
+        api = VoiceAPIClient.get_client(api_key)
         template_uuid = template.get('uuid')
         
-        completed = 0
-        errors = []
+        engine = LineSynthesisEngine(
+            api, template_uuid, output_folder,
+            chunk_size=settings['chunk_size'],
+            max_in_flight=settings['max_concurrent_tasks'],
+            postprocess=postprocess,
+            cache=SynthesisCache.get_default(),
+            journal=journal
+        )
         
-        for i, line in enumerate(lines, 1):
-            if not self.is_running:
-                self.set_status("⏹ Остановлено", error=True)
-                break
-            
-            self.set_status(f"⚙ Озвучивание строки {i}/{len(lines)}")
-            self.progress_bar["value"] = i
-            self.root.update()
-            
-            try:
-                # Создаём задачу
-                success, result = api.create_task(line, template_uuid, settings['chunk_size'])
-                
-                if not success:
-                    errors.append(f"Строка {i}: {result}")
-                    continue
-                
-                task_id = result.get("task_id")
-                
-                # Ждём выполнения
-                success, task_result = api.wait_for_task(task_id, max_attempts=120)
-                
-                if not self.is_running:
-                    break
-                
-                if success:
-                    # Получаем результат
-                    success, content = api.get_task_result(task_id)
-                    
-                    if success and content:
-                        # Сохраняем с номером строки
-                        output_file = os.path.join(output_folder, f"{i}.mp3")
-                        
-                        with open(output_file, 'wb') as f:
-                            f.write(content)
-                        
-                        # Добавляем паузу если нужно
-                        if settings['end_pause'] > 0:
-                            AudioProcessor.add_end_pause(output_file, settings['end_pause'])
-                        
-                        # Изменяем скорость если нужно
-                        if self.adjust_speed_var.get():
-                            AudioProcessor.adjust_duration(output_file, self.target_duration_var.get())
-                        
-                        completed += 1
-                    else:
-                        errors.append(f"Строка {i}: не удалось получить аудио")
-                else:
-                    errors.append(f"Строка {i}: таймаут или ошибка")
-            
-            except Exception as e:
-                errors.append(f"Строка {i}: {str(e)}")
-                print(f"Ошибка озвучивания строки {i}: {e}")
+        job.report("status", f"⚙ Озвучивание {len(lines)} строк (параллельно: {engine.max_in_flight})", None)
+        
+        def on_progress(done, total, index, success, message):
+            job.report("progress", done, total)
+            job.report("status", f"⚙ Озвучено строк: {done}/{total} (последняя: {index})", None)
+        
+        completed, errors = engine.run(
+            lines,
+            on_progress=on_progress,
+            should_stop=job.is_cancelled
+        )
+        
+        result = {}
         
         # Итоги
         if errors:
             error_text = "\n".join(errors[:10])  # Показываем первые 10 ошибок
             if len(errors) > 10:
                 error_text += f"\n... и ещё {len(errors) - 10} ошибок"
-            messagebox.showwarning("Предупреждение", 
-                                f"Озвучено: {completed}/{len(lines)}\n\nОшибки:\n{error_text}")
+            result['message'] = ("warning", "Предупреждение",
+                                 f"Озвучено: {completed}/{len(lines)}\n\nОшибки:\n{error_text}")
         
-        self.set_status(f"✓ Готово! Озвучено: {completed}/{len(lines)}", success=True)
+        if job.is_cancelled():
+            result['status'] = ("error", "⏹ Остановлено")
+        else:
+            result['status'] = ("success", f"✓ Готово! Озвучено: {completed}/{len(lines)} "
+                                           f"(из кэша: {engine.cache_hits}, из журнала: {engine.resumed})")
         
-        self.is_running = False
-        self.start_button.config(state="normal")
-        self.stop_button.config(state="disabled")
-
+        return result
+    
+    def open_journal(self, lines, template_uuid, output_folder, settings):
+        """Продолжить прерванное задание из журнала или начать новое"""
+        job_settings = {
+            "chunk_size": settings['chunk_size'],
+            "end_pause": settings['end_pause'],
+            "adjust_speed": self.adjust_speed_var.get(),
+            "target_duration": self.target_duration_var.get(),
+            "preserve_pitch": self.preserve_pitch_var.get()
+        }
+        journal = SynthesisJournal.load(output_folder)
+        
+        if (journal and not journal.finished
+                and journal.matches(lines, template_uuid, job_settings)):
+            done = journal.done_count()
+            errors = journal.errors()
+            failed = f"С ошибками в прошлый раз: {len(errors)}\n" if errors else ""
+            if messagebox.askyesno(
+                    "Продолжить озвучивание?",
+                    f"Найдено прерванное озвучивание этого текста.\n"
+                    f"Готово строк: {done}/{len(lines)}\n"
+                    f"{failed}\n"
+                    f"Продолжить с места остановки?"):
+                return journal
+        
+        journal = SynthesisJournal(output_folder)
+        journal.start_job(lines, template_uuid, job_settings)
+        return journal
+    
+    def make_postprocess(self, settings):
+        """Постобработка аудиофайла (значения Tk читаются заранее)"""
+        end_pause = settings['end_pause']
+        adjust_speed = self.adjust_speed_var.get()
+        target_duration = self.target_duration_var.get()
+        preserve_pitch = self.preserve_pitch_var.get()
+        
+        def postprocess(output_file):
+            # Пауза и подгонка скорости - одним проходом
+            if end_pause > 0 or adjust_speed:
+                AudioProcessor.postprocess(
+                    output_file,
+                    end_pause=end_pause,
+                    target_duration=target_duration if adjust_speed else None,
+                    preserve_pitch=preserve_pitch
+                )
+        
+        return postprocess
     
     def stop_synthesis(self):
         """Остановить озвучивание"""
         self.is_running = False
+        if self.synthesis_job:
+            self.synthesis_job.cancel()
         self.set_status("⏹ Остановка...", error=True)
     
     def save_settings(self):
@@ -419,8 +514,10 @@ class MainWindow:
             "disable_chunks": self.settings_panel.disable_chunks_var.get(),
             "mode": self.settings_panel.mode_var.get(),
             "end_pause": self.settings_panel.end_pause_var.get(),
+            "max_concurrent_tasks": self.settings_panel.max_concurrent_var.get(),
             "adjust_speed": self.adjust_speed_var.get(),
             "target_duration": self.target_duration_var.get(),
+            "preserve_pitch": self.preserve_pitch_var.get(),
             "keep_original_audio": self.video_panel.keep_original_audio_var.get(),
             "original_volume": self.video_panel.original_volume_var.get(),
             "video_fit_mode": self.video_panel.video_fit_mode_var.get(),
@@ -451,8 +548,10 @@ class MainWindow:
         self.settings_panel.disable_chunks_var.set(settings.get("disable_chunks", True))
         self.settings_panel.mode_var.set(settings.get("mode", "full"))
         self.settings_panel.end_pause_var.set(settings.get("end_pause", 0.0))
+        self.settings_panel.max_concurrent_var.set(settings.get("max_concurrent_tasks", Config.MAX_CONCURRENT_TASKS))
         self.adjust_speed_var.set(settings.get("adjust_speed", False))
         self.target_duration_var.set(settings.get("target_duration", 8.0))
+        self.preserve_pitch_var.set(settings.get("preserve_pitch", False))
         self.video_panel.keep_original_audio_var.set(settings.get("keep_original_audio", False))
         self.video_panel.original_volume_var.set(settings.get("original_volume", 30))
         self.video_panel.video_fit_mode_var.set(settings.get("video_fit_mode", "fit"))
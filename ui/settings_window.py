@@ -259,7 +259,7 @@ class SettingsWindow:
                                               foreground=Config.COLORS['fg'])
             self.window.update()
             
-            api = VoiceAPIClient(api_key)
+            api = VoiceAPIClient.get_client(api_key)
             success, templates = api.get_templates()
             
             if success:
@@ -70,7 +70,7 @@ class APIPanel(ttk.LabelFrame):
         try:
             from core.api_client import VoiceAPIClient
             
-            api = VoiceAPIClient(api_key)
+            api = VoiceAPIClient.get_client(api_key)
             success, result = api.check_balance()
             
             if success:
@@ -100,7 +100,7 @@ class APIPanel(ttk.LabelFrame):
         try:
             from core.api_client import VoiceAPIClient
             
-            api = VoiceAPIClient(api_key)
+            api = VoiceAPIClient.get_client(api_key)
             success, templates = api.get_templates()
             
             if success:
@@ -5,7 +5,6 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
 from core.config import Config
-from utils.video_processor import VideoProcessor
 
 class MontagePanel(ttk.LabelFrame):
     """Панель монтажа видео"""
@@ -13,6 +12,7 @@ class MontagePanel(ttk.LabelFrame):
     def __init__(self, parent, app, **kwargs):
         super().__init__(parent, text="🎬 Монтаж видео", padding=10, **kwargs)
         self.app = app
+        self.render_job = None
         self.create_widgets()
     
     def create_widgets(self):
@@ -105,9 +105,10 @@ class MontagePanel(ttk.LabelFrame):
         self.transition_combo.bind('<<ComboboxSelected>>', self.update_transition_description)
         
         # Кнопка монтажа
-        ttk.Button(self, text="🎬 Смонтировать видео",
-                  command=self.montage_video,
-                  style='Accent.TButton').pack(fill="x", pady=15, padx=5)
+        self.montage_button = ttk.Button(self, text="🎬 Смонтировать видео",
+                                         command=self.montage_video,
+                                         style='Accent.TButton')
+        self.montage_button.pack(fill="x", pady=15, padx=5)
     
     def toggle_transitions(self):
         """Переключение переходов"""
@@ -153,6 +154,9 @@ class MontagePanel(ttk.LabelFrame):
     
     def montage_video(self):
         """Смонтировать видео"""
+        if self.render_job:
+            return
+        
         input_folder = self.montage_input_var.get()
         output_file = self.montage_output_var.get()
         
@@ -166,22 +170,51 @@ class MontagePanel(ttk.LabelFrame):
         
         self.app.set_status("⚙ Монтаж видео...")
         
-        try:
-            success, msg = VideoProcessor.montage_videos(
-                input_folder,
-                output_file,
-                use_transitions=self.use_transitions_var.get(),
-                transition_type=self.transition_type_var.get(),
-                transition_duration=self.transition_duration_var.get()
-            )
-            
-            if success:
-                self.app.set_status("✓ Монтаж завершён!", success=True)
-                messagebox.showinfo("Готово", msg)
-            else:
-                self.app.set_status("✗ Ошибка монтажа", error=True)
-                messagebox.showerror("Ошибка", msg)
-        
-        except Exception as e:
-            self.app.set_status("✗ Ошибка", error=True)
-            messagebox.showerror("Ошибка", f"Не удалось смонтировать: {e}")
+        self.montage_button.config(state="disabled")
+        self.render_job = self.app.jobs.submit(
+            self.montage_job, input_folder, output_file, {
+                'use_transitions': self.use_transitions_var.get(),
+                'transition_type': self.transition_type_var.get(),
+                'transition_duration': self.transition_duration_var.get()
+            },
+            on_progress=self.app.on_job_progress,
+            on_done=self.on_montage_done,
+            on_error=self.on_montage_error
+        )
+    
+    def montage_job(self, job, input_folder, output_file, options):
+        """Монтаж (фоновый поток)"""
+        def on_progress(text, done, total):
+            job.report("status", text, None)
+            if total:
+                job.report("progress", done, total)
+        
+        from utils.video_processor import VideoProcessor
+        return VideoProcessor.montage_videos(
+            input_folder, output_file,
+            on_progress=on_progress,
+            should_stop=job.is_cancelled,
+            **options
+        )
+    
+    def on_montage_done(self, result):
+        """Итог монтажа (поток Tk)"""
+        self.finish_montage()
+        success, msg = result
+        if success:
+            self.app.set_status("✓ Монтаж завершён!", success=True)
+            messagebox.showinfo("Готово", msg)
+        else:
+            self.app.set_status("✗ Ошибка монтажа", error=True)
+            messagebox.showerror("Ошибка", msg)
+    
+    def on_montage_error(self, error):
+        """Ошибка монтажа (поток Tk)"""
+        self.finish_montage()
+        self.app.set_status("✗ Ошибка", error=True)
+        messagebox.showerror("Ошибка", f"Не удалось смонтировать: {error}")
+    
+    def finish_montage(self):
+        """Вернуть кнопку в исходное состояние"""
+        self.render_job = None
+        self.montage_button.config(state="normal")
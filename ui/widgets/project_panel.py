@@ -4,8 +4,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import os
+import time
 from core.config import Config
 from utils.project_manager import ProjectManager
+from utils.project_watcher import ProjectWatcher, project_summary
+from utils.folder_index import FolderIndex
 from utils.helpers import open_file_in_system
 
 class ProjectPanel(ttk.LabelFrame):
@@ -16,6 +19,11 @@ class ProjectPanel(ttk.LabelFrame):
         self.app = app
         self.project_manager = ProjectManager()
         self.current_project = None
+        self.watch_job = None
+        # Отложенная запись в каталог: папки с изменениями и последние счётчики
+        self.catalog_folders = set()
+        self.catalog_status = None
+        self.catalog_flush_id = None
         self.create_widgets()
     
     def create_widgets(self):
@@ -53,6 +61,12 @@ class ProjectPanel(ttk.LabelFrame):
                                            foreground=Config.COLORS['fg_dim'],
                                            font=('Segoe UI', 8))
         self.project_info_label.pack(anchor="w", padx=5)
+        
+        # Файлы проекта (обновляется слежением за папками)
+        self.project_files_label = ttk.Label(info_frame, text="",
+                                            foreground=Config.COLORS['fg_dim'],
+                                            font=('Segoe UI', 8))
+        self.project_files_label.pack(anchor="w", padx=5)
     
     def create_new_project(self):
         """Создать новый проект"""
@@ -152,10 +166,11 @@ class ProjectPanel(ttk.LabelFrame):
         listbox.pack(side="left", fill="both", expand=True)
         scrollbar.config(command=listbox.yview)
         
-        # Заполняем список
+        # Заполняем список (состояние - из каталога, папки не обходятся)
         for project in projects:
             created_str = project['created'].strftime('%Y-%m-%d %H:%M')
-            listbox.insert(tk.END, f"{project['name']} (создан: {created_str})")
+            listbox.insert(tk.END, f"{project['name']} (создан: {created_str})"
+                                   f"{self.format_status(project)}")
         
         def open_selected():
             selection = listbox.curselection()
@@ -179,8 +194,28 @@ class ProjectPanel(ttk.LabelFrame):
         # Двойной клик для открытия
         listbox.bind('<Double-Button-1>', lambda e: open_selected())
     
+    @staticmethod
+    def format_status(project):
+        """Краткое состояние проекта для списка"""
+        if project.get('audio') is None:
+            return ""
+        parts = []
+        if project.get('lines'):
+            parts.append(f"🎙 {project['audio']}/{project['lines']}")
+        else:
+            parts.append(f"🎙 {project['audio']}")
+        parts.append(f"🎬 {project['video']}")
+        parts.append(f"✅ {project['rendered']}")
+        if project.get('missing'):
+            parts.append(f"⚠ пропусков {project['missing']}")
+        if project.get('last_run'):
+            parts.append(f"запуск {project['last_run'].strftime('%d.%m %H:%M')}")
+        return "  —  " + "  ".join(parts)
+    
     def load_project(self, project_name):
         """Загрузить проект и обновить все пути"""
+        # Накопленные изменения относятся к прежнему проекту
+        self.flush_catalog()
         self.current_project = project_name
         project_path = os.path.join(self.project_manager.base_folder, project_name)
         
@@ -210,8 +245,18 @@ class ProjectPanel(ttk.LabelFrame):
         final_video_path = os.path.join(project_path, f"{project_name}_final.mp4")
         self.app.montage_panel.montage_output_var.set(final_video_path)
         
-        # 6. Загружаем текст для озвучки (если есть)
+        # 6. Состояние из каталога - сразу, без обхода папок; слежение
+        # уточнит его, когда прочитает папки
+        status = self.project_manager.project_status(project_name)
+        if status and status.get('audio') is not None:
+            self.show_summary(status['audio'], status['video'], status['images'],
+                              status['rendered'], status['pairs'] or 0, status['missing'] or 0)
+        else:
+            self.project_files_label.config(text="")
+        
+        # 7. Загружаем текст для озвучки (если есть)
         text_file_path = os.path.join(audio_folder, f"text_{project_name}.txt")
+        line_count = None
         if os.path.exists(text_file_path):
             try:
                 with open(text_file_path, 'r', encoding='utf-8') as f:
@@ -221,11 +266,107 @@ class ProjectPanel(ttk.LabelFrame):
                     actual_text = '\n'.join(lines[3:]) if len(lines) > 3 else content
                     if actual_text.strip():
                         self.app.text_panel.set_text(actual_text)
+                        line_count = len([line for line in actual_text.split('\n') if line.strip()])
             except:
                 pass
         
+        # 8. Следим за папками проекта - счётчики и файлы в каталоге
+        # обновляются по мере того, как слежение подключает папки
+        self.start_watcher(project_path)
+        
+        if line_count is not None and (not status or status.get('lines') != line_count):
+            self.project_manager.update_status(project_name, lines=line_count)
+        
         self.app.set_status(f"✓ Проект '{project_name}' открыт!", success=True)
     
+    def start_watcher(self, project_path):
+        """Запустить слежение за папками проекта (прежнее останавливается)"""
+        if self.watch_job:
+            self.watch_job.cancel()
+        
+        watcher = ProjectWatcher(project_path)
+        self.watch_job = self.app.jobs.submit(watcher.run,
+                                              on_progress=self.on_project_files_changed,
+                                              name="project_watcher")
+    
+    def on_project_files_changed(self, folder_name, added, removed):
+        """Изменились файлы в папке проекта (поток Tk)"""
+        self.update_project_summary()
+        
+        # Пакетная обработка шлёт событие на каждый файл - в каталог
+        # пишем раз в CATALOG_FLUSH_DELAY секунд и в фоне
+        self.catalog_folders.add(folder_name)
+        if self.catalog_flush_id is None:
+            self.catalog_flush_id = self.after(int(Config.CATALOG_FLUSH_DELAY * 1000),
+                                               self.flush_catalog)
+    
+    def flush_catalog(self, background=True):
+        """
+        Записать накопленные счётчики и файлы папок в каталог - фоновой
+        задачей, а при закрытии окна (background=False) сразу.
+        """
+        if self.catalog_flush_id is not None:
+            self.after_cancel(self.catalog_flush_id)
+            self.catalog_flush_id = None
+        if not self.current_project or not (self.catalog_folders or self.catalog_status):
+            return
+        
+        project_path = os.path.join(self.project_manager.base_folder, self.current_project)
+        assets = {}
+        for folder_name in self.catalog_folders:
+            folder = os.path.join(project_path, folder_name)
+            assets[folder_name] = FolderIndex.files(folder) if os.path.isdir(folder) else []
+        
+        if background:
+            self.app.jobs.submit(self.write_catalog_job, self.current_project,
+                                 self.catalog_status, assets, name="catalog_write")
+        else:
+            self.write_catalog_job(None, self.current_project, self.catalog_status, assets)
+        self.catalog_folders = set()
+        self.catalog_status = None
+    
+    def write_catalog_job(self, job, project_name, status, assets):
+        """Запись в каталог (фоновый поток)"""
+        if status:
+            self.project_manager.update_status(project_name, **status)
+        for folder_name, entries in assets.items():
+            self.project_manager.update_assets(project_name, folder_name, entries)
+    
+    def record_run(self, line_count=None):
+        """Отметить в каталоге завершённое озвучивание текущего проекта"""
+        if not self.current_project:
+            return
+        status = {'last_run': time.time()}
+        if line_count:
+            status['lines'] = line_count
+        self.project_manager.update_status(self.current_project, **status)
+    
+    def update_project_summary(self):
+        """
+        Счётчики файлов проекта из индекса папок (без перечитывания диска);
+        в каталог они попадают при flush_catalog.
+        """
+        if not self.current_project:
+            return
+        project_path = os.path.join(self.project_manager.base_folder, self.current_project)
+        summary = project_summary(project_path)
+        self.show_summary(summary['audio'], summary['video'], summary['images'],
+                          summary['rendered'], summary['pairs'], len(summary['missing']))
+        
+        self.catalog_status = {
+            'audio': summary['audio'], 'video': summary['video'], 'images': summary['images'],
+            'rendered': summary['rendered'], 'pairs': summary['pairs'],
+            'missing': len(summary['missing'])}
+    
+    def show_summary(self, audio, video, images, rendered, pairs, missing):
+        """Показать счётчики файлов проекта"""
+        self.project_files_label.config(
+            text=f"🎙 Аудио: {audio}   🎬 Видео: {video}   "
+                 f"🖼 Картинки: {images}   ✅ Готово: {rendered}\n"
+                 f"Пар видео-аудио: {pairs}   "
+                 f"Пропущено видео: {missing}")
+        self.app.video_panel.update_pairs_info(pairs)
+    
     def open_projects_folder(self):
         """Открыть папку с проектами"""
         open_file_in_system(self.project_manager.base_folder)
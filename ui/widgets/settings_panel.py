@@ -55,6 +55,14 @@ class SettingsPanel(ttk.LabelFrame):
                    textvariable=self.end_pause_var, width=10).grid(
                        row=2, column=1, sticky="w", padx=5, pady=5)
         
+        # Параллельные задачи (построчный режим)
+        ttk.Label(self, text="Параллельно задач:").grid(row=2, column=2, sticky="w", padx=15, pady=5)
+        
+        self.max_concurrent_var = tk.IntVar(value=Config.MAX_CONCURRENT_TASKS)
+        ttk.Spinbox(self, from_=1, to=Config.SERVER_MAX_CONCURRENT_TASKS, increment=1,
+                   textvariable=self.max_concurrent_var, width=10).grid(
+                       row=2, column=3, columnspan=2, sticky="w", padx=5, pady=5)
+        
         # Row 3: Папка для аудио
         ttk.Label(self, text="Папка для аудио:").grid(row=3, column=0, sticky="w", padx=5, pady=5)
         
@@ -87,6 +95,7 @@ class SettingsPanel(ttk.LabelFrame):
             'chunk_size': None if self.disable_chunks_var.get() else self.chunk_size_var.get(),
             'mode': self.mode_var.get(),
             'end_pause': self.end_pause_var.get(),
+            'max_concurrent_tasks': self.max_concurrent_var.get(),
             'output_folder': self.output_folder_var.get()
         }
     
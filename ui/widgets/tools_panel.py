@@ -1,5 +1,5 @@
 # ui/widgets/tools_panel.py
-"""Инструменты для файлов с бекапами"""
+"""Инструменты для файлов с отменяемым переименованием"""
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
@@ -9,6 +9,9 @@ import shutil
 import time
 from core.config import Config
 from utils.helpers import natural_sort_key
+from utils.rename_plan import RenamePlan
+from utils.snapshots import FolderSnapshot
+from utils.folder_index import FolderIndex
 
 class ToolsPanel(ttk.LabelFrame):
     """Инструменты для файлов"""
@@ -71,7 +74,11 @@ class ToolsPanel(ttk.LabelFrame):
                  foreground=Config.COLORS['fg_dim'], 
                  font=('Segoe UI', 8)).pack(anchor="w", padx=20, pady=2)
         
-        # Статус бекапа
+        # Отмена последнего переименования
+        ttk.Button(self, text="↩ Отменить последнее переименование",
+                  command=self.undo_rename).pack(fill="x", pady=5, padx=5)
+        
+        # Статус переименования
         self.backup_status = ttk.Label(self, text="", 
                                        foreground=Config.COLORS['success'],
                                        font=('Segoe UI', 8))
@@ -94,29 +101,99 @@ class ToolsPanel(ttk.LabelFrame):
             self.tools_folder_var.set(folder)
     
     def create_backup(self, folder):
-        """Создать бекап перед изменениями"""
-        backup_folder = os.path.join(folder, "_backup_" + time.strftime('%Y%m%d_%H%M%S'))
+        """Снимок папки перед изменениями (ссылки на файлы, без копирования)"""
+        success, backup_folder, stats = FolderSnapshot.create(folder)
+        if not success:
+            messagebox.showerror("Ошибка бекапа", f"Не удалось создать бекап:\n{backup_folder}")
+            return False, None
         
-        try:
-            os.makedirs(backup_folder, exist_ok=True)
-            
-            # Копируем все файлы
-            copied = 0
-            for filename in os.listdir(folder):
-                filepath = os.path.join(folder, filename)
-                if os.path.isfile(filepath) and not filename.startswith('_backup_'):
-                    shutil.copy2(filepath, os.path.join(backup_folder, filename))
-                    copied += 1
-            
-            self.backup_status.config(
-                text=f"✓ Бекап создан: {copied} файлов → {os.path.basename(backup_folder)}",
-                foreground=Config.COLORS['success'])
+        stored = stats['clone'] + stats['link']
+        note = f", только описано: {stats['manifest']}" if stats['manifest'] else ""
+        self.backup_status.config(
+            text=f"✓ Бекап: {stored} файлов{note} → {os.path.basename(backup_folder)}",
+            foreground=Config.COLORS['success'])
+        return True, backup_folder
+    
+    def list_files(self, folder, skip_txt=False):
+        """
+        Файлы папки для переименования. Сначала откатывается
+        переименование, прерванное падением программы.
+        """
+        if RenamePlan.recover(folder):
+            self.backup_status.config(text="↩ Откачено прерванное переименование",
+                                      foreground=Config.COLORS['error'])
+        
+        # Служебные файлы с точкой и папки бекапов индекс не включает
+        return [entry['name'] for entry in FolderIndex.files(folder)
+                if not (skip_txt and entry['kind'] == 'text')]
+    
+    def normalize_plan(self, folder, skip_txt=False):
+        """План нормализации: 175. 177_Name → 177. Name"""
+        plan = RenamePlan(folder)
+        for filename in self.list_files(folder, skip_txt):
+            name, ext = os.path.splitext(filename)
             
-            return True, backup_folder
+            # Ищем паттерн: ЧИСЛО1. ЧИСЛО2_остальное
+            # Примеры: "175. 177_Name", "24. 24_Name"
+            match = re.match(r'^(\d+)\.\s*(\d+)[_\.\s]+(.+)$', name)
+            if match:
+                # Берём второе (реальное) число, дубль номера убираем
+                real_num = match.group(2)
+                rest = match.group(3)
+                plan.add(filename, f"{real_num}. {rest}{ext}")
+        return plan
+    
+    def apply_plan(self, plan, title, confirm=True):
+        """
+        Проверить план, показать изменения и применить: (success, count).
+        При ошибке на полпути папка возвращается в исходное состояние.
+        """
+        problems = plan.conflicts()
+        if problems:
+            shown = "\n".join(problems[:15])
+            more = f"\n... и ещё {len(problems) - 15}" if len(problems) > 15 else ""
+            messagebox.showerror(title, f"Переименование не выполнено:\n\n{shown}{more}")
+            return False, 0
+        
+        if not plan:
+            return True, 0
+        
+        if confirm:
+            preview = "\n".join(plan.preview(limit=20))
+            if not messagebox.askyesno(title, f"Будет переименовано файлов: {len(plan)}\n\n"
+                                              f"{preview}\n\nПродолжить?"):
+                return False, 0
+        
+        # Снимок мгновенный, поэтому делается перед каждым переименованием
+        success, _ = self.create_backup(plan.folder)
+        if not success:
+            return False, 0
         
-        except Exception as e:
-            messagebox.showerror("Ошибка бекапа", f"Не удалось создать бекап:\n{e}")
-            return False, None
+        success, msg = plan.apply()
+        if not success:
+            messagebox.showerror(title, msg)
+            return False, 0
+        
+        for line in plan.preview():
+            print(f"✓ {line}")
+        print(f"[DEBUG] {msg}, можно отменить")
+        return True, len(plan)
+    
+    def undo_rename(self):
+        """Отменить последнее переименование в выбранной папке"""
+        folder = self.tools_folder_var.get()
+        if not folder or not os.path.exists(folder):
+            messagebox.showwarning("Предупреждение", "Выберите папку видео")
+            return
+        
+        RenamePlan.recover(folder)
+        success, msg = RenamePlan.undo(folder)
+        if not success:
+            messagebox.showinfo("Отмена переименования", msg)
+            return
+        
+        self.backup_status.config(text=f"↩ {msg}", foreground=Config.COLORS['success'])
+        self.app.set_status(f"↩ {msg}", success=True)
     
     def normalize_filenames(self):
         """
@@ -128,53 +205,12 @@ class ToolsPanel(ttk.LabelFrame):
             messagebox.showwarning("Предупреждение", "Выберите папку видео")
             return
         
-        # Создаём бекап
-        success, backup_folder = self.create_backup(folder)
+        success, processed = self.apply_plan(self.normalize_plan(folder),
+                                             "Нормализация имён")
         if not success:
             return
         
-        processed = 0
-        
-        for filename in os.listdir(folder):
-            if filename.startswith('_backup_'):
-                continue
-            
-            filepath = os.path.join(folder, filename)
-            if not os.path.isfile(filepath):
-                continue
-            
-            name, ext = os.path.splitext(filename)
-            
-            # Ищем паттерн: ЧИСЛО1. ЧИСЛО2_остальное
-            # Примеры: "175. 177_Name", "24. 24_Name"
-            match = re.match(r'^(\d+)\.\s*(\d+)[_\.\s]+(.+)$', name)
-            
-            if match:
-                prefix_num = match.group(1)   # 175
-                real_num = match.group(2)     # 177
-                rest = match.group(3)         # Name
-                
-                # Если числа разные - берём второе (реальное)
-                if prefix_num != real_num:
-                    # Используем реальное число
-                    new_name = f"{real_num}. {rest}{ext}"
-                else:
-                    # Числа одинаковые - просто убираем дубль
-                    new_name = f"{real_num}. {rest}{ext}"
-                
-                new_path = os.path.join(folder, new_name)
-                
-                if new_name != filename:
-                    try:
-                        os.rename(filepath, new_path)
-                        processed += 1
-                        print(f"✓ {filename} → {new_name}")
-                    except Exception as e:
-                        print(f"✗ Ошибка {filename}: {e}")
-        
-        messagebox.showinfo("Готово", 
-                          f"✅ Нормализовано файлов: {processed}\n\n"
-                          f"📁 Бекап: {os.path.basename(backup_folder)}")
+        messagebox.showinfo("Готово", f"✅ Нормализовано файлов: {processed}")
         
         self.app.set_status(f"✓ Нормализовано: {processed} файлов", success=True)
     
@@ -185,64 +221,30 @@ class ToolsPanel(ttk.LabelFrame):
             messagebox.showwarning("Предупреждение", "Выберите папку видео")
             return
         
-        # Создаём бекап
-        success, backup_folder = self.create_backup(folder)
-        if not success:
-            return
-        
         # Собираем файлы
-        files = []
-        for filename in os.listdir(folder):
-            if filename.startswith('_backup_'):
-                continue
-            
-            filepath = os.path.join(folder, filename)
-            if os.path.isfile(filepath):
-                files.append({"path": filepath, "name": filename})
+        files = self.list_files(folder)
         
         if not files:
             messagebox.showinfo("Информация", "Нет файлов в папке")
             return
         
         # Сортируем
-        files.sort(key=lambda f: natural_sort_key(f['name']))
+        files.sort(key=natural_sort_key)
         
-        # Временные имена
-        temp_files = []
-        for i, file_info in enumerate(files, 1):
-            old_path = file_info['path']
-            name, ext = os.path.splitext(file_info['name'])
+        # Весь план строится заранее: занятые номера и циклы разрешает RenamePlan
+        plan = RenamePlan(folder)
+        for i, filename in enumerate(files, 1):
+            name, ext = os.path.splitext(filename)
             
             # Убираем старый номер если есть
             clean_name = re.sub(r'^\d+[\.\s]+', '', name)
-            
-            temp_name = f"temp_{i}_{int(time.time() * 1000000)}_{clean_name}{ext}"
-            temp_path = os.path.join(folder, temp_name)
-            
-            os.rename(old_path, temp_path)
-            temp_files.append({
-                "temp_path": temp_path, 
-                "new_number": i, 
-                "clean_name": clean_name,
-                "ext": ext
-            })
-        
-        # Финальные имена
-        processed = 0
-        for item in temp_files:
-            final_name = f"{item['new_number']}. {item['clean_name']}{item['ext']}"
-            final_path = os.path.join(folder, final_name)
-            
-            try:
-                os.rename(item['temp_path'], final_path)
-                processed += 1
-                print(f"✓ → {final_name}")
-            except Exception as e:
-                print(f"✗ Ошибка: {e}")
+            plan.add(filename, f"{i}. {clean_name}{ext}")
         
-        messagebox.showinfo("Готово", 
-                          f"✅ Перенумеровано: {processed} файлов\n\n"
-                          f"📁 Бекап: {os.path.basename(backup_folder)}")
+        success, processed = self.apply_plan(plan, "Перенумерация")
+        if not success:
+            return
+        
+        messagebox.showinfo("Готово", f"✅ Перенумеровано: {processed} файлов")
         
         self.app.set_status(f"✓ Перенумеровано: {processed} файлов", success=True)
     
@@ -272,103 +274,32 @@ class ToolsPanel(ttk.LabelFrame):
         # ШАГ 1: Нормализация имён в папке видео
         print("\n=== ШАГ 1: Нормализация имён видео ===")
         
-        # Создаём бекап видео
-        success, backup_folder = self.create_backup(video_folder)
+        success, normalized = self.apply_plan(self.normalize_plan(video_folder, skip_txt=True),
+                                              "Нормализация имён видео", confirm=False)
         if not success:
             return
         
-        normalized = 0
-        for filename in os.listdir(video_folder):
-            if filename.startswith('_backup_') or filename.endswith('.txt'):
-                continue
-            
-            filepath = os.path.join(video_folder, filename)
-            if not os.path.isfile(filepath):
-                continue
-            
-            name, ext = os.path.splitext(filename)
-            
-            # Нормализуем: 175. 177_Name → 177. Name
-            match = re.match(r'^(\d+)\.\s*(\d+)[_\.\s]+(.+)$', name)
-            
-            if match:
-                prefix_num = match.group(1)
-                real_num = match.group(2)
-                rest = match.group(3)
-                
-                new_name = f"{real_num}. {rest}{ext}"
-                new_path = os.path.join(video_folder, new_name)
-                
-                if new_name != filename:
-                    try:
-                        os.rename(filepath, new_path)
-                        normalized += 1
-                        print(f"✓ {filename} → {new_name}")
-                    except Exception as e:
-                        print(f"✗ {filename}: {e}")
-        
         print(f"\n✓ Нормализовано видео: {normalized}")
         
         # ШАГ 2: Нормализация имён в папке картинок
         print("\n=== ШАГ 2: Нормализация имён картинок ===")
         
-        # Создаём бекап картинок
-        success, backup_images = self.create_backup(images_folder)
-        
-        normalized_images = 0
-        for filename in os.listdir(images_folder):
-            if filename.startswith('_backup_'):
-                continue
-            
-            filepath = os.path.join(images_folder, filename)
-            if not os.path.isfile(filepath):
-                continue
-            
-            name, ext = os.path.splitext(filename)
-            
-            match = re.match(r'^(\d+)\.\s*(\d+)[_\.\s]+(.+)$', name)
-            
-            if match:
-                real_num = match.group(2)
-                rest = match.group(3)
-                new_name = f"{real_num}. {rest}{ext}"
-                new_path = os.path.join(images_folder, new_name)
-                
-                if new_name != filename:
-                    try:
-                        os.rename(filepath, new_path)
-                        normalized_images += 1
-                        print(f"✓ {filename} → {new_name}")
-                    except Exception as e:
-                        print(f"✗ {filename}: {e}")
+        success, normalized_images = self.apply_plan(self.normalize_plan(images_folder),
+                                                     "Нормализация имён картинок", confirm=False)
+        if not success:
+            return
         
         print(f"\n✓ Нормализовано картинок: {normalized_images}")
         
         # ШАГ 3: Поиск пропусков
         print("\n=== ШАГ 3: Поиск пропусков ===")
         
-        # Получаем номера видео
-        video_numbers = set()
-        for file in os.listdir(video_folder):
-            if file.startswith('_backup_') or file.endswith('.txt'):
-                continue
-            if file.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
-                match = re.match(r'^(\d+)', file)
-                if match:
-                    video_numbers.add(int(match.group(1)))
-        
-        # Получаем номера картинок
-        image_numbers = set()
-        image_files = {}
-        for file in os.listdir(images_folder):
-            if file.startswith('_backup_'):
-                continue
-            if file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                match = re.match(r'^(\d+)', file)
-                if match:
-                    num = int(match.group(1))
-                    image_numbers.add(num)
-                    image_files[num] = file
+        # Номера видео и картинок (индекс после переименования перечитает папки сам)
+        video_numbers = set(FolderIndex.numbered(video_folder, 'video'))
+        
+        image_files = {num: entry['name']
+                       for num, entry in FolderIndex.numbered(images_folder, 'image').items()}
+        image_numbers = set(image_files)
         
         # Находим пропуски
         missing_numbers = sorted(image_numbers - video_numbers)
@@ -378,8 +309,7 @@ class ToolsPanel(ttk.LabelFrame):
                               f"✅ Нормализовано:\n"
                               f"   • Видео: {normalized}\n"
                               f"   • Картинки: {normalized_images}\n\n"
-                              f"✅ Пропусков не найдено!\n\n"
-                              f"📁 Бекапы созданы")
+                              f"✅ Пропусков не найдено!")
             return
         
         # ШАГ 4: Копирование в папку ошибок
@@ -449,8 +379,7 @@ class ToolsPanel(ttk.LabelFrame):
             f"   • Папка: {errors_folder}\n"
             f"   • Промпты: failed_video_prompts.txt\n\n"
             f"🔢 Пропущенные: {', '.join(map(str, missing_numbers[:20]))}"
-            f"{'...' if len(missing_numbers) > 20 else ''}\n\n"
-            f"💾 Бекапы созданы"
+            f"{'...' if len(missing_numbers) > 20 else ''}"
         )
         
         messagebox.showinfo("Анализ пропусков видео", report)
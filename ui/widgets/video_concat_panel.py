@@ -5,7 +5,7 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
 from core.config import Config
-from utils.video_processor import VideoProcessor
+from utils.folder_index import FolderIndex
 
 
 class VideoConcatPanel(ttk.LabelFrame):
@@ -14,6 +14,7 @@ class VideoConcatPanel(ttk.LabelFrame):
     def __init__(self, parent, app, **kwargs):
         super().__init__(parent, text="🎬 Монтаж видео", padding=10, **kwargs)
         self.app = app
+        self.concat_job = None
         self.create_widgets()
     
     def create_widgets(self):
@@ -93,12 +94,13 @@ class VideoConcatPanel(ttk.LabelFrame):
         ).pack(side="left")
         
         # Кнопка склейки
-        ttk.Button(
+        self.concat_button = ttk.Button(
             self, 
             text="🔗 Склеить все видео",
             command=self.concatenate_videos,
             style='Accent.TButton'
-        ).pack(fill="x", pady=10)
+        )
+        self.concat_button.pack(fill="x", pady=10)
         
         self.auto_detect_folder()
     
@@ -120,17 +122,18 @@ class VideoConcatPanel(ttk.LabelFrame):
     
     def concatenate_videos(self):
         """Склеить видео"""
+        if self.concat_job:
+            return
+        
         output_folder = self.video_folder_var.get()
         
         if not output_folder or not os.path.exists(output_folder):
             messagebox.showwarning("Предупреждение", "Выберите папку с видео")
             return
         
-        video_files = []
-        for filename in sorted(os.listdir(output_folder)):
-            if filename.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
-                if filename != "FINAL_VIDEO.mp4":
-                    video_files.append(os.path.join(output_folder, filename))
+        # Естественный порядок: 2.mp4 раньше 10.mp4
+        video_files = [entry['path'] for entry in FolderIndex.files(output_folder, 'video')
+                       if entry['name'] != "FINAL_VIDEO.mp4"]
         
         if len(video_files) < 2:
             messagebox.showinfo("Информация", "Нужно минимум 2 видео для склейки")
@@ -144,21 +147,41 @@ class VideoConcatPanel(ttk.LabelFrame):
         
         self.app.set_status(f"⚙ Склейка {len(video_files)} видео...")
         
-        try:
-            success, result = VideoProcessor.concatenate_videos_with_transitions(
-                video_files=video_files,
-                output_file=final_output,
-                transition_type=transition_code,
-                duration=transition_duration
-            )
-            
-            if success:
-                self.app.set_status(f"✓ Видео склеено!", success=True)
-                messagebox.showinfo("Успех", f"✅ Видео успешно склеено!\n\n📁 {final_output}")
-            else:
-                self.app.set_status(f"✗ Ошибка склейки", success=False)
-                messagebox.showerror("Ошибка", f"Не удалось склеить видео:\n{result}")
-        
-        except Exception as e:
-            self.app.set_status(f"✗ Ошибка: {e}", success=False)
-            messagebox.showerror("Ошибка", f"Ошибка склейки видео:\n{e}")
+        self.concat_button.config(state="disabled")
+        self.concat_job = self.app.jobs.submit(
+            self.concatenate_job, video_files, final_output, transition_code, transition_duration,
+            on_done=lambda result: self.on_concatenate_done(result, final_output),
+            on_error=self.on_concatenate_error
+        )
+    
+    def concatenate_job(self, job, video_files, final_output, transition_code, transition_duration):
+        """Склейка (фоновый поток)"""
+        from utils.video_processor import VideoProcessor
+        return VideoProcessor.concatenate_videos_with_transitions(
+            video_files=video_files,
+            output_file=final_output,
+            transition_type=transition_code,
+            duration=transition_duration
+        )
+    
+    def on_concatenate_done(self, result, final_output):
+        """Итог склейки (поток Tk)"""
+        self.finish_concatenate()
+        success, result = result
+        if success:
+            self.app.set_status(f"✓ Видео склеено!", success=True)
+            messagebox.showinfo("Успех", f"✅ Видео успешно склеено!\n\n📁 {final_output}")
+        else:
+            self.app.set_status(f"✗ Ошибка склейки", success=False)
+            messagebox.showerror("Ошибка", f"Не удалось склеить видео:\n{result}")
+    
+    def on_concatenate_error(self, error):
+        """Ошибка склейки (поток Tk)"""
+        self.finish_concatenate()
+        self.app.set_status(f"✗ Ошибка: {error}", success=False)
+        messagebox.showerror("Ошибка", f"Ошибка склейки видео:\n{error}")
+    
+    def finish_concatenate(self):
+        """Вернуть кнопку в исходное состояние"""
+        self.concat_job = None
+        self.concat_button.config(state="normal")
@@ -5,7 +5,6 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
 from core.config import Config
-from utils.video_processor import VideoProcessor
 
 
 class VideoReplacePanel(ttk.LabelFrame):
@@ -14,6 +13,7 @@ class VideoReplacePanel(ttk.LabelFrame):
     def __init__(self, parent, app, **kwargs):
         super().__init__(parent, text="🎬 Замена звука в видео", padding=10, **kwargs)
         self.app = app
+        self.process_job = None
         self.create_widgets()
     
     def create_widgets(self):
@@ -83,12 +83,13 @@ class VideoReplacePanel(ttk.LabelFrame):
         ).pack(anchor="w", pady=2)
         
         # Кнопка обработки
-        ttk.Button(
+        self.process_button = ttk.Button(
             self, 
             text="🎬 Заменить звук в видео",
             command=self.process_videos,
             style='Accent.TButton'
-        ).pack(fill="x", pady=10)
+        )
+        self.process_button.pack(fill="x", pady=10)
         
         self.auto_detect_folders()
     
@@ -121,6 +122,9 @@ class VideoReplacePanel(ttk.LabelFrame):
     
     def process_videos(self):
         """Обработать видео (заменить звук)"""
+        if self.process_job:
+            return
+        
         video_folder = self.video_input_folder_var.get()
         audio_folder = self.app.settings_panel.output_folder_var.get()
         output_folder = self.video_output_folder_var.get()
@@ -135,6 +139,7 @@ class VideoReplacePanel(ttk.LabelFrame):
         
         os.makedirs(output_folder, exist_ok=True)
         
+        from utils.video_processor import VideoProcessor
         pairs = VideoProcessor.find_video_audio_pairs(video_folder, audio_folder)
         
         if not pairs:
@@ -143,26 +148,55 @@ class VideoReplacePanel(ttk.LabelFrame):
         
         self.app.set_status(f"⚙ Обработка {len(pairs)} видео...")
         
-        success_count = 0
-        for i, pair in enumerate(pairs, 1):
-            try:
-                output_file = os.path.join(output_folder, f"{pair['number']}.mp4")
-                
-                self.app.set_status(f"⚙ Обработка {i}/{len(pairs)}: {pair['number']}")
-                
-                success, msg = VideoProcessor.process_single_video(
-                    pair['video'],
-                    pair['audio'],
-                    output_file,
-                    fit_mode=self.video_fit_mode_var.get(),
-                    keep_original=self.app.audio_mix_panel.keep_original_audio_var.get(),
-                    original_volume=self.app.audio_mix_panel.original_volume_var.get()
-                )
-                
-                if success:
-                    success_count += 1
-            except Exception as e:
-                print(f"Ошибка обработки {pair['number']}: {e}")
-        
-        self.app.set_status(f"✓ Готово! Обработано: {success_count}/{len(pairs)}", success=True)
-        messagebox.showinfo("Готово", f"Обработано видео: {success_count}/{len(pairs)}")
+        options = {
+            'fit_mode': self.video_fit_mode_var.get(),
+            'keep_original': self.app.audio_mix_panel.keep_original_audio_var.get(),
+            'original_volume': self.app.audio_mix_panel.original_volume_var.get()
+        }
+        
+        self.process_button.config(state="disabled")
+        self.process_job = self.app.jobs.submit(
+            self.process_videos_job, pairs, output_folder, options,
+            on_progress=self.app.on_job_progress,
+            on_done=self.on_process_done,
+            on_error=self.on_process_error
+        )
+    
+    def process_videos_job(self, job, pairs, output_folder, options):
+        """Замена звука во всех парах (фоновый поток, пары обрабатываются параллельно)"""
+        job.report("progress", 0, len(pairs))
+        
+        def on_progress(done, total, number, success, msg):
+            mark = "⚙" if success else "⚠"
+            job.report("status", f"{mark} Обработано {done}/{total}: {number}", None)
+            job.report("progress", done, total)
+        
+        from utils.batch_processor import BatchVideoProcessor
+        success_count, failed = BatchVideoProcessor().run(
+            pairs, output_folder, options,
+            on_progress=on_progress,
+            should_stop=job.is_cancelled
+        )
+        
+        for number, msg in failed:
+            print(f"Ошибка обработки {number}: {msg}")
+        
+        return success_count, len(pairs)
+    
+    def on_process_done(self, result):
+        """Итог обработки (поток Tk)"""
+        self.finish_processing()
+        success_count, total = result
+        self.app.set_status(f"✓ Готово! Обработано: {success_count}/{total}", success=True)
+        messagebox.showinfo("Готово", f"Обработано видео: {success_count}/{total}")
+    
+    def on_process_error(self, error):
+        """Ошибка обработки (поток Tk)"""
+        self.finish_processing()
+        self.app.set_status("✗ Ошибка", error=True)
+        messagebox.showerror("Ошибка", f"Не удалось обработать видео: {error}")
+    
+    def finish_processing(self):
+        """Вернуть кнопку в исходное состояние"""
+        self.process_job = None
+        self.process_button.config(state="normal")
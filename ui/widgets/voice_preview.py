@@ -4,8 +4,6 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import os
-import requests
-import time
 from core.config import Config
 from utils.helpers import open_file_in_system
 
@@ -88,7 +86,7 @@ class VoicePreviewCombobox(ttk.Frame):
         else:
             self.generate_preview()
     
-    def generate_preview(self):
+    def generate_preview(self, use_cache=True):
         """Создать пример голоса"""
         template = self.get_current_template()
         if not template:
@@ -105,55 +103,88 @@ class VoicePreviewCombobox(ttk.Frame):
             messagebox.showwarning("Предупреждение", "Введите API Key")
             return
         
-        # Генерируем озвучку через API
+        # Генерируем озвучку через API в фоне
         self.app.set_status("⚙ Генерация примера голоса...")
+        self.play_btn.config(state="disabled")
+        self.regen_btn.config(state="disabled")
         
-        try:
-            from core.api_client import VoiceAPIClient
-            
-            api = VoiceAPIClient(api_key)
-            template_uuid = template.get('uuid')
-            
-            # Создаём задачу на синтез
-            success, result = api.create_task(test_text, template_uuid)
-            
-            if not success:
-                messagebox.showerror("Ошибка", f"Ошибка API: {result}")
-                self.app.set_status("✗ Ошибка", error=True)
-                return
-            
-            task_id = result.get("task_id")
-            
-            # Ожидаем завершения задачи
-            self.app.set_status("⚙ Ожидание результата...")
-            
-            def status_callback(status, status_data, attempt):
-                self.app.set_status(f"⚙ {status_data.get('status_label', status)} ({attempt}с)")
-            
-            success, result = api.wait_for_task(task_id, callback=status_callback)
-            
+        self.app.jobs.submit(
+            self.generate_preview_job, template, test_text, api_key, use_cache,
+            on_progress=self.app.on_job_progress,
+            on_done=self.on_preview_done,
+            on_error=self.on_preview_error
+        )
+    
+    def generate_preview_job(self, job, template, test_text, api_key, use_cache):
+        """Синтез примера (фоновый поток): (путь, None) или (None, текст ошибки)"""
+        from core.api_client import VoiceAPIClient
+        from core.result_cache import SynthesisCache
+        
+        api = VoiceAPIClient.get_client(api_key)
+        template_uuid = template.get('uuid')
+        cache = SynthesisCache.get_default()
+        preview_path = self.get_preview_path(template)
+        preview_folder = os.path.dirname(preview_path)
+        preview_name = os.path.splitext(os.path.basename(preview_path))[0]
+        
+        # Пример с этим текстом уже создавался
+        if use_cache:
+            success, preview_path = cache.restore(
+                template_uuid, test_text, None, preview_folder, preview_name, ext=".mp3")
             if success:
-                # Получаем результат
-                success, content = api.get_task_result(task_id)
-                
-                if success:
-                    preview_path = self.get_preview_path(template)
-                    with open(preview_path, 'wb') as f:
-                        f.write(content)
-                    
-                    self.app.set_status("✓ Пример создан!", success=True)
-                    self.update_buttons()
-                    open_file_in_system(preview_path)
-                else:
-                    messagebox.showerror("Ошибка", "Не удалось получить результат")
-                    self.app.set_status("✗ Ошибка", error=True)
-            else:
-                messagebox.showerror("Ошибка", f"Ошибка: {result}")
-                self.app.set_status("✗ Ошибка", error=True)
-        
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось создать пример: {e}")
+                cache.flush()
+                return preview_path, None
+        
+        # Создаём задачу на синтез
+        success, result = api.create_task(test_text, template_uuid)
+        
+        if not success:
+            return None, f"Ошибка API: {result}"
+        
+        task_id = result.get("task_id")
+        
+        # Ожидаем завершения задачи
+        job.report("status", "⚙ Ожидание результата...", None)
+        
+        def status_callback(status, status_data, elapsed):
+            job.report("status", f"⚙ {status_data.get('status_label', status)} ({elapsed}с)", None)
+        
+        success, result = api.wait_for_task(task_id, callback=status_callback,
+                                            text_length=len(test_text),
+                                            should_stop=job.is_cancelled)
+        
+        if not success:
+            return None, f"Ошибка: {result}"
+        
+        # Скачиваем результат сразу в папку примеров
+        success, preview_path = api.download_task_result(
+            task_id, preview_folder, preview_name, ext=".mp3", should_stop=job.is_cancelled)
+        
+        if not success:
+            return None, "Не удалось получить результат"
+        
+        cache.store(template_uuid, test_text, None, preview_path)
+        cache.flush()
+        return preview_path, None
+    
+    def on_preview_done(self, result):
+        """Пример готов (поток Tk)"""
+        preview_path, error = result
+        self.update_buttons()
+        
+        if error:
+            messagebox.showerror("Ошибка", error)
             self.app.set_status("✗ Ошибка", error=True)
+            return
+        
+        self.app.set_status("✓ Пример создан!", success=True)
+        open_file_in_system(preview_path)
+    
+    def on_preview_error(self, error):
+        """Ошибка создания примера (поток Tk)"""
+        self.update_buttons()
+        messagebox.showerror("Ошибка", f"Не удалось создать пример: {error}")
+        self.app.set_status("✗ Ошибка", error=True)
     
     def regenerate_preview(self):
         """Пересоздать пример голоса"""
@@ -166,5 +197,5 @@ class VoicePreviewCombobox(ttk.Frame):
         if os.path.exists(preview_path):
             os.remove(preview_path)
         
-        # Создаём новый
-        self.generate_preview()
+        # Создаём новый (мимо кэша)
+        self.generate_preview(use_cache=False)
@@ -1,17 +1,27 @@
 # utils/__init__.py
 """Утилиты приложения"""
 
-from .file_tools import FileTools
-from .video_processor import VideoProcessor
-from .audio_processor import AudioProcessor
-from .project_manager import ProjectManager
+from core.lazy import lazy_exports
 from .helpers import *
 
+# Обработчики медиа грузятся при первом обращении (moviepy и numpy
+# импортируются только внутри операций с файлами)
+__getattr__ = lazy_exports(__name__, {
+    'FileTools': '.file_tools',
+    'VideoProcessor': '.video_processor',
+    'AudioProcessor': '.audio_processor',
+    'ProjectManager': '.project_manager',
+    'FFmpeg': '.ffmpeg_tools',
+    'MediaInfo': '.media_info',
+})
+
 __all__ = [
     'FileTools',
     'VideoProcessor', 
     'AudioProcessor',
     'ProjectManager',
+    'FFmpeg',
+    'MediaInfo',
     'open_file_in_system',
     'natural_sort_key',
     'safe_filename'
@@ -2,6 +2,7 @@
 """Обработка аудио файлов"""
 
 import os
+from core.config import Config
 
 class AudioProcessor:
     """Инструменты для обработки аудио"""
@@ -22,18 +23,31 @@ class AudioProcessor:
             
             # Соединяем
             final_audio = concatenate_audioclips([audio, silence])
-            final_audio.write_audiofile(audio_file, codec='mp3')
             
-            audio.close()
-            final_audio.close()
+            # Во временный файл: исходник читается, пока пишется результат,
+            # и жёсткие ссылки на него (снимки папки) не меняются
+            root, ext = os.path.splitext(audio_file)
+            temp_file = f"{root}.part{ext or '.mp3'}"
+            try:
+                final_audio.write_audiofile(temp_file, codec='mp3')
+                audio.close()
+                final_audio.close()
+                os.replace(temp_file, audio_file)
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
             
             return True, "Пауза добавлена"
         except Exception as e:
             return False, str(e)
     
     @staticmethod
-    def adjust_duration(audio_file, target_duration):
+    def adjust_duration(audio_file, target_duration, preserve_pitch=False):
         """Изменить длительность аудио"""
+        if preserve_pitch:
+            return AudioProcessor.postprocess(audio_file, target_duration=target_duration,
+                                              preserve_pitch=True)
+        
         try:
             from moviepy.editor import AudioFileClip
             
@@ -47,18 +61,160 @@ class AudioProcessor:
             
             # Изменяем скорость
             new_audio = audio.fx(lambda clip: clip.speedx(speed_ratio))
-            new_audio.write_audiofile(audio_file, codec='mp3')
             
-            audio.close()
-            new_audio.close()
+            root, ext = os.path.splitext(audio_file)
+            temp_file = f"{root}.part{ext or '.mp3'}"
+            try:
+                new_audio.write_audiofile(temp_file, codec='mp3')
+                audio.close()
+                new_audio.close()
+                os.replace(temp_file, audio_file)
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
             
             return True, f"Длительность изменена: {current_duration:.2f}s → {target_duration:.2f}s"
         except Exception as e:
             return False, str(e)
     
+    @staticmethod
+    def postprocess(audio_file, end_pause=0, target_duration=None, output_file=None,
+                    preserve_pitch=False):
+        """
+        Пауза в конце и подгонка длительности за одно декодирование/кодирование.
+        preserve_pitch - менять темп без изменения высоты голоса.
+        Результат пишется во временный файл и атомарно заменяет output_file
+        (по умолчанию - исходный файл).
+        """
+        output_file = output_file or audio_file
+        end_pause = max(0.0, end_pause or 0)
+        
+        root, ext = os.path.splitext(output_file)
+        temp_file = f"{root}.part{ext or '.mp3'}"
+        
+        if not end_pause and not target_duration:
+            if output_file != audio_file:
+                import shutil
+                try:
+                    shutil.copy2(audio_file, temp_file)
+                    os.replace(temp_file, output_file)
+                finally:
+                    if os.path.exists(temp_file):
+                        os.remove(temp_file)
+            return True, "Без изменений"
+        
+        try:
+            success, msg = AudioProcessor._postprocess_ffmpeg(
+                audio_file, temp_file, end_pause, target_duration, preserve_pitch
+            )
+            if success is None:
+                success, msg = AudioProcessor._postprocess_moviepy(
+                    audio_file, temp_file, end_pause, target_duration, preserve_pitch
+                )
+            
+            if success:
+                os.replace(temp_file, output_file)
+            return success, msg
+        except Exception as e:
+            return False, str(e)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+    
+    @staticmethod
+    def _postprocess_ffmpeg(audio_file, temp_file, end_pause, target_duration, preserve_pitch):
+        """Одна цепочка фильтров ffmpeg; (None, причина) если ffmpeg недоступен"""
+        from .ffmpeg_tools import FFmpeg
+        from .media_info import MediaInfo
+        
+        if not FFmpeg.available():
+            return None, "ffmpeg не найден"
+        
+        info = MediaInfo.get(audio_file)
+        duration = info['duration'] if info else None
+        if not duration:
+            return None, "Не удалось определить длительность"
+        
+        filters = []
+        if end_pause:
+            filters.append(f"apad=pad_dur={end_pause:.3f}")
+        
+        new_duration = duration + end_pause
+        if target_duration and preserve_pitch:
+            filters.extend(FFmpeg.atempo_filters(new_duration / target_duration))
+            new_duration = target_duration
+        elif target_duration:
+            sample_rate = info['sample_rate'] or FFmpeg.probe_sample_rate(audio_file)
+            if not sample_rate:
+                return None, "Не удалось определить частоту"
+            # Как speedx: ускорение вместе с высотой тона
+            speed_ratio = new_duration / target_duration
+            filters.append(f"asetrate={sample_rate * speed_ratio:.3f}")
+            filters.append(f"aresample={sample_rate}")
+            new_duration = target_duration
+        
+        success, log = FFmpeg.run([
+            '-i', audio_file,
+            '-vn',
+            '-af', ",".join(filters),
+            '-t', f"{new_duration:.3f}",
+            '-b:a', Config.FFMPEG_MP3_BITRATE,
+            temp_file
+        ])
+        if not success:
+            return False, log.strip().splitlines()[-1] if log.strip() else "Ошибка ffmpeg"
+        
+        return True, f"Обработано: {duration:.2f}s → {new_duration:.2f}s"
+    
+    @staticmethod
+    def _postprocess_moviepy(audio_file, temp_file, end_pause, target_duration, preserve_pitch):
+        """Та же обработка через moviepy, с одной записью файла"""
+        from moviepy.editor import AudioFileClip, AudioClip, concatenate_audioclips
+        
+        audio = AudioFileClip(audio_file)
+        duration = audio.duration
+        if not duration:
+            audio.close()
+            return False, "Аудио пустое"
+        
+        final_audio = audio
+        if end_pause:
+            silence = AudioClip(lambda t: 0, duration=end_pause).set_fps(audio.fps)
+            final_audio = concatenate_audioclips([final_audio, silence])
+        
+        new_duration = duration + end_pause
+        if target_duration and preserve_pitch:
+            from moviepy.audio.AudioClip import AudioArrayClip
+            from .time_stretch import time_stretch, fit_length
+            
+            # Растяжение по отсчётам целиком в NumPy
+            fps = audio.fps
+            samples = final_audio.to_soundarray(fps=fps)
+            stretched = time_stretch(samples, new_duration / target_duration, fps)
+            stretched = fit_length(stretched, int(round(target_duration * fps)))
+            final_audio = AudioArrayClip(stretched, fps=fps)
+            new_duration = target_duration
+        elif target_duration:
+            speed_ratio = new_duration / target_duration
+            final_audio = final_audio.fx(lambda clip: clip.speedx(speed_ratio))
+            new_duration = target_duration
+        
+        final_audio.write_audiofile(temp_file, codec='mp3', logger=None)
+        
+        audio.close()
+        final_audio.close()
+        
+        return True, f"Обработано: {duration:.2f}s → {new_duration:.2f}s"
+    
     @staticmethod
     def get_duration(audio_file):
         """Получить длительность аудио"""
+        from .media_info import MediaInfo
+        
+        duration = MediaInfo.duration(audio_file)
+        if duration:
+            return duration
+        
         try:
             from moviepy.editor import AudioFileClip
             audio = AudioFileClip(audio_file)
@@ -0,0 +1,163 @@
+# utils/batch_processor.py
+"""Параллельная замена звука в наборе видео"""
+
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from core.config import Config
+from .folder_index import FolderIndex
+from .media_info import MediaInfo
+
+
+def _init_worker():
+    """Ctrl+C обрабатывает главный процесс, рабочие его игнорируют"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _process_pair(pair, output_file, options, threads):
+    """
+    Обработать одну пару в процессе пула: (number, success, message, probes).
+    probes - новые сведения о файлах для кэша главного процесса.
+    """
+    from .video_processor import VideoProcessor
+
+    try:
+        success, msg = VideoProcessor.process_single_video(
+            pair['video'],
+            pair['audio'],
+            output_file,
+            threads=threads,
+            **options
+        )
+    except Exception as e:
+        success, msg = False, str(e)
+    return pair['number'], success, msg, MediaInfo.take_new_entries()
+
+
+class BatchVideoProcessor:
+    """Распределяет пары видео-аудио по пулу процессов"""
+
+    def __init__(self, max_workers=None, threads_per_job=None):
+        self.max_workers = max_workers or Config.BATCH_MAX_WORKERS
+        self.threads_per_job = threads_per_job
+
+    @staticmethod
+    def plan_workers(job_count, max_workers=None, cpu_count=None):
+        """
+        Число процессов и потоков кодировщика на задачу.
+
+        Ядра делятся между процессами так, чтобы каждому кодировщику
+        досталось не меньше BATCH_MIN_THREADS_PER_JOB потоков.
+        """
+        cpu_count = cpu_count or os.cpu_count() or 1
+        min_threads = max(1, Config.BATCH_MIN_THREADS_PER_JOB)
+
+        workers = max(1, cpu_count // min_threads)
+        if max_workers:
+            workers = min(workers, max_workers)
+        workers = max(1, min(workers, job_count))
+
+        threads = max(1, cpu_count // workers)
+        return workers, threads
+
+    def run(self, pairs, output_folder, options, on_progress=None, should_stop=None):
+        """
+        Обработать пары, сохраняя {number}.mp4 в output_folder.
+
+        on_progress(done, total, number, success, message) вызывается в
+        потоке, который вызвал run, по мере готовности каждой пары.
+        При остановке ожидающие пары снимаются, начатые дорабатывают.
+        Возвращает (success_count, failed) - failed: [(number, message)].
+        """
+        total = len(pairs)
+        if not total:
+            return 0, []
+
+        workers, threads = self.plan_workers(total, self.max_workers)
+        if self.threads_per_job:
+            threads = self.threads_per_job
+        print(f"[DEBUG] Пакетная обработка: {total} видео, процессов {workers}, потоков на задачу {threads}")
+
+        self._total = total
+        self._done = 0
+        self._success = 0
+        self._failed = []
+        self._on_progress = on_progress
+        self._should_stop = should_stop
+        self._output_folder = output_folder
+
+        broken = self._run_pool(pairs, output_folder, options, workers, threads)
+
+        # Упавший процесс ломает весь пул: незавершённые пары перезапускаем
+        # в новом пуле, а если он снова упадёт - по одной, чтобы ошибка
+        # досталась только виновной паре
+        if broken and not self._is_stopped():
+            broken = self._run_pool(broken, output_folder, options, workers, threads)
+
+        for pair in broken:
+            if self._is_stopped():
+                break
+            if self._run_pool([pair], output_folder, options, 1, threads):
+                self._finish(pair['number'], False, "процесс обработки аварийно завершился")
+
+        return self._success, sorted(self._failed)
+
+    def _is_stopped(self):
+        return bool(self._should_stop and self._should_stop())
+
+    def _finish(self, number, success, msg):
+        """Учесть результат пары и сообщить прогресс"""
+        self._done += 1
+        if success:
+            self._success += 1
+            # Готовый файл появился в папке - её список в индексе устарел
+            FolderIndex.invalidate(self._output_folder)
+        else:
+            self._failed.append((number, msg))
+            print(f"[ERROR] Видео {number}: {msg}")
+
+        if self._on_progress:
+            self._on_progress(self._done, self._total, number, success, msg)
+
+    def _run_pool(self, pairs, output_folder, options, workers, threads):
+        """Прогнать пары через пул; вернуть пары, не завершённые из-за падения пула"""
+        broken = []
+
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        try:
+            futures = {}
+            for pair in pairs:
+                output_file = os.path.join(output_folder, f"{pair['number']}.mp4")
+                future = executor.submit(_process_pair, pair, output_file, options, threads)
+                futures[future] = pair
+            pending = set(futures)
+
+            while pending:
+                if self._is_stopped():
+                    # Ещё не начатые задачи снимаем, начатые дождутся завершения
+                    for future in pending:
+                        future.cancel()
+                    pending = {f for f in pending if not f.cancelled()}
+                    if not pending:
+                        break
+
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    pair = futures[future]
+                    try:
+                        number, success, msg, probes = future.result()
+                        MediaInfo.add_entries(probes)
+                    except BrokenProcessPool:
+                        broken.append(pair)
+                        continue
+                    except Exception as e:
+                        number, success, msg = pair['number'], False, str(e)
+
+                    self._finish(number, success, msg)
+        finally:
+            executor.shutdown(wait=True)
+            MediaInfo.save()
+
+        return sorted(broken, key=lambda pair: pair['number'])
@@ -0,0 +1,181 @@
+# utils/ffmpeg_tools.py
+"""Запуск ffmpeg/ffprobe"""
+
+import os
+import re
+import json
+import shutil
+import subprocess
+from core.config import Config
+
+
+class FFmpeg:
+    """Поиск и запуск ffmpeg"""
+
+    _binary = None
+    _probe_binary = None
+
+    @staticmethod
+    def binary():
+        """Путь к ffmpeg: настройка, PATH или копия из imageio-ffmpeg (идёт с moviepy)"""
+        if FFmpeg._binary is None:
+            path = Config.FFMPEG_BINARY or shutil.which("ffmpeg")
+            if not path:
+                try:
+                    import imageio_ffmpeg
+                    path = imageio_ffmpeg.get_ffmpeg_exe()
+                except Exception:
+                    path = ""
+            FFmpeg._binary = path
+        return FFmpeg._binary or None
+
+    @staticmethod
+    def probe_binary():
+        """Путь к ffprobe (может отсутствовать)"""
+        if FFmpeg._probe_binary is None:
+            path = Config.FFPROBE_BINARY or shutil.which("ffprobe")
+            if not path and FFmpeg.binary():
+                # ffprobe обычно лежит рядом с ffmpeg
+                folder = os.path.dirname(FFmpeg.binary())
+                name = "ffprobe.exe" if os.name == "nt" else "ffprobe"
+                candidate = os.path.join(folder, name)
+                path = candidate if os.path.exists(candidate) else ""
+            FFmpeg._probe_binary = path
+        return FFmpeg._probe_binary or None
+
+    @staticmethod
+    def available():
+        """Есть ли ffmpeg"""
+        return FFmpeg.binary() is not None
+
+    @staticmethod
+    def run(args):
+        """Запустить ffmpeg с аргументами: (success, stderr)"""
+        command = [FFmpeg.binary(), '-hide_banner', '-nostdin', '-y'] + list(args)
+        print(f"[DEBUG] ffmpeg {' '.join(str(a) for a in args)}")
+        try:
+            result = subprocess.run(command, capture_output=True, text=True,
+                                    encoding='utf-8', errors='replace')
+        except OSError as e:
+            return False, str(e)
+
+        if result.returncode != 0:
+            return False, result.stderr[-2000:]
+        return True, result.stderr
+
+    @staticmethod
+    def probe(path):
+        """Сведения о файле через ffprobe (dict формата -show_format -show_streams) или None"""
+        probe = FFmpeg.probe_binary()
+        if not probe:
+            return None
+
+        command = [probe, '-v', 'error', '-print_format', 'json',
+                   '-show_format', '-show_streams', path]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True,
+                                    encoding='utf-8', errors='replace')
+            if result.returncode != 0:
+                return None
+            return json.loads(result.stdout)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _describe(path):
+        """Вывод ffmpeg -i (когда ffprobe нет)"""
+        if not FFmpeg.available():
+            return ""
+        try:
+            result = subprocess.run([FFmpeg.binary(), '-hide_banner', '-i', path],
+                                    capture_output=True, text=True,
+                                    encoding='utf-8', errors='replace')
+        except OSError:
+            return ""
+        return result.stderr
+
+    @staticmethod
+    def probe_duration(path):
+        """Длительность файла в секундах или None"""
+        info = FFmpeg.probe(path)
+        if info:
+            try:
+                return float(info['format']['duration'])
+            except (KeyError, TypeError, ValueError):
+                pass
+
+        # Без ffprobe - разбираем вывод ffmpeg -i
+        match = re.search(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)', FFmpeg._describe(path))
+        if not match:
+            return None
+        hours, minutes, seconds = match.groups()
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    @staticmethod
+    def probe_sample_rate(path):
+        """Частота дискретизации первой звуковой дорожки или None"""
+        info = FFmpeg.probe(path)
+        if info:
+            for stream in info.get('streams', []):
+                if stream.get('codec_type') == 'audio' and stream.get('sample_rate'):
+                    return int(stream['sample_rate'])
+
+        match = re.search(r'Audio:.*?(\d+) Hz', FFmpeg._describe(path))
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def has_audio(path):
+        """Есть ли в файле звуковая дорожка"""
+        info = FFmpeg.probe(path)
+        if info:
+            return any(s.get('codec_type') == 'audio' for s in info.get('streams', []))
+        return 'Audio:' in FFmpeg._describe(path)
+
+    @staticmethod
+    def atempo_filters(ratio):
+        """Цепочка atempo на коэффициент ratio (один фильтр умеет только 0.5-2.0)"""
+        filters = []
+        while ratio > 2.0:
+            filters.append("atempo=2.0")
+            ratio /= 2.0
+        while ratio < 0.5:
+            filters.append("atempo=0.5")
+            ratio /= 0.5
+        filters.append(f"atempo={ratio:.6f}")
+        return filters
+
+    @staticmethod
+    def keyframes(path):
+        """Время ключевых кадров видеодорожки или []"""
+        probe = FFmpeg.probe_binary()
+        if probe:
+            # ffprobe читает только пакеты, без декодирования
+            command = [probe, '-v', 'error', '-select_streams', 'v:0',
+                       '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', path]
+            try:
+                result = subprocess.run(command, capture_output=True, text=True,
+                                        encoding='utf-8', errors='replace')
+            except OSError:
+                return []
+            if result.returncode != 0:
+                return []
+
+            times = []
+            for line in result.stdout.splitlines():
+                pts_time, _, flags = line.partition(',')
+                if 'K' in flags:
+                    try:
+                        times.append(float(pts_time))
+                    except ValueError:
+                        continue
+            return sorted(times)
+
+        if not FFmpeg.available():
+            return []
+
+        # Без ffprobe: декодируются только ключевые кадры, время - из showinfo
+        success, log = FFmpeg.run(['-skip_frame', 'nokey', '-i', path, '-map', '0:v:0',
+                                   '-vf', 'showinfo', '-f', 'null', '-'])
+        if not success:
+            return []
+        return sorted(float(t) for t in re.findall(r'pts_time:\s*(-?[\d.]+)', log))
@@ -4,8 +4,8 @@
 import os
 import re
 import shutil
-import time
-from .helpers import natural_sort_key
+from .rename_plan import RenamePlan
+from .folder_index import FolderIndex
 
 class FileTools:
     """Инструменты для обработки файлов"""
@@ -87,7 +87,7 @@ class FileTools:
         if not files:
             return 0, "Нет файлов"
         
-        renamed_count = 0
+        plan = RenamePlan(folder)
         for file in files:
             filename = file['name']
             name, ext = os.path.splitext(filename)
@@ -98,65 +98,38 @@ class FileTools:
                 prefix = f"{number}. "
                 rest_of_name = name[len(prefix):]
                 clean_rest = re.sub(f'^{number}[\.\s_]+', '', rest_of_name)
-                new_name = prefix + clean_rest + ext
-                
-                if new_name != filename:
-                    old_path = file['path']
-                    new_path = os.path.join(folder, new_name)
-                    
-                    try:
-                        os.rename(old_path, new_path)
-                        renamed_count += 1
-                    except:
-                        pass
+                plan.add(filename, prefix + clean_rest + ext)
         
-        return renamed_count, folder
+        success, msg = plan.apply()
+        if not success:
+            return 0, msg
+        return len(plan), folder
     
     @staticmethod
     def renumber_files(folder, extensions=['.mp4', '.mp3', '.wav', '.avi']):
         """Перенумеровать файлы: 1., 2., 3."""
+        # Индекс уже отсортирован естественным порядком
         files = []
-        for file in os.listdir(folder):
-            filepath = os.path.join(folder, file)
-            if os.path.isfile(filepath):
-                ext = os.path.splitext(file)[1].lower()
-                if ext in extensions:
-                    files.append({"path": filepath, "name": file, "ext": ext})
+        for entry in FolderIndex.files(folder):
+            ext = entry['ext'].lower()
+            if ext in extensions:
+                files.append({"path": entry['path'], "name": entry['name'], "ext": ext})
         
         if not files:
             return 0, "Нет файлов"
         
-        # Сортируем
-        files.sort(key=lambda f: natural_sort_key(f['name']))
-        
-        # Временные имена
-        temp_files = []
+        # Весь план строится заранее: занятые номера и циклы разрешает RenamePlan
+        plan = RenamePlan(folder)
         for i, file in enumerate(files, 1):
-            old_path = file["path"]
-            ext = file["ext"]
-            temp_name = f"temp_{i}_{int(time.time()*1000000)}{ext}"
-            temp_path = os.path.join(folder, temp_name)
-            os.rename(old_path, temp_path)
-            temp_files.append({"temp_path": temp_path, "new_number": i, "ext": ext})
-        
-        # Финальные имена
-        for item in temp_files:
-            final_name = f"{item['new_number']}.{item['ext']}"
-            final_path = os.path.join(folder, final_name)
-            os.rename(item['temp_path'], final_path)
+            plan.add(file["name"], f"{i}{file['ext']}")
         
+        success, msg = plan.apply()
+        if not success:
+            return 0, msg
         return len(files), folder
     
     @staticmethod
     def _get_files(folder):
         """Получить список файлов в папке"""
-        files = []
-        for file in os.listdir(folder):
-            file_path = os.path.join(folder, file)
-            if os.path.isfile(file_path):
-                files.append({
-                    "path": file_path,
-                    "name": file,
-                    "ext": os.path.splitext(file)[1]
-                })
-        return files
+        return [{"path": entry['path'], "name": entry['name'], "ext": entry['ext']}
+                for entry in FolderIndex.files(folder)]
@@ -0,0 +1,166 @@
+# utils/folder_index.py
+"""Общий список файлов папок: один проход scandir, кэш по времени изменения папки"""
+
+import os
+import re
+import time
+import threading
+from .helpers import natural_sort_key
+
+# Классы файлов по расширению
+FILE_KINDS = {
+    'video': ('.mp4', '.avi', '.mov', '.mkv'),
+    'audio': ('.mp3', '.wav', '.aac'),
+    'image': ('.jpg', '.jpeg', '.png'),
+    'text': ('.txt',),
+}
+
+# Время изменения папки на FAT и сетевых дисках грубое: снимок, сделанный
+# вскоре после изменения, может не заметить следующее - такой не доверяем
+_RACY_SECONDS = 2.0
+
+
+def file_kind(name):
+    """Класс файла по расширению: 'video', 'audio', 'image', 'text' или 'other'"""
+    ext = os.path.splitext(name)[1].lower()
+    for kind, extensions in FILE_KINDS.items():
+        if ext in extensions:
+            return kind
+    return 'other'
+
+
+def make_entry(folder, name):
+    """Разобрать имя файла один раз: номер, расширение, класс, ключ сортировки"""
+    stem, ext = os.path.splitext(name)
+    match = re.match(r'^(\d+)', name)
+    return {
+        'name': name,
+        'path': os.path.join(folder, name),
+        'stem': stem,
+        'ext': ext,
+        'kind': file_kind(name),
+        'number': int(match.group(1)) if match else None,
+        'sort_key': natural_sort_key(name),
+    }
+
+
+class FolderIndex:
+    """
+    Файлы папки, прочитанные одним os.scandir.
+
+    Имена разбираются один раз, отдельный stat на файл не делается
+    (тип записи scandir отдаёт сам). Результат кэшируется, пока не
+    изменилось время изменения папки - любое создание, удаление или
+    переименование файла его меняет. Служебные имена с точкой и
+    подпапки не попадают в список.
+
+    За папками под watch (ProjectWatcher) следит система событий ФС:
+    их список обновляется через update без перечитывания. Проверка
+    времени изменения остаётся и для них - события приходят с задержкой,
+    а то и теряются, поэтому писатели после изменений папки всё равно
+    вызывают invalidate.
+    """
+
+    _cache = {}
+    _watched = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def scan(folder):
+        """Файлы папки в естественном порядке (список словарей make_entry)"""
+        key = os.path.abspath(folder)
+        with FolderIndex._lock:
+            cached = FolderIndex._cache.get(key)
+
+        mtime_ns = os.stat(key).st_mtime_ns
+        if cached and cached[0] == mtime_ns and cached[1] - mtime_ns / 1e9 > _RACY_SECONDS:
+            return list(cached[2])
+
+        scanned_at = time.time()
+        entries = []
+        with os.scandir(key) as items:
+            for item in items:
+                if item.name.startswith('.'):
+                    continue
+                if item.is_file():
+                    entries.append(make_entry(folder, item.name))
+        entries.sort(key=lambda entry: entry['sort_key'])
+
+        with FolderIndex._lock:
+            FolderIndex._cache[key] = (mtime_ns, scanned_at, tuple(entries))
+        return entries
+
+    @staticmethod
+    def files(folder, kind=None):
+        """Файлы папки, при kind - только этого класса"""
+        entries = FolderIndex.scan(folder)
+        if kind is None:
+            return entries
+        return [entry for entry in entries if entry['kind'] == kind]
+
+    @staticmethod
+    def numbered(folder, kind=None):
+        """{номер: файл} для файлов с числом в начале имени (первый по порядку)"""
+        result = {}
+        for entry in FolderIndex.files(folder, kind):
+            if entry['number'] is not None:
+                result.setdefault(entry['number'], entry)
+        return result
+
+    @staticmethod
+    def invalidate(folder=None):
+        """Сбросить кэш папки (или всех папок)"""
+        with FolderIndex._lock:
+            if folder is None:
+                FolderIndex._cache.clear()
+            else:
+                FolderIndex._cache.pop(os.path.abspath(folder), None)
+
+    @staticmethod
+    def watch(folder):
+        """
+        Список папки поддерживается событиями ФС (перечитывается один раз).
+        Вызовы считаются: папку держат, пока каждый watch не закрыт unwatch
+        (старое и новое слежение за одним проектом пересекаются).
+        """
+        key = os.path.abspath(folder)
+        FolderIndex.invalidate(key)
+        FolderIndex.scan(key)
+        with FolderIndex._lock:
+            FolderIndex._watched[key] = FolderIndex._watched.get(key, 0) + 1
+
+    @staticmethod
+    def unwatch(folder):
+        key = os.path.abspath(folder)
+        with FolderIndex._lock:
+            count = FolderIndex._watched.get(key, 0) - 1
+            if count > 0:
+                FolderIndex._watched[key] = count
+                return
+            FolderIndex._watched.pop(key, None)
+            FolderIndex._cache.pop(key, None)
+
+    @staticmethod
+    def update(folder, added=(), removed=()):
+        """
+        Добавить и убрать имена в кэше папки без её перечитывания.
+        Время изменения берётся до применения событий: изменение, которое
+        случится позже, либо придёт своим событием, либо сдвинет время.
+        """
+        key = os.path.abspath(folder)
+        try:
+            mtime_ns = os.stat(key).st_mtime_ns
+        except OSError:
+            FolderIndex.invalidate(key)
+            return
+        scanned_at = time.time()
+
+        with FolderIndex._lock:
+            cached = FolderIndex._cache.get(key)
+            if cached is None:
+                return
+            gone = set(removed) | set(added)
+            entries = [entry for entry in cached[2] if entry['name'] not in gone]
+            entries += [make_entry(folder, name) for name in added if not name.startswith('.')]
+            entries.sort(key=lambda entry: entry['sort_key'])
+            FolderIndex._cache[key] = (mtime_ns, scanned_at, tuple(entries))
@@ -0,0 +1,686 @@
+# utils/media_info.py
+"""Быстрое чтение сведений о медиафайлах по заголовкам"""
+
+import os
+import json
+import struct
+import atexit
+import tempfile
+import threading
+from core.config import Config
+
+# Битрейты MPEG аудио (кбит/с) по (версия MPEG-1?, слой) и индексу
+_MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+_MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],   # MPEG-1
+    2: [22050, 24000, 16000],   # MPEG-2
+    0: [11025, 12000, 8000],    # MPEG-2.5
+}
+
+# Кодеки по fourcc из stsd
+_MP4_CODECS = {
+    'avc1': 'h264', 'avc3': 'h264',
+    'hvc1': 'hevc', 'hev1': 'hevc',
+    'av01': 'av1', 'vp09': 'vp9', 'mp4v': 'mpeg4',
+    'mp4a': 'aac', '.mp3': 'mp3', 'Opus': 'opus', 'ac-3': 'ac3',
+}
+
+_MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+# Профили H.264 (profile_idc из SPS) -> имена профилей x264
+_H264_PROFILES = {66: 'baseline', 77: 'main', 100: 'high', 110: 'high10',
+                  122: 'high422', 244: 'high444'}
+
+# Те же профили в выводе ffprobe
+_FFPROBE_PROFILES = {
+    'constrained baseline': 'baseline', 'baseline': 'baseline', 'main': 'main',
+    'high': 'high', 'high 10': 'high10', 'high 4:2:2': 'high422',
+    'high 4:4:4 predictive': 'high444',
+}
+
+# В SPS этих профилей есть поля формата цветности и битности
+_H264_HIGH_PROFILE_IDS = {100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135}
+
+_HEADER_READ = 64 * 1024
+_MAX_MOOV_SIZE = 64 * 1024 * 1024
+
+
+def _empty_info():
+    return {
+        'duration': None,
+        'has_video': False,
+        'has_audio': False,
+        'width': None,
+        'height': None,
+        'fps': None,
+        'video_codec': None,
+        'video_profile': None,    # H.264: профиль x264, уровень (idc), число
+        'video_level': None,      # опорных кадров и наличие B-кадров - чтобы
+        'video_refs': None,       # перекодированные куски склеивались с
+        'video_bframes': None,    # копируемыми без смены параметров потока
+        'audio_codec': None,
+        'sample_rate': None,
+        'channels': None,
+    }
+
+
+_EMPTY_KEYS = _empty_info().keys()
+
+
+class MediaInfo:
+    """
+    Длительность, fps, разрешение и кодеки без декодирования файла.
+
+    MP3 - по заголовкам кадров (Xing/Info/VBRI или CBR), MP4/MOV - по
+    атомам moov, WAV - по заголовку RIFF; остальное через ffprobe.
+    Результаты хранятся в постоянном кэше по (путь, размер, mtime).
+    """
+
+    _cache = None
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def get(path):
+        """Сведения о файле (dict) или None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        cache = MediaInfo._get_cache()
+        info = cache.lookup(path, stat)
+        # Записи старых версий без новых полей перечитываются
+        if info is not None and info.keys() >= _EMPTY_KEYS:
+            return info
+
+        info = MediaInfo.parse(path, stat.st_size)
+        if info is None:
+            info = MediaInfo._probe_ffprobe(path)
+
+        if info is not None:
+            cache.store(path, stat, info)
+        return info
+
+    @staticmethod
+    def duration(path):
+        """Длительность в секундах или None"""
+        info = MediaInfo.get(path)
+        return info['duration'] if info else None
+
+    @staticmethod
+    def get_many(paths):
+        """Сведения о нескольких файлах: {path: info}"""
+        result = {path: MediaInfo.get(path) for path in paths}
+        MediaInfo._get_cache().save()
+        return result
+
+    @staticmethod
+    def save():
+        """Записать кэш сведений на диск (если он менялся)"""
+        if MediaInfo._cache is not None:
+            MediaInfo._cache.save()
+
+    @staticmethod
+    def take_new_entries():
+        """
+        Записи, добавленные этим процессом с прошлого вызова. Процессы
+        пула (ProcessPoolExecutor) не выполняют atexit - они отдают
+        записи главному процессу, который их сохраняет.
+        """
+        if MediaInfo._cache is None:
+            return {}
+        return MediaInfo._cache.take_new()
+
+    @staticmethod
+    def add_entries(entries):
+        """Принять записи из процесса пула"""
+        if entries:
+            MediaInfo._get_cache().merge(entries)
+
+    @staticmethod
+    def _get_cache():
+        with MediaInfo._cache_lock:
+            if MediaInfo._cache is None:
+                MediaInfo._cache = MediaInfoCache(Config.MEDIA_INFO_CACHE)
+                atexit.register(MediaInfo._cache.save)
+            return MediaInfo._cache
+
+    @staticmethod
+    def parse(path, size=None):
+        """Разбор заголовков без внешних программ; None если формат не распознан"""
+        ext = os.path.splitext(path)[1].lower()
+        if size is None:
+            size = os.path.getsize(path)
+
+        try:
+            with open(path, 'rb') as f:
+                if ext == '.mp3':
+                    return MediaInfo._parse_mp3(f, size)
+                if ext in ('.mp4', '.m4a', '.mov', '.m4v'):
+                    return MediaInfo._parse_mp4(f, size)
+                if ext == '.wav':
+                    return MediaInfo._parse_wav(f)
+        except (OSError, struct.error, ValueError, IndexError) as e:
+            print(f"[DEBUG] Не удалось разобрать заголовок {path}: {e}")
+        return None
+
+    # --- MP3 ---
+
+    @staticmethod
+    def _mp3_frame(header):
+        """Разобрать 4 байта заголовка кадра: dict или None"""
+        if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+            return None
+
+        version = (header[1] >> 3) & 3
+        layer_bits = (header[1] >> 1) & 3
+        bitrate_index = header[2] >> 4
+        rate_index = (header[2] >> 2) & 3
+        if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+            return None
+
+        mpeg1 = version == 3
+        layer = 4 - layer_bits
+        bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+        padding = (header[2] >> 1) & 1
+        mono = (header[3] >> 6) == 3
+
+        if layer == 1:
+            samples = 384
+            length = (12 * bitrate // sample_rate + padding) * 4
+        elif layer == 2 or mpeg1:
+            samples = 1152
+            length = 144 * bitrate // sample_rate + padding
+        else:
+            samples = 576
+            length = 72 * bitrate // sample_rate + padding
+
+        return {
+            'mpeg1': mpeg1,
+            'layer': layer,
+            'bitrate': bitrate,
+            'sample_rate': sample_rate,
+            'samples': samples,
+            'length': length,
+            'mono': mono,
+        }
+
+    @staticmethod
+    def _parse_mp3(f, size):
+        start = 0
+        head = f.read(10)
+
+        # Пропускаем теги ID3v2 (их может быть несколько подряд)
+        while head[:3] == b'ID3' and len(head) == 10:
+            tag_size = ((head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14
+                        | (head[8] & 0x7F) << 7 | (head[9] & 0x7F))
+            start += 10 + tag_size + (10 if head[5] & 0x10 else 0)
+            f.seek(start)
+            head = f.read(10)
+
+        f.seek(start)
+        data = f.read(_HEADER_READ)
+
+        # Первый кадр, за которым сразу идёт ещё один (защита от ложной синхронизации)
+        frame = None
+        offset = 0
+        while offset < len(data) - 4:
+            offset = data.find(b'\xff', offset)
+            if offset < 0 or offset > len(data) - 4:
+                return None
+            frame = MediaInfo._mp3_frame(data[offset:offset + 4])
+            if frame:
+                following = data[offset + frame['length']:offset + frame['length'] + 4]
+                if len(following) < 4 or MediaInfo._mp3_frame(following):
+                    break
+            frame = None
+            offset += 1
+
+        if not frame:
+            return None
+
+        audio_start = start + offset
+        info = _empty_info()
+        info['has_audio'] = True
+        info['audio_codec'] = {1: 'mp1', 2: 'mp2', 3: 'mp3'}[frame['layer']]
+        info['sample_rate'] = frame['sample_rate']
+        info['channels'] = 1 if frame['mono'] else 2
+
+        # Заголовок VBR (Xing/Info) после side info первого кадра
+        if frame['mpeg1']:
+            side_info = 17 if frame['mono'] else 32
+        else:
+            side_info = 9 if frame['mono'] else 17
+        xing = offset + 4 + side_info
+        if data[xing:xing + 4] in (b'Xing', b'Info'):
+            flags = struct.unpack('>I', data[xing + 4:xing + 8])[0]
+            if flags & 1:
+                frames = struct.unpack('>I', data[xing + 8:xing + 12])[0]
+                info['duration'] = frames * frame['samples'] / frame['sample_rate']
+                return info
+
+        # Заголовок VBRI (Fraunhofer) - всегда через 32 байта после заголовка кадра
+        vbri = offset + 4 + 32
+        if data[vbri:vbri + 4] == b'VBRI':
+            frames = struct.unpack('>I', data[vbri + 14:vbri + 18])[0]
+            info['duration'] = frames * frame['samples'] / frame['sample_rate']
+            return info
+
+        # CBR: размер аудиоданных / битрейт (без тега ID3v1 в конце)
+        audio_size = size - audio_start
+        if size >= 128:
+            f.seek(size - 128)
+            if f.read(3) == b'TAG':
+                audio_size -= 128
+        info['duration'] = audio_size * 8 / frame['bitrate']
+        return info
+
+    # --- MP4 / MOV ---
+
+    @staticmethod
+    def _iter_boxes(data, start=0, end=None):
+        """Атомы внутри буфера: (type, payload_start, payload_end)"""
+        end = len(data) if end is None else end
+        pos = start
+        while pos + 8 <= end:
+            box_size, box_type = struct.unpack('>I4s', data[pos:pos + 8])
+            header = 8
+            if box_size == 1:
+                box_size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+                header = 16
+            elif box_size == 0:
+                box_size = end - pos
+            if box_size < header:
+                break
+            yield box_type, pos + header, min(pos + box_size, end)
+            pos += box_size
+
+    @staticmethod
+    def _find_moov(f, size):
+        """Прочитать атом moov, пропуская mdat поиском по файлу"""
+        pos = 0
+        while pos + 8 <= size:
+            f.seek(pos)
+            header = f.read(16)
+            if len(header) < 8:
+                return None
+            box_size, box_type = struct.unpack('>I4s', header[:8])
+            header_size = 8
+            if box_size == 1:
+                box_size = struct.unpack('>Q', header[8:16])[0]
+                header_size = 16
+            elif box_size == 0:
+                box_size = size - pos
+            if box_size < header_size:
+                return None
+
+            if box_type == b'moov':
+                if box_size > _MAX_MOOV_SIZE:
+                    return None
+                f.seek(pos + header_size)
+                return f.read(box_size - header_size)
+            pos += box_size
+        return None
+
+    @staticmethod
+    def _parse_mp4(f, size):
+        moov = MediaInfo._find_moov(f, size)
+        if moov is None:
+            return None
+
+        info = _empty_info()
+        for box_type, start, end in MediaInfo._iter_boxes(moov):
+            if box_type == b'mvhd':
+                timescale, duration = MediaInfo._parse_time_header(moov, start, 12, 20)
+                if timescale:
+                    info['duration'] = duration / timescale
+            elif box_type == b'trak':
+                MediaInfo._parse_track(moov, start, end, info)
+
+        if info['duration'] is None and not (info['has_video'] or info['has_audio']):
+            return None
+        return info
+
+    @staticmethod
+    def _parse_time_header(data, start, v0_offset, v1_offset):
+        """timescale и duration из mvhd/mdhd (версии 0 и 1)"""
+        if data[start] == 1:
+            return struct.unpack('>IQ', data[start + v1_offset:start + v1_offset + 12])
+        return struct.unpack('>II', data[start + v0_offset:start + v0_offset + 8])
+
+    @staticmethod
+    def _parse_track(data, start, end, info):
+        """Разобрать trak: тип дорожки, кодек, размеры, fps"""
+        track = {}
+
+        def walk(box_start, box_end):
+            for box_type, payload, payload_end in MediaInfo._iter_boxes(data, box_start, box_end):
+                if box_type in _MP4_CONTAINERS:
+                    walk(payload, payload_end)
+                elif box_type == b'tkhd':
+                    offset = 88 if data[payload] == 1 else 76
+                    width, height = struct.unpack('>II', data[payload + offset:payload + offset + 8])
+                    track['width'] = width >> 16
+                    track['height'] = height >> 16
+                elif box_type == b'mdhd':
+                    track['timescale'], track['duration'] = MediaInfo._parse_time_header(
+                        data, payload, 12, 20)
+                elif box_type == b'hdlr':
+                    track['handler'] = data[payload + 8:payload + 12]
+                elif box_type == b'stsd':
+                    entry = payload + 8
+                    track['fourcc'] = data[entry + 4:entry + 8].decode('latin-1')
+                    track['entry'] = entry
+                    track['entry_end'] = min(entry + struct.unpack('>I', data[entry:entry + 4])[0],
+                                             payload_end)
+                elif box_type == b'ctts':
+                    # Смещения времени показа есть только при B-кадрах
+                    track['ctts'] = True
+                elif box_type == b'stts':
+                    count = struct.unpack('>I', data[payload + 4:payload + 8])[0]
+                    samples = 0
+                    ticks = 0
+                    for i in range(count):
+                        pos = payload + 8 + i * 8
+                        sample_count, delta = struct.unpack('>II', data[pos:pos + 8])
+                        samples += sample_count
+                        ticks += sample_count * delta
+                    track['samples'] = samples
+                    track['ticks'] = ticks
+
+        walk(start, end)
+
+        handler = track.get('handler')
+        codec = track.get('fourcc')
+        codec = _MP4_CODECS.get(codec, codec)
+
+        if handler == b'vide':
+            info['has_video'] = True
+            info['video_codec'] = codec
+            entry = track.get('entry')
+            if entry is not None:
+                # Размер кадра из VisualSampleEntry точнее tkhd (там бывает масштаб)
+                width, height = struct.unpack('>HH', data[entry + 32:entry + 36])
+                info['width'] = width or track.get('width')
+                info['height'] = height or track.get('height')
+            else:
+                info['width'] = track.get('width')
+                info['height'] = track.get('height')
+            if track.get('ticks') and track.get('timescale'):
+                info['fps'] = round(track['samples'] * track['timescale'] / track['ticks'], 3)
+            if codec == 'h264' and entry is not None:
+                # Дочерние атомы VisualSampleEntry начинаются после 78 байт полей
+                for box_type, payload, payload_end in MediaInfo._iter_boxes(
+                        data, entry + 86, track['entry_end']):
+                    if box_type == b'avcC':
+                        MediaInfo._parse_avcc(data[payload:payload_end], info)
+                info['video_bframes'] = bool(track.get('ctts'))
+        elif handler == b'soun':
+            info['has_audio'] = True
+            info['audio_codec'] = codec
+            entry = track.get('entry')
+            if entry is not None:
+                info['channels'] = struct.unpack('>H', data[entry + 24:entry + 26])[0]
+                info['sample_rate'] = struct.unpack('>I', data[entry + 32:entry + 36])[0] >> 16
+
+        # Если в mvhd длительности нет - берём самую длинную дорожку
+        if track.get('timescale'):
+            track_duration = track['duration'] / track['timescale']
+            if info['duration'] is None or track_duration > info['duration']:
+                info['duration'] = track_duration
+
+    @staticmethod
+    def _parse_avcc(avcc, info):
+        """Профиль, уровень и число опорных кадров из первого SPS в avcC"""
+        if len(avcc) < 8 or not avcc[5] & 0x1f:
+            return
+        sps_size = struct.unpack('>H', avcc[6:8])[0]
+        try:
+            profile_idc, level, refs = MediaInfo._parse_sps(avcc[8:8 + sps_size])
+        except ValueError:
+            # Длительность и размеры верны и без параметров кодека
+            return
+        info['video_profile'] = _H264_PROFILES.get(profile_idc)
+        info['video_level'] = level
+        info['video_refs'] = refs
+
+    @staticmethod
+    def _parse_sps(sps):
+        """
+        Начало SPS H.264 до max_num_ref_frames:
+        (profile_idc, level_idc, число опорных кадров).
+        """
+        # Байты 00 00 03 - защита от ложных стартовых кодов, не данные
+        data = sps.replace(b'\x00\x00\x03', b'\x00\x00')
+        bits = ''.join(f"{byte:08b}" for byte in data)
+        pos = 8  # заголовок NAL
+
+        def read(count):
+            nonlocal pos
+            if pos + count > len(bits):
+                raise ValueError("SPS обрезан")
+            value = int(bits[pos:pos + count], 2) if count else 0
+            pos += count
+            return value
+
+        def ue():
+            zeros = 0
+            while not read(1):
+                zeros += 1
+            return (1 << zeros) - 1 + read(zeros)
+
+        def se():
+            value = ue()
+            return (value + 1) // 2 if value & 1 else -(value // 2)
+
+        profile_idc = read(8)
+        read(8)  # constraint_set флаги
+        level = read(8)
+        ue()     # seq_parameter_set_id
+        if profile_idc in _H264_HIGH_PROFILE_IDS:
+            chroma_format = ue()
+            if chroma_format == 3:
+                read(1)
+            ue()
+            ue()
+            read(1)
+            if read(1):
+                # Матрицы квантования: пропускаем списки
+                for i in range(12 if chroma_format == 3 else 8):
+                    if read(1):
+                        last = following = 8
+                        for _ in range(16 if i < 6 else 64):
+                            if following:
+                                following = (last + se() + 256) % 256
+                            last = following or last
+        ue()  # log2_max_frame_num
+        poc_type = ue()
+        if poc_type == 0:
+            ue()
+        elif poc_type == 1:
+            read(1)
+            se()
+            se()
+            for _ in range(ue()):
+                se()
+        return profile_idc, level, ue()
+
+    # --- WAV ---
+
+    @staticmethod
+    def _parse_wav(f):
+        header = f.read(12)
+        if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            return None
+
+        info = _empty_info()
+        byte_rate = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk)
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                info['channels'] = struct.unpack('<H', fmt[2:4])[0]
+                info['sample_rate'], byte_rate = struct.unpack('<II', fmt[4:12])
+                info['audio_codec'] = 'pcm'
+                info['has_audio'] = True
+                continue
+            if chunk_id == b'data':
+                if not byte_rate:
+                    return None
+                info['duration'] = chunk_size / byte_rate
+                return info
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+    # --- ffprobe ---
+
+    @staticmethod
+    def _probe_ffprobe(path):
+        """Сведения через ffprobe, если заголовки разобрать не удалось"""
+        from .ffmpeg_tools import FFmpeg
+
+        data = FFmpeg.probe(path)
+        if not data:
+            return None
+
+        info = _empty_info()
+        try:
+            info['duration'] = float(data.get('format', {}).get('duration'))
+        except (TypeError, ValueError):
+            pass
+
+        for stream in data.get('streams', []):
+            kind = stream.get('codec_type')
+            if kind == 'video' and not info['has_video']:
+                info['has_video'] = True
+                info['video_codec'] = stream.get('codec_name')
+                info['width'] = stream.get('width')
+                info['height'] = stream.get('height')
+                rate = stream.get('avg_frame_rate') or stream.get('r_frame_rate') or ''
+                num, _, den = rate.partition('/')
+                try:
+                    info['fps'] = round(float(num) / float(den or 1), 3)
+                except (ValueError, ZeroDivisionError):
+                    pass
+                if info['video_codec'] == 'h264':
+                    info['video_profile'] = _FFPROBE_PROFILES.get(
+                        str(stream.get('profile', '')).lower())
+                    info['video_level'] = stream.get('level')
+                    info['video_refs'] = stream.get('refs')
+                    info['video_bframes'] = bool(stream.get('has_b_frames'))
+            elif kind == 'audio' and not info['has_audio']:
+                info['has_audio'] = True
+                info['audio_codec'] = stream.get('codec_name')
+                info['channels'] = stream.get('channels')
+                try:
+                    info['sample_rate'] = int(stream.get('sample_rate'))
+                except (TypeError, ValueError):
+                    pass
+
+        return info
+
+
+class MediaInfoCache:
+    """Постоянный кэш сведений о файлах (JSON, ключ - путь + размер + mtime)"""
+
+    def __init__(self, path, max_entries=None):
+        self.path = path
+        self.max_entries = max_entries or Config.MEDIA_INFO_CACHE_MAX_ENTRIES
+        self.entries = {}
+        self.new_keys = set()
+        self.dirty = False
+        self._lock = threading.Lock()
+        self.entries = self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def lookup(self, path, stat):
+        """Сведения, если файл не менялся с момента записи"""
+        with self._lock:
+            entry = self.entries.get(os.path.abspath(path))
+        if (entry and entry.get('size') == stat.st_size
+                and entry.get('mtime_ns') == stat.st_mtime_ns):
+            return entry['info']
+        return None
+
+    def store(self, path, stat, info):
+        with self._lock:
+            key = os.path.abspath(path)
+            self.entries.pop(key, None)
+            self.entries[key] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'info': info
+            }
+            self.new_keys.add(key)
+            self._trim()
+            self.dirty = True
+
+    def _trim(self):
+        # Самые старые записи вытесняются первыми
+        while len(self.entries) > self.max_entries:
+            self.new_keys.discard(next(iter(self.entries)))
+            self.entries.pop(next(iter(self.entries)))
+
+    def take_new(self):
+        """Записи, добавленные с прошлого вызова: {путь: запись}"""
+        with self._lock:
+            new = {key: self.entries[key] for key in self.new_keys if key in self.entries}
+            self.new_keys.clear()
+            return new
+
+    def merge(self, entries):
+        """Добавить записи (из другого процесса) как самые новые"""
+        with self._lock:
+            for key, entry in entries.items():
+                self.entries.pop(key, None)
+                self.entries[key] = entry
+            self._trim()
+            self.dirty = True
+
+    def save(self):
+        """
+        Записать кэш на диск (атомарно). Записи, которые за это время
+        сохранил другой процесс, не теряются - они остаются более старыми.
+        """
+        with self._lock:
+            if not self.dirty:
+                return
+            entries = {key: entry for key, entry in self._read().items()
+                       if key not in self.entries}
+            entries.update(self.entries)
+            self.entries = entries
+            self._trim()
+
+            folder = os.path.dirname(os.path.abspath(self.path))
+            temp_path = None
+            try:
+                fd, temp_path = tempfile.mkstemp(
+                    dir=folder, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self.entries, f, ensure_ascii=False)
+                os.replace(temp_path, self.path)
+                self.dirty = False
+            except OSError as e:
+                print(f"[ERROR] Не удалось сохранить кэш сведений о файлах: {e}")
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
@@ -0,0 +1,823 @@
+# utils/montage_engine.py
+"""Монтаж через ffmpeg без перекодирования совместимых клипов"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from core.config import Config
+from .ffmpeg_tools import FFmpeg
+from .media_info import MediaInfo
+
+# Стандартные дробные частоты кадров (ffmpeg ждёт их точной дробью)
+_NTSC_RATES = {23.976: "24000/1001", 29.97: "30000/1001", 59.94: "60000/1001"}
+
+
+# Профили H.264, в которых x264 кодирует yuv420p (в них перекодируются клипы и переходы)
+_X264_PROFILES = ('baseline', 'main', 'high')
+
+
+# Переходы панели монтажа -> фильтр xfade (панель склейки передаёт имена xfade напрямую)
+MONTAGE_TRANSITIONS = {
+    "crossfade": "fade",
+    "fade": "fadeblack",
+    "slide_left": "slideleft",
+    "slide_right": "slideright",
+    "slide_up": "slideup",
+    "slide_down": "slidedown",
+    "wipe": "wipeleft",
+    "dissolve": "dissolve",
+}
+
+
+def fps_expr(fps):
+    """Частота кадров в виде, понятном ffmpeg"""
+    for value, expr in _NTSC_RATES.items():
+        if abs(fps - value) < 0.01:
+            return expr
+    return f"{fps:g}"
+
+
+def write_concat_list(files, list_path):
+    """Список файлов для concat demuxer (кавычки в путях экранируются)"""
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in files:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+
+class MontageManifest:
+    """
+    Сегменты монтажа, сохраняемые между запусками.
+
+    В папке кэша (Config.MONTAGE_CACHE_FOLDER) у каждого итогового файла
+    своя папка с готовыми сегментами и manifest.json: хэши содержимого
+    входных клипов (пересчитываются, только если сменились размер или
+    время изменения) и их ключевые кадры. Имя сегмента - хэш всех данных,
+    из которых он получен, так что после замены одного клипа повторный
+    монтаж берёт остальные сегменты как есть. Папки давних монтажей
+    удаляются сверх MONTAGE_CACHE_MAX_SIZE_MB (trim).
+    """
+
+    FILENAME = "manifest.json"
+    VERSION = 1
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.files = {}
+        self.keyframe_cache = {}
+        self.used = {self.FILENAME}
+        self.current = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def folder_for(output_file):
+        """Папка сегментов для итогового файла в кэше монтажа"""
+        path = os.path.abspath(output_file)
+        name = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(Config.MONTAGE_CACHE_FOLDER, name)
+
+    @staticmethod
+    def key(*parts):
+        """Ключ сегмента по его входным данным"""
+        text = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()[:20]
+
+    def _load(self):
+        path = os.path.join(self.folder, self.FILENAME)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != self.VERSION:
+            return
+        self.files = data.get('files', {})
+        self.keyframe_cache = data.get('keyframes', {})
+
+    def content_id(self, path):
+        """Хэш содержимого файла (из манифеста, если файл не менялся)"""
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        entry = self.files.get(key)
+        if (not entry or entry.get('size') != stat.st_size
+                or entry.get('mtime_ns') != stat.st_mtime_ns):
+            digest = hashlib.sha1()
+            with open(key, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                     'sha1': digest.hexdigest()}
+            self.files[key] = entry
+        self.current[key] = entry
+        return entry['sha1']
+
+    def segment(self, kind, parts, ext):
+        """Путь сегмента и признак того, что он уже готов: (path, ready)"""
+        name = f"{kind}_{self.key(kind, *parts)}{ext}"
+        with self._lock:
+            self.used.add(name)
+        path = os.path.join(self.folder, name)
+        return path, os.path.exists(path)
+
+    def keyframes(self, source):
+        with self._lock:
+            return self.keyframe_cache.get(source)
+
+    def store_keyframes(self, source, frames):
+        with self._lock:
+            self.keyframe_cache[source] = frames
+
+    def prune(self, sources):
+        """Удалить сегменты и записи, не нужные последнему монтажу"""
+        for name in os.listdir(self.folder):
+            if name not in self.used:
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+        self.files = dict(self.current)
+        self.keyframe_cache = {source: frames for source, frames in self.keyframe_cache.items()
+                               if source in sources}
+
+    def save(self, output_file=None):
+        """Записать манифест (атомарно); время записи - последнее использование"""
+        path = os.path.join(self.folder, self.FILENAME)
+        temp_path = path + ".tmp"
+        data = {'version': self.VERSION, 'output': output_file,
+                'files': self.files, 'keyframes': self.keyframe_cache}
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"[ERROR] Не удалось сохранить манифест монтажа: {e}")
+
+    @staticmethod
+    def trim(current=None, max_size_mb=None):
+        """
+        Удалить папки давних монтажей, пока кэш больше max_size_mb
+        (по умолчанию MONTAGE_CACHE_MAX_SIZE_MB). Давность - время записи
+        manifest.json; папка current удаляется последней - только если
+        одна не помещается в предел. Возвращает число удалённых папок.
+        """
+        root = Config.MONTAGE_CACHE_FOLDER
+        if max_size_mb is None:
+            max_size_mb = Config.MONTAGE_CACHE_MAX_SIZE_MB
+        if not os.path.isdir(root):
+            return 0
+
+        folders = []
+        total = 0
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                size = 0
+                used = 0
+                with os.scandir(entry.path) as files:
+                    for item in files:
+                        if not item.is_file(follow_symlinks=False):
+                            continue
+                        stat = item.stat(follow_symlinks=False)
+                        size += stat.st_size
+                        if item.name == MontageManifest.FILENAME:
+                            used = stat.st_mtime
+                folders.append((entry.path == current, used, size, entry.path))
+                total += size
+
+        removed = 0
+        limit = max_size_mb * 1024 * 1024
+        for is_current, used, size, path in sorted(folders):
+            if total <= limit:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+class MontageEngine:
+    """
+    Склейка клипов ffmpeg concat demuxer'ом с копированием потоков.
+
+    Форматы клипов сверяются (кодек, разрешение, fps, звук); к общему
+    формату перекодируются только отличающиеся клипы, память не зависит
+    от их числа. При incremental готовые сегменты сохраняются между
+    запусками (MontageManifest), и повторный монтаж перекодирует только
+    изменившиеся клипы и соседние с ними переходы.
+    """
+
+    def __init__(self, output_file, on_progress=None, should_stop=None, incremental=None):
+        self.output_file = output_file
+        self.on_progress = on_progress
+        self.should_stop = should_stop
+        self.incremental = Config.MONTAGE_INCREMENTAL if incremental is None else incremental
+        self.work_dir = None
+        self.manifest = None
+        self.sources = []
+
+    def is_stopped(self):
+        return bool(self.should_stop and self.should_stop())
+
+    def report(self, text, done=None, total=None):
+        """Сообщить этап работы: on_progress(text, done, total)"""
+        print(f"[DEBUG] {text}")
+        if self.on_progress:
+            self.on_progress(text, done, total)
+
+    def run(self, video_files, transition=None, duration=0.5):
+        """
+        Смонтировать клипы по порядку: (success, message).
+        transition - имя перехода xfade (None - склейка встык).
+        """
+        if not FFmpeg.available():
+            return False, "ffmpeg не найден"
+        if not video_files:
+            return False, "Нет видео файлов"
+
+        output_folder = os.path.dirname(os.path.abspath(self.output_file))
+        os.makedirs(output_folder, exist_ok=True)
+        self.work_dir = tempfile.mkdtemp(prefix=".montage_", dir=output_folder)
+
+        try:
+            infos = self.probe(video_files)
+            if infos is None:
+                return False, "Не удалось прочитать сведения о клипах"
+
+            result = self.render(video_files, infos, transition, duration)
+
+            if self.manifest:
+                if result[0]:
+                    self.manifest.prune(set(self.sources))
+                self.manifest.save(os.path.abspath(self.output_file))
+                removed = MontageManifest.trim(self.manifest.folder)
+                if removed:
+                    print(f"[DEBUG] Кэш монтажа: удалено папок сегментов {removed}")
+            return result
+        finally:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.work_dir = None
+            self.manifest = None
+
+    def render(self, video_files, infos, transition, duration):
+        """Выбрать способ монтажа и выполнить его"""
+        target, outliers = self.plan_format(infos)
+
+        if transition and len(video_files) > 1:
+            # Длинный список - по сегментам, короткий - одним графом
+            if len(video_files) >= Config.MONTAGE_SEGMENT_MIN_CLIPS:
+                result = self.render_segmented(video_files, infos, target, outliers,
+                                               transition, duration)
+                if result is not None:
+                    return result
+            return self.render_xfade(video_files, infos, target, transition, duration,
+                                     self.output_file)
+
+        print(f"[DEBUG] Формат монтажа: {target}, перекодировать: {len(outliers)}/{len(video_files)}")
+
+        files = self.normalize(video_files, infos, target, outliers)
+        if files is None:
+            return False, "Остановлено" if self.is_stopped() else "Не удалось привести клипы к общему формату"
+
+        return self.concat_copy(files, self.output_file)
+
+    def probe(self, video_files):
+        """Сведения о всех клипах (None если хоть один не читается)"""
+        infos = MediaInfo.get_many(video_files)
+        for path in video_files:
+            info = infos.get(path)
+            if not info or not info['has_video'] or not info['duration']:
+                print(f"[ERROR] Не удалось прочитать видео: {path}")
+                return None
+        return [infos[path] for path in video_files]
+
+    @staticmethod
+    def clip_format(info, with_audio):
+        """Параметры, которые должны совпадать для склейки без перекодирования"""
+        # Клипы разных профилей H.264 при копировании дали бы поток со
+        # сменой набора средств кодирования посередине
+        video = (info['video_codec'], info['video_profile'], info['width'], info['height'],
+                 round(info['fps'] or 0, 2))
+        if not with_audio:
+            return video
+        if not info['has_audio']:
+            return video + (None, None, None)
+        return video + (info['audio_codec'], info['sample_rate'], info['channels'])
+
+    @staticmethod
+    def plan_format(infos):
+        """
+        Общий формат и номера клипов, которые надо перекодировать.
+        За основу берётся самый частый формат; если его видеокодек не h264
+        или профиль не кодируется x264 в yuv420p, общим становится h264
+        High с тем же разрешением (перекодируются все).
+
+        Уровень, число опорных кадров и B-кадры берутся у копируемых клипов:
+        перекодированные куски (приведённые клипы, переходы) склеиваются с
+        ними копированием и не должны требовать от декодера больше, чем
+        объявлено в начале потока.
+        """
+        with_audio = any(info['has_audio'] for info in infos)
+        formats = [MontageEngine.clip_format(info, with_audio) for info in infos]
+        reference = Counter(formats).most_common(1)[0][0]
+
+        profile = reference[1]
+        if reference[0] != 'h264' or profile not in _X264_PROFILES:
+            profile = 'high'
+
+        target = {
+            'video_codec': 'h264',
+            'video_profile': profile,
+            'width': reference[2],
+            'height': reference[3],
+            'fps': reference[4] or 25,
+            'has_audio': with_audio,
+            'audio_codec': 'aac',
+            'sample_rate': 48000,
+            'channels': 2,
+        }
+        if with_audio and reference[5] == 'aac':
+            target['sample_rate'] = reference[6]
+            target['channels'] = reference[7]
+
+        target_format = MontageEngine.clip_format(target, with_audio)
+        outliers = [i for i, fmt in enumerate(formats) if fmt != target_format]
+
+        copied = [info for fmt, info in zip(formats, infos) if fmt == target_format]
+        levels = [info['video_level'] for info in copied if info['video_level']]
+        refs = [info['video_refs'] for info in copied if info['video_refs']]
+        bframes = [info['video_bframes'] for info in copied if info['video_bframes'] is not None]
+        target['video_level'] = max(levels) if levels else None
+        target['video_refs'] = max(refs) if refs else None
+        target['video_bframes'] = any(bframes) if bframes else None
+        return target, outliers
+
+    def source(self, index):
+        """Хэш содержимого клипа index (None без манифеста)"""
+        return self.sources[index] if self.manifest else None
+
+    def cached(self, kind, index, parts, ext):
+        """
+        Путь сегмента: (path, ready). С манифестом имя зависит от входных
+        данных сегмента и ready=True, если он уже готов с прошлого монтажа;
+        без манифеста - временный файл в рабочей папке.
+        """
+        if self.manifest is None:
+            return os.path.join(self.work_dir, f"{kind}_{index:05d}{ext}"), False
+        return self.manifest.segment(kind, parts, ext)
+
+    def normalize(self, video_files, infos, target, outliers):
+        """Перекодировать отличающиеся клипы параллельно; список файлов для склейки"""
+        files = list(video_files)
+        if not outliers:
+            return files
+
+        from .batch_processor import BatchVideoProcessor
+        workers, threads = BatchVideoProcessor.plan_workers(len(outliers))
+        done = 0
+
+        def convert(index):
+            if self.is_stopped():
+                return index, None
+            parts = [self.source(index), target, Config.MONTAGE_PRESET, Config.MONTAGE_CRF]
+            output, ready = self.cached('norm', index, parts, '.mp4')
+            if not ready and not self.encode_clip(video_files[index], infos[index], target,
+                                                  output, threads):
+                return index, None
+            if self.manifest:
+                # Дальше клип узнаётся по ключу перекодированной копии
+                self.sources[index] = MontageManifest.key('norm', *parts)
+            return index, output
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for index, output in executor.map(convert, outliers):
+                if output is None:
+                    return None
+                files[index] = output
+                done += 1
+                self.report(f"⚙ Приведение клипов к общему формату {done}/{len(outliers)}",
+                            done, len(outliers))
+
+        return files
+
+    @staticmethod
+    def scale_filter(target):
+        """Вписать кадр в целевое разрешение с полями и выровнять fps"""
+        width, height = target['width'], target['height']
+        return (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,"
+                f"fps={fps_expr(target['fps'])},format=yuv420p")
+
+    @staticmethod
+    def encode_args(target, threads=None):
+        """Параметры кодирования в общий формат"""
+        args = ['-c:v', 'libx264', '-preset', Config.MONTAGE_PRESET,
+                '-crf', str(Config.MONTAGE_CRF), '-pix_fmt', 'yuv420p']
+        # Параметры потока копируемых клипов (см. plan_format)
+        if target.get('video_profile'):
+            args += ['-profile:v', target['video_profile']]
+        if target.get('video_level'):
+            args += ['-level:v', f"{target['video_level'] / 10:g}"]
+        if target.get('video_refs'):
+            args += ['-refs', str(target['video_refs'])]
+        if target.get('video_bframes') is False:
+            args += ['-bf', '0']
+        if threads:
+            args += ['-threads', str(threads)]
+        if target['has_audio']:
+            args += ['-c:a', 'aac', '-b:a', Config.FFMPEG_AUDIO_BITRATE,
+                     '-ar', str(target['sample_rate']), '-ac', str(target['channels'])]
+        return args
+
+    @staticmethod
+    def encode_clip(path, info, target, output, threads=None):
+        """Перекодировать один клип в общий формат"""
+        args = ['-i', path]
+        audio_map = '0:a:0'
+        if target['has_audio'] and not info['has_audio']:
+            # Клипу без звука добавляем тишину, иначе дорожки разъедутся
+            layout = 'mono' if target['channels'] == 1 else 'stereo'
+            args += ['-f', 'lavfi', '-i',
+                     f"anullsrc=r={target['sample_rate']}:cl={layout}"]
+            audio_map = '1:a:0'
+
+        args += ['-map', '0:v:0']
+        if target['has_audio']:
+            args += ['-map', audio_map]
+        args += ['-vf', MontageEngine.scale_filter(target)]
+        args += MontageEngine.encode_args(target, threads)
+        root, ext = os.path.splitext(output)
+        temp_file = f"{root}.part{ext}"
+        args += ['-t', f"{info['duration']:.3f}", temp_file]
+
+        success, log = FFmpeg.run(args)
+        if not success:
+            print(f"[ERROR] Не удалось перекодировать {path}: {log}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False
+        os.replace(temp_file, output)
+        return True
+
+    def concat_copy(self, files, output_file):
+        """Склеить файлы одного формата без перекодирования"""
+        list_file = os.path.join(self.work_dir, "concat_list.txt")
+        write_concat_list(files, list_file)
+
+        root, ext = os.path.splitext(output_file)
+        temp_file = f"{root}.part{ext or '.mp4'}"
+
+        self.report(f"⚙ Склейка {len(files)} клипов")
+        success, log = FFmpeg.run([
+            '-f', 'concat', '-safe', '0',
+            '-i', list_file,
+            '-c', 'copy',
+            '-movflags', '+faststart',
+            temp_file
+        ])
+
+        if not success:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False, log
+
+        os.replace(temp_file, output_file)
+        return True, f"Видео смонтировано: {output_file}"
+
+    @staticmethod
+    def clamp_transition(durations, duration):
+        """Переход не длиннее половины самого короткого клипа"""
+        return max(0.0, min(duration, min(durations) / 2))
+
+    @staticmethod
+    def build_xfade_graph(infos, target, transition, duration, video=True, audio=True,
+                          clamp=True):
+        """
+        Граф фильтров: цепочки xfade/acrossfade по всем входам.
+
+        Каждый вход приводится к общему формату и точной длительности
+        (звук дополняется тишиной, у клипа без звука - anullsrc), переход
+        i начинается за duration до конца уже склеенной части.
+        video/audio - какие цепочки строить.
+        Возвращает (граф, метка видео, метка звука, итоговая длительность);
+        метки непостроенных цепочек - None.
+        """
+        durations = [info['duration'] for info in infos]
+        if clamp:
+            duration = MontageEngine.clamp_transition(durations, duration)
+        audio = audio and target['has_audio']
+        layout = 'mono' if target['channels'] == 1 else 'stereo'
+        sample_rate = target['sample_rate']
+
+        parts = []
+        for i, (info, length) in enumerate(zip(infos, durations)):
+            if video:
+                parts.append(f"[{i}:v]{MontageEngine.scale_filter(target)},"
+                             f"tpad=stop_mode=clone:stop=-1,trim=duration={length:.3f},"
+                             f"setpts=PTS-STARTPTS,fps={fps_expr(target['fps'])},settb=AVTB[v{i}]")
+            if not audio:
+                continue
+            if info['has_audio']:
+                parts.append(f"[{i}:a]aformat=sample_rates={sample_rate}:channel_layouts={layout},"
+                             f"apad,atrim=duration={length:.3f},asetpts=PTS-STARTPTS[a{i}]")
+            else:
+                parts.append(f"anullsrc=r={sample_rate}:cl={layout},"
+                             f"atrim=duration={length:.3f}[a{i}]")
+
+        video_label, audio_label = "v0", "a0"
+        total = durations[0]
+        for i in range(1, len(infos)):
+            offset = total - duration
+            if video:
+                parts.append(f"[{video_label}][v{i}]xfade=transition={transition}:"
+                             f"duration={duration:.3f}:offset={offset:.3f}[vx{i}]")
+                video_label = f"vx{i}"
+            if audio:
+                parts.append(f"[{audio_label}][a{i}]acrossfade=d={duration:.3f}[ax{i}]")
+                audio_label = f"ax{i}"
+            total += durations[i] - duration
+
+        graph = ";\n".join(parts)
+        return (graph, video_label if video else None, audio_label if audio else None, total)
+
+    def run_graph(self, inputs, graph, video_label, audio_label, output_args, output_file):
+        """
+        Выполнить граф фильтров; inputs - списки аргументов каждого входа
+        (например ['-ss', '2.0', '-i', path]). Пишет во временный файл.
+        """
+        # Граф на сотни входов не влезает в командную строку - пишем в файл
+        graph_file = tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', suffix='.txt', dir=self.work_dir, delete=False)
+        with graph_file:
+            graph_file.write(graph)
+
+        args = []
+        for input_args in inputs:
+            args += input_args
+        args += ['-filter_complex_script', graph_file.name]
+        if video_label:
+            args += ['-map', f"[{video_label}]"]
+        if audio_label:
+            args += ['-map', f"[{audio_label}]"]
+
+        root, ext = os.path.splitext(output_file)
+        temp_file = f"{root}.part{ext}"
+        success, log = FFmpeg.run(args + output_args + [temp_file])
+        os.remove(graph_file.name)
+
+        if not success:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False, log
+
+        os.replace(temp_file, output_file)
+        return True, output_file
+
+    def render_xfade(self, video_files, infos, target, transition, duration, output_file,
+                     threads=None):
+        """Склейка с переходами одним процессом ffmpeg"""
+        graph, video_label, audio_label, total = self.build_xfade_graph(
+            infos, target, transition, duration)
+
+        self.report(f"⚙ Переходы {transition}: {len(video_files)} клипов, {total:.1f} сек")
+        success, log = self.run_graph(
+            [['-i', path] for path in video_files], graph, video_label, audio_label,
+            self.encode_args(target, threads) + ['-movflags', '+faststart'],
+            output_file
+        )
+        if not success:
+            return False, log
+        return True, f"Видео смонтировано: {output_file}"
+
+    # --- Монтаж по сегментам ---
+
+    def plan_segments(self, files, infos, duration):
+        """
+        Точки резки: тело каждого клипа - от первого ключевого кадра после
+        входящего перехода до последнего ключевого кадра перед исходящим.
+        Возвращает [(body_start, body_end)] или None, если у клипа нет
+        подходящих ключевых кадров.
+        """
+        from .batch_processor import BatchVideoProcessor
+
+        def probe_keyframes(index):
+            # Ключевые кадры неизменившегося клипа берутся из манифеста
+            if self.manifest:
+                frames = self.manifest.keyframes(self.source(index))
+                if frames is not None:
+                    return frames
+            frames = FFmpeg.keyframes(files[index])
+            if self.manifest and frames:
+                self.manifest.store_keyframes(self.source(index), frames)
+            return frames
+
+        workers, _ = BatchVideoProcessor.plan_workers(len(files))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            keyframes = list(executor.map(probe_keyframes, range(len(files))))
+
+        last = len(files) - 1
+        cuts = []
+        for i, (info, frames) in enumerate(zip(infos, keyframes)):
+            if not frames:
+                return None
+            length = info['duration']
+            if i == 0:
+                start = 0.0
+            else:
+                start = next((t for t in frames if t >= duration), None)
+            if i == last:
+                end = length
+            else:
+                end = next((t for t in reversed(frames) if t <= length - duration), None)
+            if start is None or end is None or end - start < 0.5:
+                return None
+            cuts.append((start, end))
+        return cuts
+
+    def copy_body(self, path, start, frames, output):
+        """
+        Вырезать тело клипа без перекодирования (MPEG-TS, только видео).
+        Конец задаётся числом кадров: при копировании -t по времени
+        захватывает лишние кадры из-за B-кадров. Рассчитано на закрытые
+        GOP (так кодируют libx264 и moviepy).
+        """
+        root, ext = os.path.splitext(output)
+        temp_file = f"{root}.part{ext}"
+        success, log = FFmpeg.run([
+            '-ss', f"{start:.6f}", '-i', path,
+            '-frames:v', str(frames),
+            '-map', '0:v:0', '-c', 'copy',
+            '-bsf:v', 'h264_mp4toannexb',
+            '-avoid_negative_ts', 'make_zero',
+            '-f', 'mpegts', temp_file
+        ])
+        if not success:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False, log
+        os.replace(temp_file, output)
+        return True, output
+
+    def render_transition(self, left, right, left_cut, right_cut, left_length, target,
+                          transition, duration, frames, output, threads):
+        """
+        Перекодировать только окрестность перехода: хвост левого клипа +
+        начало правого, ровно frames кадров (чтобы не копилось расхождение со звуком).
+        """
+        tail = left_length - left_cut
+        head = right_cut
+        infos = [{'duration': tail, 'has_audio': False},
+                 {'duration': head, 'has_audio': False}]
+        graph, video_label, _, _ = self.build_xfade_graph(
+            infos, target, transition, duration, audio=False, clamp=False)
+        # Последний кадр повторяется, если округление просит на кадр больше
+        graph += f";\n[{video_label}]tpad=stop_mode=clone:stop=-1[vseg]"
+
+        return self.run_graph(
+            [['-ss', f"{left_cut:.6f}", '-i', left], ['-t', f"{head + 0.5:.6f}", '-i', right]],
+            graph, "vseg", None,
+            self.encode_args(dict(target, has_audio=False), threads)
+            + ['-frames:v', str(frames), '-f', 'mpegts'],
+            output
+        )
+
+    def render_audio(self, files, infos, target, transition, duration, output):
+        """Звуковая дорожка целиком (acrossfade дёшев, один процесс)"""
+        graph, _, audio_label, _ = self.build_xfade_graph(
+            infos, target, transition, duration, video=False)
+        args = ['-c:a', 'aac', '-b:a', Config.FFMPEG_AUDIO_BITRATE,
+                '-ar', str(target['sample_rate']), '-ac', str(target['channels'])]
+        return self.run_graph([['-i', path] for path in files], graph, None, audio_label,
+                              args, output)
+
+    def open_manifest(self, video_files):
+        """
+        Манифест готовых сегментов и хэши входных клипов. Нужен только
+        сегментному монтажу: склейка встык и один граф переходов ничего
+        не кэшируют, и хэшировать для них клипы незачем.
+        """
+        folder = MontageManifest.folder_for(self.output_file)
+        os.makedirs(folder, exist_ok=True)
+        self.manifest = MontageManifest(folder)
+        self.report("⚙ Проверка изменений клипов")
+        self.sources = [self.manifest.content_id(path) for path in video_files]
+
+    def render_segmented(self, video_files, infos, target, outliers, transition, duration):
+        """
+        Монтаж длинного списка: тела клипов копируются, перекодируются
+        только участки переходов (параллельно), затем всё склеивается
+        копированием и объединяется с отдельно собранным звуком.
+        None - сегментация невозможна, нужен обычный граф.
+        """
+        if self.incremental:
+            self.open_manifest(video_files)
+
+        files = self.normalize(video_files, infos, target, outliers)
+        if files is None:
+            return False, "Остановлено" if self.is_stopped() else "Не удалось привести клипы к общему формату"
+
+        duration = self.clamp_transition([info['duration'] for info in infos], duration)
+        cuts = self.plan_segments(files, infos, duration)
+        if cuts is None:
+            print("[DEBUG] Нет подходящих ключевых кадров - монтаж одним графом")
+            return None
+
+        from .batch_processor import BatchVideoProcessor
+        count = len(files)
+        fps = target['fps']
+
+        # Сегменты по порядку с числом кадров: границы считаются от общей
+        # шкалы времени, поэтому ошибки округления не накапливаются
+        tasks = []
+        frames_total = 0
+        time_total = 0.0
+        for i in range(count):
+            start, end = cuts[i]
+            frames = int(round((end - start) * fps))
+            tasks.append(('body', i, frames))
+            frames_total += frames
+            time_total += end - start
+            if i < count - 1:
+                time_total += infos[i]['duration'] - end + cuts[i + 1][0] - duration
+                frames = int(round(time_total * fps)) - frames_total
+                tasks.append(('transition', i, frames))
+                frames_total += frames
+        workers, threads = BatchVideoProcessor.plan_workers(count - 1)
+
+        segments = {}
+        encode = [Config.MONTAGE_PRESET, Config.MONTAGE_CRF]
+
+        def render(task):
+            kind, i, frames = task
+            if self.is_stopped():
+                return task, False, "Остановлено", False
+            if kind == 'body':
+                output, ready = self.cached('body', i, [self.source(i), cuts[i][0], frames], '.ts')
+                if not ready:
+                    ok, log = self.copy_body(files[i], cuts[i][0], frames, output)
+            else:
+                # Переход зависит от обоих соседних клипов
+                parts = [self.source(i), self.source(i + 1), cuts[i][1], cuts[i + 1][0],
+                         infos[i]['duration'], transition, duration, frames, target] + encode
+                output, ready = self.cached('trans', i, parts, '.ts')
+                if not ready:
+                    ok, log = self.render_transition(
+                        files[i], files[i + 1], cuts[i][1], cuts[i + 1][0], infos[i]['duration'],
+                        target, transition, duration, frames, output, threads)
+            if ready:
+                ok, log = True, output
+            segments[task] = output
+            return task, ok, log, ready
+
+        audio_file = None
+        if target['has_audio']:
+            parts = [[self.source(i) for i in range(count)],
+                     [info['duration'] for info in infos], transition, duration, target,
+                     Config.FFMPEG_AUDIO_BITRATE]
+            audio_file, ready = self.cached('audio', 0, parts, '.m4a')
+            if not ready:
+                self.report("⚙ Сборка звуковой дорожки")
+                ok, log = self.render_audio(files, infos, target, transition, duration, audio_file)
+                if not ok:
+                    return False, log
+
+        done = 0
+        reused = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for task, ok, log, ready in executor.map(render, tasks):
+                if not ok:
+                    return False, log
+                done += 1
+                reused += ready
+                self.report(f"⚙ Сегменты монтажа {done}/{len(tasks)}", done, len(tasks))
+
+        if self.manifest:
+            print(f"[DEBUG] Готовых сегментов из прошлого монтажа: {reused}/{len(tasks)}")
+
+        list_file = os.path.join(self.work_dir, "segments.txt")
+        write_concat_list([segments[task] for task in tasks], list_file)
+
+        args = ['-f', 'concat', '-safe', '0', '-i', list_file]
+        if audio_file:
+            args += ['-i', audio_file, '-map', '0:v:0', '-map', '1:a:0']
+        root, ext = os.path.splitext(self.output_file)
+        temp_file = f"{root}.part{ext or '.mp4'}"
+        args += ['-c', 'copy', '-movflags', '+faststart', temp_file]
+
+        self.report(f"⚙ Склейка {len(tasks)} сегментов")
+        success, log = FFmpeg.run(args)
+        if not success:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False, log
+
+        os.replace(temp_file, self.output_file)
+        return True, f"Видео смонтировано: {self.output_file}"
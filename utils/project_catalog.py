@@ -0,0 +1,163 @@
+# utils/project_catalog.py
+"""Каталог проектов в SQLite: список и состояние без обхода папок"""
+
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from core.config import Config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    base TEXT NOT NULL,
+    name TEXT NOT NULL,
+    created REAL NOT NULL,
+    lines INTEGER,
+    audio INTEGER,
+    video INTEGER,
+    images INTEGER,
+    rendered INTEGER,
+    pairs INTEGER,
+    missing INTEGER,
+    last_run REAL,
+    updated REAL,
+    PRIMARY KEY (base, name)
+);
+CREATE TABLE IF NOT EXISTS assets (
+    base TEXT NOT NULL,
+    project TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    number INTEGER,
+    kind TEXT,
+    PRIMARY KEY (base, project, folder, name)
+);
+CREATE INDEX IF NOT EXISTS projects_created ON projects (base, created DESC);
+"""
+
+# Поля состояния проекта (см. project_summary)
+STATUS_FIELDS = ('lines', 'audio', 'video', 'images', 'rendered', 'pairs', 'missing')
+
+
+class ProjectCatalog:
+    """
+    Проекты папки и их файлы во встроенной базе SQLite.
+
+    База лежит локально (SQLite на сетевых дисках ненадёжна), проекты
+    ключуются папкой проектов и именем. Список обновляется
+    инкрементально: одно чтение папки проектов, stat только для новых
+    проектов, исчезнувшие удаляются. Состояние (строки, аудио, видео,
+    готовые ролики, время последнего запуска) пишут панели, когда узнают
+    его - при открытии проекта, по событиям слежения и после озвучивания.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, path=None):
+        self.path = path or Config.PROJECT_CATALOG
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    @classmethod
+    def get_default(cls):
+        """Общий каталог приложения"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @contextmanager
+    def _connect(self):
+        """Соединение на один вызов (каталог трогают и поток Tk, и фоновые задачи)"""
+        db = sqlite3.connect(self.path, timeout=10)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def sync(self, base_folder):
+        """Сверить каталог с папкой проектов (без stat известных проектов)"""
+        base = os.path.abspath(base_folder)
+        names = set()
+        created = {}
+        with os.scandir(base) as items:
+            for item in items:
+                if not item.name.startswith('.') and item.is_dir():
+                    names.add(item.name)
+
+        with self._connect() as db:
+            known = {row['name'] for row in
+                     db.execute("SELECT name FROM projects WHERE base = ?", (base,))}
+            for name in names - known:
+                try:
+                    created[name] = os.path.getctime(os.path.join(base, name))
+                except OSError:
+                    continue
+            db.executemany(
+                "INSERT OR IGNORE INTO projects (base, name, created) VALUES (?, ?, ?)",
+                [(base, name, value) for name, value in created.items()])
+
+            gone = [(base, name) for name in known - names]
+            db.executemany("DELETE FROM projects WHERE base = ? AND name = ?", gone)
+            db.executemany("DELETE FROM assets WHERE base = ? AND project = ?", gone)
+
+        if created or gone:
+            print(f"[DEBUG] Каталог проектов: +{len(created)} -{len(gone)}")
+
+    def projects(self, base_folder):
+        """Проекты папки, новые первыми: список dict со всеми полями"""
+        base = os.path.abspath(base_folder)
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT * FROM projects WHERE base = ? ORDER BY created DESC", (base,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def project(self, base_folder, name):
+        """Запись одного проекта (dict) или None"""
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM projects WHERE base = ? AND name = ?",
+                             (os.path.abspath(base_folder), name)).fetchone()
+        return dict(row) if row else None
+
+    def update_status(self, base_folder, name, **status):
+        """Обновить поля состояния проекта (lines, audio, ..., last_run)"""
+        fields = {key: value for key, value in status.items()
+                  if key in STATUS_FIELDS or key == 'last_run'}
+        if not fields:
+            return
+        fields['updated'] = time.time()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        base = os.path.abspath(base_folder)
+        with self._connect() as db:
+            db.execute("INSERT OR IGNORE INTO projects (base, name, created) VALUES (?, ?, ?)",
+                       (base, name, time.time()))
+            db.execute(f"UPDATE projects SET {assignments} WHERE base = ? AND name = ?",
+                       (*fields.values(), base, name))
+
+    def update_assets(self, base_folder, name, folder, entries):
+        """Заменить список файлов папки проекта (записи FolderIndex)"""
+        base = os.path.abspath(base_folder)
+        with self._connect() as db:
+            db.execute("DELETE FROM assets WHERE base = ? AND project = ? AND folder = ?",
+                       (base, name, folder))
+            db.executemany(
+                "INSERT OR REPLACE INTO assets (base, project, folder, name, number, kind) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(base, name, folder, entry['name'], entry['number'], entry['kind'])
+                 for entry in entries])
+
+    def assets(self, base_folder, name, folder=None):
+        """Файлы проекта из каталога: список dict (folder, name, number, kind)"""
+        query = "SELECT folder, name, number, kind FROM assets WHERE base = ? AND project = ?"
+        args = [os.path.abspath(base_folder), name]
+        if folder:
+            query += " AND folder = ?"
+            args.append(folder)
+        with self._connect() as db:
+            return [dict(row) for row in db.execute(query + " ORDER BY folder, number", args)]
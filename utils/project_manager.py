@@ -4,8 +4,10 @@
 import os
 import platform
 import subprocess
+import sqlite3
 from datetime import datetime
 from core.config import Config
+from .project_catalog import ProjectCatalog
 
 class ProjectManager:
     """Управление проектами"""
@@ -13,6 +15,12 @@ class ProjectManager:
     def __init__(self, base_folder=None):
         self.base_folder = base_folder or Config.DEFAULT_PROJECTS_FOLDER
         os.makedirs(self.base_folder, exist_ok=True)
+        try:
+            self.catalog = ProjectCatalog.get_default()
+        except (sqlite3.Error, OSError) as e:
+            # Без каталога всё работает по-старому: обходом папок
+            print(f"[ERROR] Каталог проектов недоступен: {e}")
+            self.catalog = None
     
     def create_project(self, project_name):
         """Создать новый проект"""
@@ -61,16 +69,72 @@ class ProjectManager:
                 f.write("├── озвучка/           - Аудио файлы и text_script.txt\n")
                 f.write("└── видео_с_озвучкой/  - Финальные видео\n")
             
+            self.update_status(safe_name, lines=0, audio=0, video=0, images=0, rendered=0)
+            
             return True, f"Проект '{safe_name}' создан!\n{project_path}"
         
         except Exception as e:
             return False, f"Ошибка: {str(e)}"
 
     def list_projects(self):
-        """Список проектов"""
+        """Список проектов с состоянием из каталога (новые первыми)"""
         if not os.path.exists(self.base_folder):
             return []
+        if self.catalog is None:
+            return self._scan_projects()
+        
+        try:
+            self.catalog.sync(self.base_folder)
+            rows = self.catalog.projects(self.base_folder)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Каталог проектов: {e}")
+            return self._scan_projects()
         
+        projects = []
+        for row in rows:
+            row['path'] = os.path.join(self.base_folder, row['name'])
+            row['created'] = datetime.fromtimestamp(row['created'])
+            if row['last_run']:
+                row['last_run'] = datetime.fromtimestamp(row['last_run'])
+            projects.append(row)
+        return projects
+    
+    def project_status(self, project_name):
+        """Состояние проекта из каталога (dict) или None, если его там нет"""
+        if self.catalog is None:
+            return None
+        try:
+            status = self.catalog.project(self.base_folder, project_name)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Каталог проектов: {e}")
+            return None
+        if status is None:
+            return None
+        status['created'] = datetime.fromtimestamp(status['created'])
+        if status['last_run']:
+            status['last_run'] = datetime.fromtimestamp(status['last_run'])
+        return status
+    
+    def update_status(self, project_name, **status):
+        """Записать состояние проекта в каталог (ошибки базы не мешают работе)"""
+        if self.catalog is None:
+            return
+        try:
+            self.catalog.update_status(self.base_folder, project_name, **status)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Каталог проектов: {e}")
+    
+    def update_assets(self, project_name, folder_name, entries):
+        """Записать файлы папки проекта в каталог"""
+        if self.catalog is None:
+            return
+        try:
+            self.catalog.update_assets(self.base_folder, project_name, folder_name, entries)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Каталог проектов: {e}")
+    
+    def _scan_projects(self):
+        """Список проектов обходом папки (если каталог недоступен)"""
         projects = []
         for item in os.listdir(self.base_folder):
             item_path = os.path.join(self.base_folder, item)
@@ -0,0 +1,242 @@
+# utils/project_watcher.py
+"""Слежение за папками проекта: индекс файлов обновляется по событиям ФС"""
+
+import os
+import sys
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+from core.config import Config
+from .folder_index import FolderIndex, _RACY_SECONDS
+
+PROJECT_FOLDERS = ("озвучка", "видео", "картинки", "видео_с_озвучкой")
+
+# Флаги inotify(7)
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class InotifyBackend:
+    """События ядра Linux через inotify (ctypes, без сторонних модулей)"""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.watches = {}
+
+    def add(self, folder):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), _WATCH_MASK)
+        if wd < 0:
+            return False
+        self.watches[wd] = folder
+        return True
+
+    def wait(self, timeout):
+        """
+        События за время ожидания: [(folder, name, change)].
+        change - 'added', 'removed' или 'lost' (папка пропала или
+        очередь ядра переполнилась - индекс нужно перечитать).
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.extend((folder, None, 'lost') for folder in self.watches.values())
+                continue
+            folder = self.watches.get(wd)
+            if folder is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                self.watches.pop(wd, None)
+                events.append((folder, None, 'lost'))
+            elif mask & IN_ISDIR:
+                continue
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                events.append((folder, name, 'added'))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                events.append((folder, name, 'removed'))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """Опрос времени изменения папок (Windows, macOS, сетевые ФС без inotify)"""
+
+    def __init__(self, interval=None):
+        self.interval = interval or Config.WATCH_POLL_INTERVAL
+        self.folders = {}
+        self.last_poll = 0.0
+
+    @staticmethod
+    def _read(folder):
+        """(время изменения папки, время чтения, имена файлов) или None, если папки нет"""
+        try:
+            mtime_ns = os.stat(folder).st_mtime_ns
+            read_at = time.time()
+            with os.scandir(folder) as items:
+                names = {item.name for item in items
+                         if not item.name.startswith('.') and item.is_file()}
+        except OSError:
+            return None
+        return mtime_ns, read_at, names
+
+    def add(self, folder):
+        state = self._read(folder)
+        if state is None:
+            return False
+        self.folders[folder] = state
+        return True
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        if time.monotonic() - self.last_poll < self.interval:
+            return []
+        self.last_poll = time.monotonic()
+
+        events = []
+        for folder, (mtime_ns, read_at, names) in list(self.folders.items()):
+            try:
+                changed = os.stat(folder).st_mtime_ns != mtime_ns
+            except OSError:
+                changed = True
+            # Как в FolderIndex: чтение вскоре после изменения могло его пропустить
+            if not changed and read_at - mtime_ns / 1e9 > _RACY_SECONDS:
+                continue
+
+            state = self._read(folder)
+            if state is None:
+                del self.folders[folder]
+                events.append((folder, None, 'lost'))
+                continue
+            self.folders[folder] = state
+            events.extend((folder, name, 'added') for name in state[2] - names)
+            events.extend((folder, name, 'removed') for name in names - state[2])
+        return events
+
+    def close(self):
+        self.folders.clear()
+
+
+def project_summary(project_path):
+    """
+    Сводка по файлам проекта из FolderIndex (без перечитывания
+    отслеживаемых папок): числа аудио, видео, картинок, готовых видео,
+    пар видео-аудио и номера картинок без видео.
+    """
+    def numbers(folder, kind):
+        path = os.path.join(project_path, folder)
+        if not os.path.isdir(path):
+            return set()
+        return set(FolderIndex.numbered(path, kind))
+
+    audio = numbers("озвучка", 'audio')
+    video = numbers("видео", 'video')
+    images = numbers("картинки", 'image')
+    rendered = numbers("видео_с_озвучкой", 'video')
+    return {
+        'audio': len(audio),
+        'video': len(video),
+        'images': len(images),
+        'rendered': len(rendered),
+        'pairs': len(video & audio),
+        'missing': sorted(images - video),
+    }
+
+
+class ProjectWatcher:
+    """
+    Следит за папками проекта (озвучка, видео, картинки, видео_с_озвучкой).
+
+    run(job) работает фоновой задачей JobRunner: изменения сразу
+    применяются к FolderIndex (поиск пар, пропусков и счётчики не
+    перечитывают папки), а через job.report(folder_name, added, removed)
+    уходят в интерфейс. На Linux - inotify, иначе опрос раз в
+    WATCH_POLL_INTERVAL секунд. Папки, созданные позже, подключаются
+    по мере появления.
+    """
+
+    def __init__(self, project_path, folders=PROJECT_FOLDERS):
+        self.project_path = project_path
+        self.paths = {os.path.join(project_path, name): name for name in folders}
+
+    @staticmethod
+    def make_backend():
+        if sys.platform.startswith('linux') and Config.WATCH_USE_INOTIFY:
+            try:
+                return InotifyBackend()
+            except (OSError, AttributeError) as e:
+                print(f"[DEBUG] inotify недоступен ({e}), опрос папок")
+        return PollingBackend()
+
+    def run(self, job):
+        backend = self.make_backend()
+        watched = set()
+        print(f"[DEBUG] Слежение за проектом {self.project_path}: {type(backend).__name__}")
+
+        try:
+            while not job.is_cancelled():
+                for path, name in self.paths.items():
+                    if path not in watched and os.path.isdir(path) and backend.add(path):
+                        watched.add(path)
+                        FolderIndex.watch(path)
+                        job.report(name, None, None)
+
+                changes = {}
+                for folder, filename, change in backend.wait(0.5):
+                    if change == 'lost':
+                        # Отписываем только своё: счётчик watch общий с другими слежениями
+                        if folder in watched:
+                            watched.discard(folder)
+                            FolderIndex.unwatch(folder)
+                        changes.setdefault(folder, (set(), set()))
+                        continue
+                    if filename.startswith('.'):
+                        continue
+                    added, removed = changes.setdefault(folder, (set(), set()))
+                    # События применяются по порядку: создан и удалён - значит удалён
+                    if change == 'added':
+                        removed.discard(filename)
+                        added.add(filename)
+                    else:
+                        added.discard(filename)
+                        removed.add(filename)
+
+                for folder, (added, removed) in changes.items():
+                    FolderIndex.update(folder, added, removed)
+                    job.report(self.paths[folder], sorted(added), sorted(removed))
+        finally:
+            for path in watched:
+                FolderIndex.unwatch(path)
+            backend.close()
@@ -0,0 +1,261 @@
+# utils/rename_plan.py
+"""Переименование файлов папки одной транзакцией с журналом и откатом"""
+
+import os
+import json
+import time
+from .folder_index import FolderIndex
+
+
+class RenamePlan:
+    """
+    План переименования: все пары old → new собираются заранее.
+
+    До изменения диска план проверяется (совпадающие цели, занятые
+    имена, недопустимые имена) и показывается как список изменений.
+    Применение идёт в порядке, при котором ни одна цель не занята:
+    цепочки (1→2, 2→3) выполняются с конца, циклы (a↔b) разрываются
+    временным именем. Каждый шаг записывается в журнал в той же папке,
+    поэтому при ошибке или падении сделанные шаги откатываются, а
+    последнее успешное переименование можно отменить.
+    """
+
+    JOURNAL = ".rename_journal"
+    VERSION = 1
+
+    def __init__(self, folder, names=None):
+        self.folder = folder
+        self.names = set(os.listdir(folder) if names is None else names)
+        self.moves = []
+
+    def add(self, old, new):
+        """Запланировать old → new (одинаковые имена пропускаются)"""
+        if old != new:
+            self.moves.append((old, new))
+
+    def __len__(self):
+        return len(self.moves)
+
+    @staticmethod
+    def _key(name):
+        # На Windows имена без учёта регистра: a.mp4 и A.mp4 - один файл
+        return os.path.normcase(name)
+
+    def conflicts(self):
+        """Список проблем плана (пустой - план можно применять)"""
+        problems = []
+        existing = {self._key(name) for name in self.names}
+        sources = {self._key(old) for old, _ in self.moves}
+        targets = {}
+
+        for old, new in self.moves:
+            if old not in self.names:
+                problems.append(f"Файл не найден: {old}")
+            if (not new or new in ('.', '..') or '/' in new or '\\' in new
+                    or new.startswith('.') or new != new.strip()):
+                problems.append(f"Недопустимое имя: {old} → «{new}»")
+                continue
+
+            key = self._key(new)
+            if key in targets:
+                problems.append(f"Одно имя для двух файлов: {targets[key]} и {old} → {new}")
+            targets[key] = old
+
+            if key in existing and key not in sources:
+                problems.append(f"Имя уже занято: {old} → {new}")
+
+        return problems
+
+    def preview(self, limit=None):
+        """Сухой прогон: строки «old → new» в порядке имён"""
+        from .helpers import natural_sort_key
+        moves = sorted(self.moves, key=lambda move: natural_sort_key(move[0]))
+        lines = [f"{old} → {new}" for old, new in moves[:limit]]
+        if limit is not None and len(moves) > limit:
+            lines.append(f"... и ещё {len(moves) - limit}")
+        return lines
+
+    def steps(self):
+        """Порядок переименований без перезаписи: [(src, dst)]"""
+        by_source = {self._key(old): (old, new) for old, new in self.moves}
+        by_target = {self._key(new): self._key(old) for old, new in self.moves}
+        steps = []
+
+        # Цепочки: начинаем с конца, где цель свободна
+        for end in [key for key in by_target if key not in by_source]:
+            key = end
+            while key in by_target:
+                source = by_target.pop(key)
+                steps.append(by_source.pop(source))
+                key = source
+
+        # Остались только циклы (в том числе смена регистра имени)
+        while by_source:
+            start, (start_old, start_new) = next(iter(by_source.items()))
+            temp = self._temp_name(start_old)
+            steps.append((start_old, temp))
+            key = start
+            while by_target[key] != start:
+                source = by_target.pop(key)
+                steps.append(by_source.pop(source))
+                key = source
+            by_target.pop(key)
+            by_source.pop(start)
+            steps.append((temp, start_new))
+
+        return steps
+
+    def _temp_name(self, name):
+        index = 0
+        while True:
+            temp = f".rename_{int(time.time())}_{index}_{name}"
+            if temp not in self.names:
+                self.names.add(temp)
+                return temp
+            index += 1
+
+    def apply(self, undo_of=None):
+        """
+        Выполнить план: (success, message).
+        При ошибке выполненные шаги откатываются, папка остаётся как была.
+        """
+        problems = self.conflicts()
+        if problems:
+            return False, "\n".join(problems)
+        if not self.moves:
+            return True, "Нечего переименовывать"
+
+        steps = self.steps()
+        header = {
+            'version': self.VERSION,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'moves': self.moves,
+            'steps': steps,
+            'undo_of': undo_of
+        }
+
+        journal_path = os.path.join(self.folder, self.JOURNAL)
+        with open(journal_path, 'w', encoding='utf-8') as journal:
+            RenamePlan._write(journal, header)
+
+            for index, (src, dst) in enumerate(steps):
+                try:
+                    RenamePlan._rename(self.folder, src, dst)
+                except OSError as e:
+                    print(f"[ERROR] Переименование {src} → {dst}: {e}")
+                    RenamePlan._rollback(self.folder, journal, steps, range(index))
+                    return False, f"Не удалось переименовать {src}: {e}\nИзменения отменены"
+                RenamePlan._write(journal, {'done': index})
+
+            RenamePlan._write(journal, {'state': 'applied'})
+
+        FolderIndex.invalidate(self.folder)
+
+        print(f"[DEBUG] Переименовано файлов: {len(self.moves)} ({len(steps)} шагов)")
+        return True, f"Переименовано файлов: {len(self.moves)}"
+
+    # --- Журнал ---
+
+    @staticmethod
+    def _write(journal, record):
+        journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        journal.flush()
+        os.fsync(journal.fileno())
+
+    @staticmethod
+    def _rename(folder, src, dst):
+        src_path = os.path.join(folder, src)
+        dst_path = os.path.join(folder, dst)
+        # os.rename на Linux молча перезаписывает цель - проверяем сами
+        if os.path.exists(dst_path) and not os.path.samefile(src_path, dst_path):
+            raise FileExistsError(f"{dst} уже существует")
+        os.rename(src_path, dst_path)
+
+    @staticmethod
+    def _rollback(folder, journal, steps, done):
+        """Вернуть выполненные шаги в обратном порядке"""
+        for index in reversed(list(done)):
+            src, dst = steps[index]
+            try:
+                os.rename(os.path.join(folder, dst), os.path.join(folder, src))
+                RenamePlan._write(journal, {'undone': index})
+            except OSError as e:
+                print(f"[ERROR] Откат {dst} → {src}: {e}")
+        RenamePlan._write(journal, {'state': 'rolled_back'})
+        FolderIndex.invalidate(folder)
+
+    @staticmethod
+    def _read_journal(folder):
+        """(header, выполненные шаги, состояние) или None"""
+        path = os.path.join(folder, RenamePlan.JOURNAL)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError):
+            return None
+        if not records or records[0].get('version') != RenamePlan.VERSION:
+            return None
+
+        header = records[0]
+        done = set()
+        state = 'pending'
+        for record in records[1:]:
+            if 'done' in record:
+                done.add(record['done'])
+            elif 'undone' in record:
+                done.discard(record['undone'])
+            elif 'state' in record:
+                state = record['state']
+        return header, done, state
+
+    @staticmethod
+    def recover(folder):
+        """
+        Откатить незавершённое переименование (программа упала посреди
+        плана). Возвращает True, если что-то было откачено.
+        """
+        journal = RenamePlan._read_journal(folder)
+        if journal is None:
+            return False
+        header, done, state = journal
+        if state != 'pending':
+            return False
+
+        steps = [tuple(step) for step in header['steps']]
+        # Шаг мог выполниться, не успев попасть в журнал
+        following = max(done) + 1 if done else 0
+        if following < len(steps):
+            src, dst = steps[following]
+            if (not os.path.exists(os.path.join(folder, src))
+                    and os.path.exists(os.path.join(folder, dst))):
+                done.add(following)
+
+        print(f"[DEBUG] Откат незавершённого переименования в {folder}: {len(done)} шагов")
+        with open(os.path.join(folder, RenamePlan.JOURNAL), 'a', encoding='utf-8') as f:
+            RenamePlan._rollback(folder, f, steps, sorted(done))
+        return True
+
+    @staticmethod
+    def can_undo(folder):
+        journal = RenamePlan._read_journal(folder)
+        return bool(journal and journal[2] == 'applied' and not journal[0].get('undo_of'))
+
+    @staticmethod
+    def undo(folder):
+        """Отменить последнее переименование в папке: (success, message)"""
+        journal = RenamePlan._read_journal(folder)
+        if journal is None or journal[2] != 'applied':
+            return False, "Нет переименования для отмены"
+        header = journal[0]
+        if header.get('undo_of'):
+            return False, "Последнее переименование уже отменено"
+
+        plan = RenamePlan(folder)
+        for old, new in header['moves']:
+            plan.add(new, old)
+        success, message = plan.apply(undo_of=header['created'])
+        if not success:
+            return False, message
+        return True, f"Отменено переименований: {len(plan)}"
@@ -0,0 +1,144 @@
+# utils/snapshots.py
+"""Снимки папки перед изменениями: ссылки на файлы вместо копий"""
+
+import os
+import json
+import time
+import shutil
+from core.config import Config
+from .folder_index import FolderIndex
+
+# ioctl FICLONE (Linux): копия при записи на btrfs/xfs
+FICLONE = 0x40049409
+
+
+class FolderSnapshot:
+    """
+    Снимок файлов папки в _backup_<время>.
+
+    Переименование не меняет содержимого, поэтому копировать данные не
+    нужно: файл клонируется (reflink, копия при записи) или получает
+    жёсткую ссылку - это мгновенно и не занимает места. Если ФС не умеет
+    ни того, ни другого, в snapshot.json остаются только имена, размеры
+    и даты файлов. Старые снимки удаляются сверх BACKUP_KEEP.
+
+    Жёсткая ссылка делит данные с оригиналом - защищает от удаления и
+    переименования, но не от записи в файл на месте. Поэтому все записи
+    медиа в приложении (AudioProcessor, VideoProcessor, MontageEngine)
+    идут во временный .part файл и подменяют результат через os.replace.
+    Программа, переписывающая файл на месте (внешний редактор), изменит
+    и связанный с ним файл снимка - от этого защищает только reflink.
+    """
+
+    PREFIX = "_backup_"
+    MANIFEST = "snapshot.json"
+
+    @staticmethod
+    def create(folder, keep=None):
+        """
+        Снять снимок файлов папки: (success, snapshot_folder, stats).
+        stats - сколько файлов склонировано, связано ссылкой и только описано.
+        """
+        snapshot = os.path.join(folder, FolderSnapshot.PREFIX + time.strftime('%Y%m%d_%H%M%S'))
+        index = 1
+        while os.path.exists(snapshot):
+            index += 1
+            snapshot = os.path.join(
+                folder, f"{FolderSnapshot.PREFIX}{time.strftime('%Y%m%d_%H%M%S')}_{index}")
+
+        try:
+            os.makedirs(snapshot)
+        except OSError as e:
+            return False, str(e), None
+
+        stats = {'clone': 0, 'link': 0, 'manifest': 0}
+        # Способ, не сработавший на одном файле, не пробуем на остальных (та же ФС)
+        methods = ['clone', 'link'] if hasattr(os, 'link') else ['clone']
+        files = []
+
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.startswith(('.', FolderSnapshot.PREFIX)):
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+
+                stat = entry.stat(follow_symlinks=False)
+                method = FolderSnapshot._store(entry.path, os.path.join(snapshot, entry.name),
+                                               methods)
+                stats[method or 'manifest'] += 1
+                files.append({
+                    'name': entry.name,
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'stored': method
+                })
+
+        manifest = {
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'folder': os.path.abspath(folder),
+            'files': files
+        }
+        try:
+            with open(os.path.join(snapshot, FolderSnapshot.MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=1)
+        except OSError as e:
+            shutil.rmtree(snapshot, ignore_errors=True)
+            return False, str(e), None
+
+        print(f"[DEBUG] Снимок {os.path.basename(snapshot)}: клонов {stats['clone']}, "
+              f"ссылок {stats['link']}, только описано {stats['manifest']}")
+
+        FolderSnapshot.prune(folder, keep)
+        FolderIndex.invalidate(folder)
+        return True, snapshot, stats
+
+    @staticmethod
+    def _store(src, dst, methods):
+        """Сохранить файл в снимок без копирования данных: 'clone', 'link' или None"""
+        for method in list(methods):
+            try:
+                if method == 'clone':
+                    FolderSnapshot._clone(src, dst)
+                else:
+                    os.link(src, dst)
+                return method
+            except (OSError, ImportError):
+                if os.path.exists(dst):
+                    os.remove(dst)
+                methods.remove(method)
+        return None
+
+    @staticmethod
+    def _clone(src, dst):
+        import fcntl
+        with open(src, 'rb') as source, open(dst, 'xb') as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        shutil.copystat(src, dst)
+
+    @staticmethod
+    def list(folder):
+        """
+        Снимки папки от старых к новым. Считаются только папки с
+        snapshot.json: прежние полные копии _backup_* (без манифеста)
+        не трогаются и не удаляются prune.
+        """
+        snapshots = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if (entry.name.startswith(FolderSnapshot.PREFIX) and entry.is_dir()
+                        and os.path.isfile(os.path.join(entry.path, FolderSnapshot.MANIFEST))):
+                    snapshots.append(entry.path)
+        return sorted(snapshots)
+
+    @staticmethod
+    def prune(folder, keep=None):
+        """Удалить старые снимки сверх keep"""
+        keep = Config.BACKUP_KEEP if keep is None else keep
+        if keep <= 0:
+            return 0
+        removed = 0
+        for snapshot in FolderSnapshot.list(folder)[:-keep]:
+            shutil.rmtree(snapshot, ignore_errors=True)
+            removed += 1
+        return removed
@@ -0,0 +1,82 @@
+# utils/time_stretch.py
+"""Изменение темпа без изменения высоты голоса (WSOLA)"""
+
+import numpy as np
+
+FRAME_MS = 40       # Длина окна анализа
+SEARCH_MS = 10      # Диапазон поиска наилучшего совпадения
+
+
+def time_stretch(samples, speed, sample_rate, frame_ms=FRAME_MS, search_ms=SEARCH_MS):
+    """
+    Ускорить (speed > 1) или замедлить звук, сохранив высоту тона.
+
+    samples - массив (n,) или (n, каналы). Окна Ханна с перекрытием 50%
+    берутся из исходника с шагом hop * speed, а их положение уточняется
+    по максимуму взаимной корреляции с естественным продолжением
+    предыдущего окна - так стыки совпадают по фазе и нет «бульканья».
+    """
+    x = np.asarray(samples, dtype=np.float64)
+    was_mono = x.ndim == 1
+    if was_mono:
+        x = x[:, None]
+
+    n = len(x)
+    if n == 0 or abs(speed - 1.0) < 1e-6:
+        return x[:, 0].copy() if was_mono else x.copy()
+
+    frame = max(64, int(sample_rate * frame_ms / 1000))
+    frame -= frame % 2
+    hop_out = frame // 2
+    hop_in = hop_out * speed
+    search = max(1, int(sample_rate * search_ms / 1000))
+
+    # Периодическое окно Ханна: при перекрытии 50% сумма окон равна 1
+    window = np.hanning(frame + 1)[:frame][:, None]
+
+    out_len = int(np.ceil(n / speed))
+    frames = out_len // hop_out + 2
+
+    # Тишина в начале (чтобы первое окно не гасило начало звука) и запас в конце
+    lead = hop_out
+    tail = search + frame + int(np.ceil(hop_in)) * 3 + hop_out
+    padded = np.pad(x, ((search + lead, tail), (0, 0)))
+    mono = padded.mean(axis=1)
+
+    output = np.zeros((frames * hop_out + frame, x.shape[1]))
+    prev = None
+
+    for k in range(frames):
+        nominal = int(round(k * hop_in)) + search
+        if nominal + search + frame > len(padded):
+            break
+
+        if prev is None:
+            position = nominal
+        else:
+            # Ищем окно, лучше всего продолжающее предыдущее
+            template = mono[prev + hop_out:prev + hop_out + frame]
+            start = nominal - search
+            region = mono[start:start + frame + 2 * search]
+            correlation = np.correlate(region, template, mode='valid')
+            position = start + int(np.argmax(correlation))
+
+        output[k * hop_out:k * hop_out + frame] += padded[position:position + frame] * window
+        prev = position
+
+    # Отбрасываем вставленную в начало тишину
+    skip = int(round(lead / speed))
+    result = output[skip:skip + out_len]
+    if len(result) < out_len:
+        result = np.pad(result, ((0, out_len - len(result)), (0, 0)))
+
+    return result[:, 0] if was_mono else result
+
+
+def fit_length(samples, length):
+    """Обрезать или дополнить тишиной до точного числа отсчётов"""
+    samples = np.asarray(samples)
+    if len(samples) >= length:
+        return samples[:length]
+    padding = [(0, length - len(samples))] + [(0, 0)] * (samples.ndim - 1)
+    return np.pad(samples, padding)
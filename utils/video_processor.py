@@ -2,19 +2,28 @@
 """Обработка видео файлов"""
 
 import os
-import re
-from moviepy.editor import (VideoFileClip, AudioFileClip, CompositeAudioClip, 
-                            concatenate_videoclips, CompositeVideoClip, vfx)
-from .helpers import natural_sort_key
+from core.config import Config
+
+# moviepy (а с ним numpy, imageio, proglog) импортируется только внутри
+# операций - запуск приложения не платит за загрузку медиа-библиотек
 
 class VideoProcessor:
     """Инструменты для обработки видео"""
     
     @staticmethod
     def process_single_video(video_path, audio_path, output_path, fit_mode="fit", 
-                            keep_original=False, original_volume=30):
+                            keep_original=False, original_volume=30, threads=4):
         """Заменить звук в видео с правильной подгонкой"""
+        # Без изменения скорости видео не перекодируется - только ffmpeg
+        result = VideoProcessor._replace_audio_ffmpeg(
+            video_path, audio_path, output_path, fit_mode, keep_original, original_volume
+        )
+        if result is not None:
+            return result
+        
         try:
+            from moviepy.editor import VideoFileClip, AudioFileClip, CompositeAudioClip, vfx
+            
             video = VideoFileClip(video_path)
             audio = AudioFileClip(audio_path)
             
@@ -57,13 +66,20 @@ class VideoProcessor:
             # Применяем аудио к видео
             final_video = video.set_audio(final_audio)
             
-            # Экспортируем
+            # Экспортируем во временный файл и подменяем результат целиком
             print(f"[DEBUG] Экспорт в {output_path}")
-            final_video.write_videofile(output_path, 
-                                       codec='libx264', 
-                                       audio_codec='aac',
-                                       preset='medium',
-                                       threads=4)
+            root, ext = os.path.splitext(output_path)
+            temp_path = f"{root}.part{ext or '.mp4'}"
+            try:
+                final_video.write_videofile(temp_path, 
+                                           codec='libx264', 
+                                           audio_codec='aac',
+                                           preset='medium',
+                                           threads=threads)
+                os.replace(temp_path, output_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
             
             # Закрываем клипы
             video.close()
@@ -78,27 +94,85 @@ class VideoProcessor:
             print(f"[ERROR] {e}")
             return False, str(e)
     
+    @staticmethod
+    def _replace_audio_ffmpeg(video_path, audio_path, output_path, fit_mode,
+                              keep_original, original_volume):
+        """
+        Замена звука через ffmpeg: видеодорожка копируется без перекодирования,
+        кодируется только звук. None - нужен moviepy (ускорение видео или нет ffmpeg).
+        """
+        from .ffmpeg_tools import FFmpeg
+        from .media_info import MediaInfo
+        
+        if not FFmpeg.available():
+            return None
+        
+        video_info = MediaInfo.get(video_path)
+        audio_info = MediaInfo.get(audio_path)
+        if not video_info or not audio_info:
+            return None
+        
+        video_duration = video_info['duration']
+        audio_duration = audio_info['duration']
+        if not video_duration or not audio_duration or not video_info['has_video']:
+            return None
+        
+        print(f"[DEBUG] Видео: {video_duration:.2f}s, Аудио: {audio_duration:.2f}s")
+        
+        if fit_mode == "fit" and abs(video_duration - audio_duration) > Config.FIT_TOLERANCE:
+            # Нужно менять скорость видео - только с перекодированием
+            return None
+        
+        if fit_mode == "trim":
+            duration = min(video_duration, audio_duration)
+        else:
+            duration = video_duration
+        
+        # Новый звук дополняется тишиной до длины видео, лишнее срезает -t
+        filters = "[1:a]apad[voice]"
+        if keep_original and video_info['has_audio']:
+            volume = original_volume / 100.0
+            filters += (f";[0:a]volume={volume:.3f}[orig]"
+                        f";[voice][orig]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[aout]")
+            print(f"[DEBUG] Микшированное аудио: новое + оригинал ({original_volume}%)")
+        else:
+            filters += ";[voice]anull[aout]"
+            print(f"[DEBUG] Только новое аудио")
+        
+        # Пишем во временный файл, чтобы обрыв не оставил битый результат
+        root, ext = os.path.splitext(output_path)
+        temp_path = f"{root}.part{ext or '.mp4'}"
+        
+        success, log = FFmpeg.run([
+            '-i', video_path,
+            '-i', audio_path,
+            '-filter_complex', filters,
+            '-map', '0:v:0', '-map', '[aout]',
+            '-c:v', 'copy',
+            '-c:a', 'aac', '-b:a', Config.FFMPEG_AUDIO_BITRATE,
+            '-t', f"{duration:.3f}",
+            '-movflags', '+faststart',
+            temp_path
+        ])
+        
+        if not success:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            # Копирование потока не подошло (кодек/контейнер) - пробуем moviepy
+            print(f"[ERROR] ffmpeg: {log.strip().splitlines()[-1] if log.strip() else log}")
+            return None
+        
+        os.replace(temp_path, output_path)
+        print(f"[DEBUG] Видео скопировано без перекодирования: {output_path}")
+        return True, "Видео обработано"
+    
     @staticmethod
     def find_video_audio_pairs(video_folder, audio_folder):
         """Найти пары видео-аудио файлов по номерам"""
-        video_files = {}
-        audio_files = {}
-        
-        # Собираем видео
-        for file in os.listdir(video_folder):
-            if file.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
-                match = re.match(r'^(\d+)', file)
-                if match:
-                    number = int(match.group(1))
-                    video_files[number] = os.path.join(video_folder, file)
+        from .folder_index import FolderIndex
         
-        # Собираем аудио
-        for file in os.listdir(audio_folder):
-            if file.lower().endswith(('.mp3', '.wav', '.aac')):
-                match = re.match(r'^(\d+)', file)
-                if match:
-                    number = int(match.group(1))
-                    audio_files[number] = os.path.join(audio_folder, file)
+        video_files = FolderIndex.numbered(video_folder, 'video')
+        audio_files = FolderIndex.numbered(audio_folder, 'audio')
         
         # Создаем пары
         pairs = []
@@ -106,31 +180,40 @@ class VideoProcessor:
             if number in audio_files:
                 pairs.append({
                     'number': number,
-                    'video': video_files[number],
-                    'audio': audio_files[number]
+                    'video': video_files[number]['path'],
+                    'audio': audio_files[number]['path']
                 })
         
         return pairs
     
     @staticmethod
     def montage_videos(video_folder, output_file, use_transitions=False, 
-                      transition_type="crossfade", transition_duration=0.5):
+                      transition_type="crossfade", transition_duration=0.5,
+                      on_progress=None, should_stop=None):
         """Смонтировать видео из папки с переходами"""
         try:
-            # Собираем видео файлы
-            video_files = []
-            for file in os.listdir(video_folder):
-                if file.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
-                    video_files.append(os.path.join(video_folder, file))
+            from .ffmpeg_tools import FFmpeg
+            from .folder_index import FolderIndex
+            
+            # Собираем видео файлы (уже в естественном порядке)
+            video_files = [entry['path'] for entry in FolderIndex.files(video_folder, 'video')]
             
             if not video_files:
                 return False, "Нет видео файлов"
             
-            # Сортируем
-            video_files.sort(key=lambda x: natural_sort_key(os.path.basename(x)))
-            
             print(f"[DEBUG] Найдено {len(video_files)} видео")
             
+            # Склейка ffmpeg: без переходов - копированием потоков, с переходами - xfade
+            if FFmpeg.available():
+                from .montage_engine import MontageEngine, MONTAGE_TRANSITIONS
+                transition = None
+                if use_transitions:
+                    transition = MONTAGE_TRANSITIONS.get(transition_type, "fade")
+                engine = MontageEngine(output_file, on_progress=on_progress, should_stop=should_stop)
+                return engine.run(video_files, transition, transition_duration)
+            
+            from moviepy.editor import VideoFileClip, concatenate_videoclips
+            
             # Загружаем клипы
             clips = [VideoFileClip(vf) for vf in video_files]
             
@@ -144,11 +227,18 @@ class VideoProcessor:
             
             # Экспорт
             print(f"[DEBUG] Экспорт финального видео: {output_file}")
-            final_clip.write_videofile(output_file, 
-                                      codec='libx264', 
-                                      audio_codec='aac',
-                                      preset='medium',
-                                      threads=4)
+            root, ext = os.path.splitext(output_file)
+            temp_file = f"{root}.part{ext or '.mp4'}"
+            try:
+                final_clip.write_videofile(temp_file, 
+                                          codec='libx264', 
+                                          audio_codec='aac',
+                                          preset='medium',
+                                          threads=4)
+                os.replace(temp_file, output_file)
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
             
             # Закрываем клипы
             for clip in clips:
@@ -204,9 +294,16 @@ class VideoProcessor:
             return False, "Нет видео для склейки"
         
         if len(video_files) == 1:
-            # Одно видео - просто копируем
+            # Одно видео - просто копируем (через временный файл, как и остальные записи)
             import shutil
-            shutil.copy2(video_files[0], output_file)
+            root, ext = os.path.splitext(output_file)
+            temp_file = f"{root}.part{ext or '.mp4'}"
+            try:
+                shutil.copy2(video_files[0], temp_file)
+                os.replace(temp_file, output_file)
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
             return True, output_file
         
         try:
@@ -225,49 +322,26 @@ class VideoProcessor:
     @staticmethod
     def _concatenate_simple(video_files, output_file):
         """Простая конкатенация без переходов"""
-        import subprocess
+        from .montage_engine import MontageEngine
         
         try:
-            # Создаём список файлов
-            list_file = "temp_concat_list.txt"
-            
-            with open(list_file, 'w', encoding='utf-8') as f:
-                for video in video_files:
-                    f.write(f"file '{os.path.abspath(video)}'\n")
-            
-            # FFmpeg конкатенация
-            command = [
-                'ffmpeg', '-y',
-                '-f', 'concat',
-                '-safe', '0',
-                '-i', list_file,
-                '-c', 'copy',
-                output_file
-            ]
-            
-            result = subprocess.run(command, capture_output=True, text=True)
-            
-            # Удаляем временный файл
-            if os.path.exists(list_file):
-                os.remove(list_file)
-            
-            if result.returncode == 0:
-                return True, output_file
-            else:
-                return False, result.stderr
-        
+            success, msg = MontageEngine(output_file).run(video_files)
+            return (True, output_file) if success else (False, msg)
         except Exception as e:
             return False, f"Ошибка: {e}"
     
     @staticmethod
     def _concatenate_with_xfade(video_files, output_file, transition_type, duration):
         """Склейка с переходами через FFmpeg xfade"""
-        import subprocess
+        from .ffmpeg_tools import FFmpeg
         
         try:
-            # Для xfade нужно последовательно применять фильтры
-            # Это сложный процесс, поэтому упростим: используем moviepy
+            if FFmpeg.available():
+                from .montage_engine import MontageEngine
+                success, msg = MontageEngine(output_file).run(video_files, transition_type, duration)
+                return (True, output_file) if success else (False, msg)
             
+            # Без ffmpeg - склейка через moviepy (без переходов)
             from moviepy.editor import VideoFileClip, concatenate_videoclips
             
             clips = [VideoFileClip(f) for f in video_files]
@@ -275,14 +349,21 @@ class VideoProcessor:
             # Создаём финальное видео с crossfade
             final = concatenate_videoclips(clips, method="compose")
             
-            final.write_videofile(
-                output_file,
-                codec='libx264',
-                audio_codec='aac',
-                fps=30,
-                preset='medium',
-                logger=None
-            )
+            root, ext = os.path.splitext(output_file)
+            temp_file = f"{root}.part{ext or '.mp4'}"
+            try:
+                final.write_videofile(
+                    temp_file,
+                    codec='libx264',
+                    audio_codec='aac',
+                    fps=30,
+                    preset='medium',
+                    logger=None
+                )
+                os.replace(temp_file, output_file)
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
             
             # Закрываем клипы
             for clip in clips: